@@ -0,0 +1,207 @@
+# dirdigest/dirdigest/budget.py
+import fnmatch
+import os
+from typing import Dict, Generator, Iterable, List, Tuple
+
+from dirdigest.constants import (
+    BUDGET_DOC_CONFIG_EXTENSIONS,
+    BUDGET_ENTRY_POINT_NAMES,
+    BUDGET_LOW_VALUE_PATTERNS,
+    BUDGET_SOURCE_EXTENSIONS,
+)
+from dirdigest.core import BinaryContentError, LazyContent, ProcessedItem, TraversalStats
+from dirdigest.utils.logger import logger
+from dirdigest.utils.tokens import CHARS_PER_TOKEN_ESTIMATE, approximate_token_count
+
+# Markdown scaffolding per emitted file besides its content: "### `./path`" and the code fences
+PER_FILE_OVERHEAD_CHARS = 24
+# Tree prefix and indentation of a directory-structure line; every file and folder gets
+# one whether or not its content fits, so these are reserved up front
+STRUCTURE_LINE_OVERHEAD_CHARS = 12
+# Budget kept back for the digest header and section titles
+DIGEST_OVERHEAD_TOKENS = 160
+TRUNCATION_MARKER = "\n[... truncated by dirdigest --max-tokens ...]\n"
+OMITTED_REASON = "Omitted to fit --max-tokens"
+
+# (tier, depth, -mtime_ns, estimated_tokens, relative_path); smaller sorts first
+PriorityKey = Tuple[int, int, int, int, str]
+
+
+def priority_tier(relative_path: str) -> int:
+    """
+    0: project entry points (README, build manifests), 1: source code, 2: docs/config,
+    3: anything else, 4: generated or bulky data (lock files, minified code, CSV, ...).
+    """
+    name = os.path.basename(relative_path).lower()
+    if any(fnmatch.fnmatch(name, pattern) for pattern in BUDGET_LOW_VALUE_PATTERNS):
+        return 4
+    if name in BUDGET_ENTRY_POINT_NAMES:
+        return 0
+    extension = os.path.splitext(name)[1].lstrip(".")
+    if extension in BUDGET_SOURCE_EXTENSIONS:
+        return 1
+    if extension in BUDGET_DOC_CONFIG_EXTENSIONS:
+        return 2
+    return 3
+
+
+def estimate_item_tokens(relative_path: str, content, token_count: int | None = None) -> int:
+    """
+    Estimated tokens a file adds to the digest. Uses the token_count counted during
+    traversal (--tokenizer) when there is one; LazyContent is estimated from the
+    size recorded at traversal time, so no file has to be read.
+    """
+    overhead = (len(relative_path) + PER_FILE_OVERHEAD_CHARS) // CHARS_PER_TOKEN_ESTIMATE
+    if token_count is not None:
+        return overhead + token_count
+    if isinstance(content, LazyContent):
+        return overhead + content.size_bytes // CHARS_PER_TOKEN_ESTIMATE
+    return overhead + approximate_token_count(content or "")
+
+
+def _truncate_content(content, max_chars: int) -> str | None:
+    """Returns the first max_chars of content plus a marker, or None if nothing useful fits."""
+    if max_chars <= len(TRUNCATION_MARKER):
+        return None
+    if isinstance(content, LazyContent):
+        try:
+            content = content.load()
+        except (BinaryContentError, UnicodeDecodeError, OSError):
+            return None
+    cut = content.rfind("\n", 0, max_chars - len(TRUNCATION_MARKER))  # End on a whole line
+    return content[: cut + 1 if cut > 0 else max_chars - len(TRUNCATION_MARKER)] + TRUNCATION_MARKER
+
+
+def apply_token_budget(
+    processed_items: Iterable[ProcessedItem],
+    stats: TraversalStats,
+    max_tokens: int,
+) -> Generator[ProcessedItem, None, None]:
+    """
+    Selects files so the digest stays within max_tokens (estimated), before any
+    content is formatted. Whole files are taken in priority order (tier, then
+    depth, recency and size), skipping any that do not fit; the best file left
+    out is then truncated to the remaining budget, and the others are kept as
+    structure-only entries with an omitted_reason. Yields the items in their
+    original order.
+
+    A file whose identical copies were deduplicated (--dedup) is ranked as its
+    best copy, since its content stands in for all of them. If it is still cut
+    (omitted or truncated), the copies referring to it are omitted as well.
+
+    Consumes the whole traversal first. Records a "token_budget" summary in stats.
+    """
+    items: List[ProcessedItem] = list(processed_items)
+    costs = [
+        estimate_item_tokens(
+            str(relative_path), attributes.get("content"), attributes.get("token_count")
+        )
+        for relative_path, _, attributes in items
+    ]
+
+    def own_priority(index: int) -> PriorityKey:
+        relative_path_str = str(items[index][0])
+        return (
+            priority_tier(relative_path_str),
+            relative_path_str.count(os.sep),
+            -(items[index][2].get("mtime_ns") or 0),
+            costs[index],
+            relative_path_str,
+        )
+
+    # Deduplicated copies name the file holding their content by its relative path
+    index_by_path = {str(relative_path): index for index, (relative_path, _, _) in enumerate(items)}
+    copy_indices: Dict[int, List[int]] = {}
+    for index, (_, _, attributes) in enumerate(items):
+        target_index = index_by_path.get(attributes.get("duplicate_of"))
+        if target_index is not None:
+            copy_indices.setdefault(target_index, []).append(index)
+    priorities = [own_priority(index) for index in range(len(items))]
+    for target_index, indices in copy_indices.items():
+        best_priority = min(priorities[index] for index in indices)
+        if best_priority < priorities[target_index]:
+            priorities[target_index] = best_priority[:3] + priorities[target_index][3:]
+
+    def priority(index: int) -> PriorityKey:
+        return priorities[index]
+
+    # Every file and folder gets a directory-structure line, whatever happens to its content
+    structure_paths = set()
+    for relative_path, _, _ in items:
+        structure_paths.add(relative_path)
+        structure_paths.update(relative_path.parents)
+    structure_chars = sum(
+        len(path.name) + STRUCTURE_LINE_OVERHEAD_CHARS for path in structure_paths
+    )
+    structure_tokens = structure_chars // CHARS_PER_TOKEN_ESTIMATE
+    remaining_tokens = max_tokens - DIGEST_OVERHEAD_TOKENS - structure_tokens
+    selected_tokens = 0
+    unfit_indices: List[int] = []
+    # Pass 1: whole files, best first; a file that does not fit does not stop smaller ones
+    for index in sorted(range(len(items)), key=priority):
+        if costs[index] <= remaining_tokens:
+            remaining_tokens -= costs[index]
+            selected_tokens += costs[index]
+        else:
+            unfit_indices.append(index)
+
+    # Pass 2: the best file left out gets whatever budget remains; the rest keep no content
+    omitted_count = 0
+    truncated_count = 0
+    cut_indices: List[int] = []
+    for unfit_position, index in enumerate(unfit_indices):
+        relative_path, item_type, attributes = items[index]
+        budgeted_attributes = dict(attributes)
+        truncated_content = None
+        if unfit_position == 0 and attributes.get("content") is not None:
+            overhead = estimate_item_tokens(str(relative_path), "")
+            truncated_content = _truncate_content(
+                attributes["content"],
+                (remaining_tokens - overhead) * CHARS_PER_TOKEN_ESTIMATE,
+            )
+        if truncated_content is not None:
+            cost = estimate_item_tokens(str(relative_path), truncated_content)
+            remaining_tokens -= cost
+            selected_tokens += cost
+            truncated_count += 1
+            budgeted_attributes["content"] = truncated_content
+            budgeted_attributes.pop("token_count", None)  # Counted for the whole file
+            logger.info(f"Budget: Truncated [log.path]{relative_path}[/log.path] to fit --max-tokens")
+        else:
+            omitted_count += 1
+            budgeted_attributes["content"] = None
+            budgeted_attributes["read_error"] = None
+            budgeted_attributes["omitted_reason"] = OMITTED_REASON
+            logger.info(
+                f"Budget: Omitted content of [log.path]{relative_path}[/log.path] "
+                f"(~{costs[index]:,} tokens)"
+            )
+        items[index] = (relative_path, item_type, budgeted_attributes)
+        cut_indices.append(index)
+
+    # Pass 3: copies of a file whose content was cut would refer to content not shown in full
+    for target_index in cut_indices:
+        for index in copy_indices.get(target_index, ()):
+            relative_path, item_type, attributes = items[index]
+            budgeted_attributes = dict(attributes)
+            budgeted_attributes.pop("duplicate_of")
+            if "omitted_reason" not in attributes:  # Not already left out in pass 1
+                budgeted_attributes["omitted_reason"] = OMITTED_REASON
+                selected_tokens -= costs[index]
+                omitted_count += 1
+            if "duplicate_files_count" in stats:
+                stats["duplicate_files_count"] -= 1
+            logger.info(
+                f"Budget: Omitted [log.path]{relative_path}[/log.path], a copy of "
+                f"[log.path]{items[target_index][0]}[/log.path] whose content was cut"
+            )
+            items[index] = (relative_path, item_type, budgeted_attributes)
+
+    stats["token_budget"] = {
+        "max_tokens": max_tokens,
+        "estimated_tokens": selected_tokens + DIGEST_OVERHEAD_TOKENS + structure_tokens,
+        "omitted_files_count": omitted_count,
+        "truncated_files_count": truncated_count,
+    }
+    logger.debug(f"Budget: {stats['token_budget']}")
+    yield from items
@@ -1,16 +1,105 @@
 import click
+import contextlib
 import pathlib
+import queue
+import sqlite3
+import threading
 import time 
 import logging
 
 from dirdigest.constants import TOOL_NAME, TOOL_VERSION
-from dirdigest import core
-from dirdigest import formatter as dirdigest_formatter
 from dirdigest.utils import logger as dirdigest_logger
+from dirdigest.utils.logger import escape
 from dirdigest.utils import clipboard as dirdigest_clipboard
 from dirdigest.utils import config as dirdigest_config
-from dirdigest.utils.tokens import approximate_token_count
-from rich.markup import escape
+from dirdigest.utils import metrics as dirdigest_metrics
+
+# The output thread is handed text in batches of about this many characters: formatters
+# emit many small pieces, and each hand-off (and each console print) has a fixed cost
+OUTPUT_BATCH_CHARS = 64 * 1024
+# Batches the output thread may fall behind by before formatting waits for it
+OUTPUT_QUEUE_BATCHES = 16
+
+
+class _BackgroundWriter:
+    """
+    Passes text to write_chunk on a separate thread, in batches of OUTPUT_BATCH_CHARS,
+    so that formatting (and the traversal feeding it, when streaming) carries on while
+    earlier output is written to the file or console. Text is written in order.
+    The first error write_chunk raises is re-raised once, by the next write() or by
+    close(), which writes what is left and waits for the thread.
+    """
+
+    def __init__(self, write_chunk):
+        self._write_chunk = write_chunk
+        self._batch: list[str] = []
+        self._batch_chars = 0
+        self._queue: queue.Queue[str | None] = queue.Queue(maxsize=OUTPUT_QUEUE_BATCHES)
+        self._error: BaseException | None = None
+        self._error_raised = False
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="dirdigest-output", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = self._queue.get()
+            if batch is None:
+                return
+            if self._error is None:  # After an error, keep draining so write() never blocks
+                try:
+                    self._write_chunk(batch)
+                except BaseException as e:
+                    self._error = e
+
+    def _raise_error(self) -> None:
+        if self._error is not None and not self._error_raised:
+            self._error_raised = True
+            raise self._error
+
+    def write(self, chunk: str) -> int:
+        self._raise_error()
+        self._batch.append(chunk)
+        self._batch_chars += len(chunk)
+        if self._batch_chars >= OUTPUT_BATCH_CHARS:
+            self._queue.put("".join(self._batch))
+            self._batch = []
+            self._batch_chars = 0
+        return len(chunk)
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            if self._batch:
+                self._queue.put("".join(self._batch))
+                self._batch = []
+            self._queue.put(None)
+            self._thread.join()
+        self._raise_error()
+
+
+class _CountingWriter:
+    """
+    Minimal text sink for Formatter.format_stream that counts what passes through it
+    (for the token estimate) on its way to write_chunk. With keep_chunks, it also keeps
+    the chunks (for the clipboard).
+    """
+
+    def __init__(self, write_chunk, keep_chunks: bool = False):
+        self._write_chunk = write_chunk
+        self.chars_written = 0
+        self.last_char = ""
+        self.chunks: list[str] | None = [] if keep_chunks else None
+
+    def write(self, chunk: str) -> int:
+        if chunk:
+            self._write_chunk(chunk)
+            self.chars_written += len(chunk)
+            self.last_char = chunk[-1]
+            if self.chunks is not None:
+                self.chunks.append(chunk)
+        return len(chunk)
+
 
 @click.command(
     name=TOOL_NAME,
@@ -29,9 +118,9 @@ from rich.markup import escape
         resolve_path=True,
         path_type=pathlib.Path
     ),
-    default='.',
+    nargs=-1,
     required=False,
-    metavar='DIRECTORY'
+    metavar='DIRECTORY...'
 )
 @click.option(
     '--output', '-o',
@@ -41,10 +130,11 @@ from rich.markup import escape
 )
 @click.option(
     '--format', '-f',
-    type=click.Choice(['json', 'markdown'], case_sensitive=False),
+    type=click.Choice(['json', 'markdown', 'jsonl'], case_sensitive=False),
     default='markdown',
     show_default=True,
-    help="Output format for the digest. Choices: 'json', 'markdown'."
+    help=("Output format for the digest. Choices: 'json', 'markdown', 'jsonl'. 'jsonl' (JSON Lines) writes a "
+          "metadata record, then one record per file as soon as it is read, then a summary record.")
 )
 @click.option(
     '--include', '-i',
@@ -67,6 +157,21 @@ from rich.markup import escape
     show_default=True,
     help="Maximum size (in KB) for individual files to be included. Larger files are excluded."
 )
+@click.option(
+    '--max-total-size',
+    type=click.IntRange(min=1),
+    default=None,
+    show_default="unlimited",
+    help=("Stop the traversal once the included files add up to N KB: the first file that does not fit is "
+          "excluded and nothing after it is read or walked. Guards against pointing dirdigest at a huge tree.")
+)
+@click.option(
+    '--max-files',
+    type=click.IntRange(min=1),
+    default=None,
+    show_default="unlimited",
+    help="Stop the traversal after N included files; nothing after them is read or walked."
+)
 @click.option(
     '--max-depth', '-d',
     type=click.IntRange(min=0),
@@ -74,6 +179,23 @@ from rich.markup import escape
     show_default="unlimited",
     help="Maximum depth of directories to traverse. Depth 0 processes only the starting directory's files. Unlimited by default."
 )
+@click.option(
+    '--max-tokens', '-t',
+    type=click.IntRange(min=1),
+    default=None,
+    show_default="unlimited",
+    help=("Keep the digest within about N tokens (estimated). Files are prioritised by kind (README and "
+          "manifests, then source, then docs/config, then data/lock files), then by depth, recency and size. "
+          "The best file that does not fit is truncated; the rest are listed without content.")
+)
+@click.option(
+    '--tokenizer',
+    default=None,
+    metavar='SPEC',
+    help=("Count tokens per file while reading, with 'heuristic' (characters / 4) or 'bpe:PATH' "
+          "(an offline tiktoken-format BPE vocabulary, e.g. bpe:cl100k_base.tiktoken). Counts are cached "
+          "with file contents and reported per file and per directory in the metadata; --max-tokens uses them.")
+)
 @click.option(
     '--no-default-ignore',
     is_flag=True,
@@ -81,12 +203,43 @@ from rich.markup import escape
     help=("Disable all default ignore patterns (e.g., .git, __pycache__, node_modules, common "
           "binary/media files, hidden items). Use if you need to include items normally ignored by default.")
 )
+@click.option(
+    '--ignore-files/--no-ignore-files',
+    default=False,
+    show_default=True,
+    help=("Honour .gitignore and .dirdigestignore files found in the traversed directories (and, inside a git "
+          "work tree, in enclosing directories and .git/info/exclude), with gitignore precedence and negation. "
+          "Ignored directories are skipped without being walked. Off by default.")
+)
+@click.option(
+    '--dedup/--no-dedup',
+    default=False,
+    show_default=True,
+    help=("Emit the content of byte-identical files once: later copies are listed in the tree and refer to the "
+          "first one (`duplicate_of` in JSON) instead of repeating it. Empty files are not deduplicated. "
+          "Off by default.")
+)
 @click.option(
     '--follow-symlinks',
     is_flag=True,
     show_default=True, # Default is False
     help="Follow symbolic links to directories and files. By default, symlinks themselves are noted but not traversed/read."
 )
+@click.option(
+    '--git',
+    is_flag=True,
+    show_default=True, # Default is False
+    help=("Enumerate files from the git index (.git/index) instead of walking the directory: only tracked "
+          "files are considered, and ignored trees are never visited. Filters still apply. Falls back to a "
+          "normal walk outside a git work tree.")
+)
+@click.option(
+    '--git-untracked',
+    is_flag=True,
+    show_default=True, # Default is False
+    help=("Like --git, but also include untracked files that are not ignored by .gitignore or "
+          ".git/info/exclude (as 'git ls-files --cached --others --exclude-standard').")
+)
 @click.option(
     '--ignore-errors',
     is_flag=True,
@@ -94,6 +247,36 @@ from rich.markup import escape
     help=("Continue processing if an error occurs while reading a file (e.g., permission denied, "
           "decoding error). The file's content will be omitted or noted as an error in the digest.")
 )
+@click.option(
+    '--workers', '-w',
+    type=click.IntRange(min=1),
+    default=None,
+    show_default="serial",
+    help=("Number of threads used to stat, read and decode included files concurrently. "
+          "Output is identical to a serial run. Useful on network or otherwise high-latency filesystems.")
+)
+@click.option(
+    '--cache/--no-cache',
+    default=True,
+    show_default=True,
+    help=("Reuse decoded file contents from previous runs for files whose size, mtime and inode are "
+          "unchanged (stored under ~/.cache/dirdigest). Use --no-cache to always re-read every file.")
+)
+@click.option(
+    '--lazy-content',
+    is_flag=True,
+    show_default=True, # Default is False
+    help=("Only stat files while traversing and read each file's content when it is written to the output, "
+          "so the digest tree never holds file contents. Read errors are then reported in the output "
+          "(as with --ignore-errors) instead of excluding the file.")
+)
+@click.option(
+    '--watch',
+    is_flag=True,
+    show_default=True, # Default is False
+    help=("Keep running after the first digest and regenerate the output whenever files in the directory "
+          "change. Unchanged files are kept in memory; only new or modified files are re-read. Stop with Ctrl+C.")
+)
 @click.option(
     '--clipboard/--no-clipboard', '-c',
     default=True,
@@ -116,6 +299,21 @@ from rich.markup import escape
     default=None,
     help="Path to a file for detailed logging. All logs (including DEBUG level) will be written here, regardless of console verbosity."
 )
+@click.option(
+    '--stats-json',
+    type=click.Path(dir_okay=False, writable=True, path_type=pathlib.Path),
+    default=None,
+    help=("Write run statistics to this JSON file: wall-clock and CPU time per phase (enumerate, filter, stat, "
+          "read, token_count, tree_build, format, write, clipboard, ...) and counters such as bytes read and "
+          "files opened. Meant for tracking performance across versions.")
+)
+@click.option(
+    '--report',
+    type=click.Path(dir_okay=False, writable=True, path_type=pathlib.Path),
+    default=None,
+    help=("Write every excluded file and directory to this JSON Lines file: path, reason code, the "
+          "matching pattern or ignore rule, and the reason as logged. Lets you audit filters without -v.")
+)
 @click.option(
     '--config', 'config_path_cli',
     type=click.Path(exists=True, dir_okay=False, readable=True, path_type=pathlib.Path),
@@ -126,20 +324,34 @@ from rich.markup import escape
 )
 def main_cli( # Parameters match the names of the click options
     ctx: click.Context,
-    directory_arg: pathlib.Path,
+    directory_arg: tuple[pathlib.Path, ...],
     output: pathlib.Path | None,
     format: str,
     include: tuple[str, ...],
     exclude: tuple[str, ...],
     max_size: int,
+    max_total_size: int | None,
+    max_files: int | None,
     max_depth: int | None,
+    max_tokens: int | None,
+    tokenizer: str | None,
     no_default_ignore: bool,
+    ignore_files: bool,
+    dedup: bool,
     follow_symlinks: bool,
+    git: bool,
+    git_untracked: bool,
     ignore_errors: bool,
+    workers: int | None,
+    cache: bool,
+    lazy_content: bool,
+    watch: bool,
     clipboard: bool,
     verbose: int,
     quiet: bool,
     log_file: pathlib.Path | None,
+    stats_json: pathlib.Path | None,
+    report: pathlib.Path | None,
     config_path_cli: pathlib.Path | None
 ):
     # ... (rest of the main_cli function remains the same) ...
@@ -150,7 +362,18 @@ def main_cli( # Parameters match the names of the click options
 # and the focus here is only on the @click.option help strings.
 # The actual implementation would have the full main_cli body here.
 # For this step, only the help strings above are modified.
+    # The digest pipeline is imported here rather than at module level so that
+    # --help and --version (handled by click before this runs) start quickly
+    from dirdigest import budget as dirdigest_budget
+    from dirdigest import core
+    from dirdigest import formatter as dirdigest_formatter
+    from dirdigest import report as dirdigest_report
+    from dirdigest.utils import cache as dirdigest_cache
+    from dirdigest.utils import tokens as dirdigest_tokens
+    from dirdigest.utils.tokens import CHARS_PER_TOKEN_ESTIMATE
+
     start_time = time.monotonic()
+    run_metrics = dirdigest_metrics.RunMetrics()
 
     cfg_file_values = dirdigest_config.load_config_file(config_path_cli)
     cli_params_for_merge = ctx.params.copy()
@@ -173,12 +396,18 @@ def main_cli( # Parameters match the names of the click options
     )
     log = dirdigest_logger.logger
 
-    final_directory = final_settings.get('directory', directory_arg)
-    if isinstance(final_directory, str):
-        final_directory = pathlib.Path(final_directory)
-        if not final_directory.exists() or not final_directory.is_dir():
-            log.error(f"Directory '{final_directory}' from config does not exist or is not a directory. Using CLI/default: '{directory_arg}'")
-            final_directory = directory_arg
+    cli_directories = list(directory_arg) or [pathlib.Path('.').resolve()]
+    final_directories = final_settings.get('directory', directory_arg) or cli_directories
+    if isinstance(final_directories, (str, pathlib.Path)):
+        final_directories = [final_directories]
+    final_directories = [pathlib.Path(d) for d in final_directories]
+    for config_directory in final_directories:
+        if not config_directory.exists() or not config_directory.is_dir():
+            log.error(f"Directory '{config_directory}' from config does not exist or is not a directory. Using CLI/default: '{cli_directories[0]}'")
+            final_directories = cli_directories
+            break
+    # Several roots are digested together, relative to the directory containing them all
+    final_directory = final_directories[0] if len(final_directories) == 1 else core.common_base_dir(final_directories)
     
     final_output_path = final_settings.get('output', output)
     if isinstance(final_output_path, str):
@@ -205,9 +434,14 @@ def main_cli( # Parameters match the names of the click options
         # Resolve the output path relative to the base directory being processed
         # so the exclusion pattern works correctly from the perspective of os.walk
         try:
-            # Attempt to get output path relative to the final_directory.
+            # Attempt to get output path relative to the root containing it.
             # This is what the core processing will see.
-            output_file_relative_to_base = final_output_path.resolve().relative_to(final_directory.resolve())
+            for root_directory in final_directories:
+                with contextlib.suppress(ValueError):
+                    output_file_relative_to_base = final_output_path.resolve().relative_to(root_directory.resolve())
+                    break
+            else:
+                raise ValueError("output file is not inside any root")
             final_exclude.append(str(output_file_relative_to_base))
             log.info(f"CLI: Automatically excluding output file from processing: [log.path]{output_file_relative_to_base}[/log.path]")
         except ValueError:
@@ -232,14 +466,40 @@ def main_cli( # Parameters match the names of the click options
     # --- MODIFICATION END ---
 
     final_max_size = final_settings.get('max_size', max_size)
+    final_max_total_size = final_settings.get('max_total_size', max_total_size)
+    final_max_files = final_settings.get('max_files', max_files)
     final_max_depth = final_settings.get('max_depth', max_depth)
+    final_max_tokens = final_settings.get('max_tokens', max_tokens)
+    final_tokenizer = final_settings.get('tokenizer', tokenizer)
     final_no_default_ignore = final_settings.get('no_default_ignore', no_default_ignore)
+    final_ignore_files = final_settings.get('ignore_files', ignore_files)
+    final_dedup = final_settings.get('dedup', dedup)
     final_follow_symlinks = final_settings.get('follow_symlinks', follow_symlinks)
+    final_git = final_settings.get('git', git)
+    final_git_untracked = final_settings.get('git_untracked', git_untracked)
     final_ignore_errors = final_settings.get('ignore_errors', ignore_errors)
+    final_workers = final_settings.get('workers', workers)
+    final_cache = final_settings.get('cache', cache)
+    final_lazy_content = final_settings.get('lazy_content', lazy_content)
+    final_watch = final_settings.get('watch', watch)
     final_clipboard = final_settings.get('clipboard', clipboard)
+    final_stats_json = final_settings.get('stats_json', stats_json)
+    if final_stats_json is not None:
+        final_stats_json = pathlib.Path(final_stats_json)
+    final_report = final_settings.get('report', report)
+    if final_report is not None:
+        final_report = pathlib.Path(final_report)
+    # Phases and counters are only recorded when someone asks for them
+    metrics = run_metrics if final_stats_json is not None else dirdigest_metrics.NULL_METRICS
 
     log.debug(f"CLI: Final effective settings after merge: {final_settings}")
-    log.info(f"CLI: Processing directory: [log.path]{final_directory}[/log.path]")
+    if len(final_directories) > 1:
+        log.info(f"CLI: Processing {len(final_directories)} directories under [log.path]{final_directory}[/log.path]: "
+                 + ", ".join(f"[log.path]{d}[/log.path]" for d in final_directories))
+        if final_watch:
+            raise click.UsageError("--watch supports a single DIRECTORY.", ctx=ctx)
+    else:
+        log.info(f"CLI: Processing directory: [log.path]{final_directory}[/log.path]")
     if final_output_path:
         log.info(f"CLI: Output will be written to: [log.path]{final_output_path}[/log.path]")
     else:
@@ -248,36 +508,128 @@ def main_cli( # Parameters match the names of the click options
     if final_verbose > 0 :
         log.info(f"CLI: Include patterns: {final_include if final_include else 'N/A'}")
         log.info(f"CLI: Exclude patterns: {final_exclude if final_exclude else 'N/A'}")
-        log.info(f"CLI: Max size: {final_max_size}KB, Max depth: {final_max_depth if final_max_depth is not None else 'unlimited'}")
-        log.info(f"CLI: Default ignores {'DISABLED' if final_no_default_ignore else 'ENABLED'}")
+        log.info(f"CLI: Max size: {final_max_size}KB, Max depth: {final_max_depth if final_max_depth is not None else 'unlimited'}, "
+                 f"Max total size: {f'{final_max_total_size}KB' if final_max_total_size is not None else 'unlimited'}, "
+                 f"Max files: {final_max_files if final_max_files is not None else 'unlimited'}, "
+                 f"Max tokens: {final_max_tokens if final_max_tokens is not None else 'unlimited'}, "
+                 f"Tokenizer: {final_tokenizer or 'none (estimate from output)'}")
+        log.info(f"CLI: Default ignores {'DISABLED' if final_no_default_ignore else 'ENABLED'}, "
+                 f"Ignore files {'ENABLED' if final_ignore_files else 'DISABLED'}, "
+                 f"Dedup {'ENABLED' if final_dedup else 'DISABLED'}")
         log.info(f"CLI: Follow symlinks: {final_follow_symlinks}, Ignore errors: {final_ignore_errors}")
-        log.info(f"CLI: Clipboard: {final_clipboard}")
+        log.info(f"CLI: File source: {'git index + untracked' if final_git_untracked else 'git index' if final_git else 'directory walk'}")
+        log.info(f"CLI: Read workers: {final_workers if final_workers else 'serial'}, Content cache: {final_cache}, Lazy content: {final_lazy_content}")
+        log.info(f"CLI: Clipboard: {final_clipboard}, Watch: {final_watch}")
 
-    processed_items_generator, stats_from_core = core.process_directory_recursive(
-        base_dir_path=final_directory,
+    traversal_options = dict(
         include_patterns=final_include,
         exclude_patterns=final_exclude,
         no_default_ignore=final_no_default_ignore,
         max_depth=final_max_depth,
         follow_symlinks=final_follow_symlinks,
+        git=final_git,
+        git_untracked=final_git_untracked,
+        ignore_files=final_ignore_files,
+        dedup_content=final_dedup,
         max_size_kb=final_max_size,
-        ignore_read_errors=final_ignore_errors
+        max_files=final_max_files,
+        max_total_size_kb=final_max_total_size,
+        ignore_read_errors=final_ignore_errors,
+        workers=final_workers,
+        lazy_content=final_lazy_content,
+        tokenizer=dirdigest_tokens.get_tokenizer(final_tokenizer) if final_tokenizer else None,
+        metrics=metrics,
     )
 
-    log.info("CLI: Building digest tree...")
-    root_node, metadata_for_output = core.build_digest_tree(
-        final_directory,
-        processed_items_generator,
-        stats_from_core
-    )
-    log.debug(f"CLI: Digest tree built. Root node children: {len(root_node.get('children',[]))}")
-    log.debug(f"CLI: Metadata for output: {metadata_for_output}")
+    exclusion_report = None
+    if final_report is not None:
+        try:
+            exclusion_report = dirdigest_report.ExclusionReport(final_report)
+        except OSError as e:
+            log.error(f"CLI: Could not open exclusion report [log.path]{final_report}[/log.path]: {escape(str(e))}")
+    on_excluded = exclusion_report.record if exclusion_report is not None else None
+
+    watcher = None
+    content_cache = None
+    streamed_items = None  # Set when the output is written straight from the traversal
+
+    def close_content_cache():
+        # Called once the tree is built and again when output ends (JSON Lines reads from
+        # the cache while it is written); only the first call closes it
+        nonlocal content_cache
+        if content_cache is not None:
+            cache_to_close, content_cache = content_cache, None
+            try:
+                with metrics.phase("cache"):
+                    cache_to_close.close()
+            except sqlite3.Error as e:
+                log.warning(f"CLI: Could not update content cache: {escape(str(e))}")
+
+    if final_watch:
+        from dirdigest import watch as dirdigest_watch  # Loads ctypes (inotify); only needed here
+
+        # The watcher keeps its own in-memory content cache between rescans
+        log.info("CLI: Building digest tree (watch mode)...")
+        watcher = dirdigest_watch.DigestWatcher(
+            final_directory, traversal_options, max_tokens=final_max_tokens, on_excluded=on_excluded
+        )
+        root_node, metadata_for_output = watcher.root_node, watcher.metadata
+    else:
+        if final_cache and not final_lazy_content:
+            try:
+                with metrics.phase("cache"):
+                    content_cache = dirdigest_cache.ContentCache()
+            except (OSError, sqlite3.Error) as e:
+                log.warning(f"CLI: Content cache unavailable, reading all files from disk: {escape(str(e))}")
+
+        if len(final_directories) > 1:
+            processed_items_generator, stats_from_core = core.process_directories(
+                final_directories,
+                content_cache=content_cache,
+                on_excluded=on_excluded,
+                **traversal_options
+            )
+        else:
+            processed_items_generator, stats_from_core = core.process_directory_recursive(
+                base_dir_path=final_directory,
+                content_cache=content_cache,
+                on_excluded=on_excluded,
+                **traversal_options
+            )
+        if final_max_tokens is not None:
+            # Needs every candidate before choosing, so this consumes the walk up front
+            processed_items_generator = dirdigest_budget.apply_token_budget(
+                processed_items_generator, stats_from_core, final_max_tokens
+            )
+
+        if final_format.lower() == 'jsonl':
+            # Records are written as the traversal yields files; no tree is built
+            log.info("CLI: Streaming JSON Lines from the traversal...")
+            streamed_items = processed_items_generator
+            root_node = None
+            metadata_for_output = core.digest_metadata(final_directory, {}, 0.0)
+        else:
+            log.info("CLI: Building digest tree...")
+            try:
+                with metrics.phase("tree_build"):  # Traversal phases nested in here are counted separately
+                    root_node, metadata_for_output = core.build_digest_tree(
+                        final_directory,
+                        processed_items_generator,
+                        stats_from_core
+                    )
+            finally:
+                close_content_cache()
+    if root_node is not None:
+        log.debug(f"CLI: Digest tree built. Root node children: {len(root_node.get('children',[]))}")
+        log.debug(f"CLI: Metadata for output: {metadata_for_output}")
 
     selected_formatter: dirdigest_formatter.BaseFormatter
     if final_format.lower() == 'json':
         selected_formatter = dirdigest_formatter.JsonFormatter(final_directory, metadata_for_output)
     elif final_format.lower() == 'markdown':
         selected_formatter = dirdigest_formatter.MarkdownFormatter(final_directory, metadata_for_output)
+    elif final_format.lower() == 'jsonl':
+        selected_formatter = dirdigest_formatter.JsonLinesFormatter(final_directory, metadata_for_output)
     else: 
         log.critical(f"CLI: Invalid format '{final_format}' encountered. Exiting.")
         ctx.exit(1)
@@ -286,21 +638,49 @@ def main_cli( # Parameters match the names of the click options
     log.info(f"CLI: Formatting output as {final_format.upper()}...")
     
     final_output_str = "" 
+    streamed_chars = 0
     output_generation_succeeded = False 
+    clipboard_copy_attempted = False
 
     try:
-        generated_digest = selected_formatter.format(root_node)
-
+        # The digest fans out as it is formatted: an output thread writes it to the file or
+        # console while formatting (and, for JSON Lines, the traversal) carries on, and
+        # _CountingWriter counts it for the token estimate and keeps it for the clipboard.
+        # The clipboard gets it as soon as formatting ends, while the last of it is written.
+        log.debug("CLI: Streaming output.")
+        with contextlib.ExitStack() as output_stack:
+            output_stack.callback(close_content_cache)
+            if final_output_path:
+                f_out = output_stack.enter_context(open(final_output_path, 'w', encoding='utf-8'))
+                def write_chunk(chunk):
+                    with metrics.phase("write"):
+                        f_out.write(chunk)
+            else:
+                def write_chunk(chunk):
+                    with metrics.phase("write"):
+                        dirdigest_logger.stdout_console.print(chunk, end="", markup=False, soft_wrap=True)
+            output_writer = _BackgroundWriter(write_chunk)
+            output_stack.callback(output_writer.close)  # Before the file is closed
+            digest_writer = _CountingWriter(output_writer.write, keep_chunks=final_clipboard)
+            with metrics.phase("format"):
+                if streamed_items is not None:
+                    metadata_for_output = selected_formatter.format_items_stream(
+                        streamed_items, stats_from_core, digest_writer
+                    )
+                else:
+                    selected_formatter.format_stream(root_node, digest_writer)
+            if digest_writer.chunks is not None:
+                final_output_str = "".join(digest_writer.chunks)
+                if final_output_str:
+                    clipboard_copy_attempted = True
+                    with metrics.phase("clipboard"):
+                        dirdigest_clipboard.copy_to_clipboard(final_output_str)
+            output_writer.close()  # Waits for the output thread and raises its write errors
         if final_output_path:
-            with open(final_output_path, 'w', encoding='utf-8') as f_out:
-                f_out.write(generated_digest)
             log.info(f"CLI: Digest successfully written to [log.path]{final_output_path}[/log.path]")
-        else:
-            dirdigest_logger.stdout_console.print(generated_digest, end="", markup=False)
-            if not generated_digest.endswith('\n'):
-                dirdigest_logger.stdout_console.print()
-
-        final_output_str = generated_digest
+        elif digest_writer.last_char != '\n':
+            dirdigest_logger.stdout_console.print()
+        streamed_chars = digest_writer.chars_written
         output_generation_succeeded = True
 
     except Exception as e:
@@ -322,17 +702,27 @@ def main_cli( # Parameters match the names of the click options
         final_output_str = f"Error generating output: {e}"
         output_generation_succeeded = False
 
+    # The traversal has finished by now, even when it was streamed to the output
+    if exclusion_report is not None:
+        try:
+            exclusion_report.close()
+            log.info(
+                f"CLI: {exclusion_report.records_count} excluded items reported in "
+                f"[log.path]{final_report}[/log.path]"
+            )
+        except OSError as e:
+            log.error(f"CLI: Could not write exclusion report [log.path]{final_report}[/log.path]: {escape(str(e))}")
+
     # --- Clipboard ---
-    if final_clipboard:
+    # The copy itself is made in the output block, as soon as the digest is complete
+    if final_clipboard and not clipboard_copy_attempted:
         # Add a debug log here too to see the state
         log.debug(f"CLI_CLIPBOARD_CHECK: output_generation_succeeded={output_generation_succeeded}, final_output_str starts with '{final_output_str[:30]}...'")
-        if output_generation_succeeded and final_output_str: 
-            dirdigest_clipboard.copy_to_clipboard(final_output_str)
-        elif not output_generation_succeeded: 
+        if not output_generation_succeeded: 
             log.warning("CLI: Output generation failed (see error above), not copying to clipboard.")
         else: 
             log.debug("CLI: Output is empty, nothing to copy to clipboard.")
-    else:
+    elif not final_clipboard:
         log.debug("CLI: Clipboard copy disabled.")
 
     execution_time = time.monotonic() - start_time
@@ -341,17 +731,40 @@ def main_cli( # Parameters match the names of the click options
     total_size = metadata_for_output.get("total_content_size_kb", 0.0)
 
     # --- Calculate approximate token count for the generated digest ---
+    # From the characters counted on the way out; the digest is not scanned again
     approx_tokens = 0
-    if output_generation_succeeded and final_output_str:
-        approx_tokens = approximate_token_count(final_output_str)
+    if output_generation_succeeded:
+        approx_tokens = streamed_chars // CHARS_PER_TOKEN_ESTIMATE
 
     log.info("-" * 30 + " SUMMARY " + "-" * 30)
     log.info(f"[log.summary_key]Total files included:[/log.summary_key] [log.summary_value_inc]{inc_count}[/log.summary_value_inc]")
     log.info(f"[log.summary_key]Total items excluded (files/dirs):[/log.summary_key] [log.summary_value_exc]{exc_count}[/log.summary_value_exc]")
     log.info(f"[log.summary_key]Total content size:[/log.summary_key] [log.summary_value_neutral]{total_size:.2f} KB[/log.summary_value_neutral]")
-    log.info(f"[log.summary_key]Approx. Token Count:[/log.summary_key] [log.summary_value_neutral]{approx_tokens:,}[/log.summary_value_neutral]")
+    token_counts = metadata_for_output.get("token_counts")
+    if token_counts:
+        # Counted once per file while reading; the digest itself is not re-tokenised
+        log.info(f"[log.summary_key]Token Count ({token_counts['tokenizer']}, file contents):[/log.summary_key] [log.summary_value_neutral]{token_counts['total']:,}[/log.summary_value_neutral]")
+    else:
+        log.info(f"[log.summary_key]Approx. Token Count:[/log.summary_key] [log.summary_value_neutral]{approx_tokens:,}[/log.summary_value_neutral]")
     log.info(f"[log.summary_key]Execution time:[/log.summary_key] [log.summary_value_neutral]{execution_time:.2f} seconds[/log.summary_value_neutral]")
     log.info("-" * (60 + len(" SUMMARY ")))
+
+    if final_stats_json is not None:
+        metrics.count("output_chars", len(final_output_str) if final_output_str else streamed_chars)
+        try:
+            metrics.write_json(
+                final_stats_json,
+                digest={
+                    "format": final_format.lower(),
+                    "workers": final_workers,
+                    "included_files_count": inc_count,
+                    "excluded_files_count": exc_count,
+                    "total_content_size_kb": total_size,
+                },
+            )
+            log.info(f"CLI: Run statistics written to [log.path]{final_stats_json}[/log.path]")
+        except OSError as e:
+            log.error(f"CLI: Could not write run statistics to [log.path]{final_stats_json}[/log.path]: {escape(str(e))}")
     
     will_log_debug_tree = False
     if log.isEnabledFor(logging.DEBUG):
@@ -360,7 +773,7 @@ def main_cli( # Parameters match the names of the click options
                 will_log_debug_tree = True
                 break
 
-    if will_log_debug_tree:
+    if will_log_debug_tree and root_node is not None:
         import json as json_debugger
         def json_default_serializer(obj):
             if isinstance(obj, pathlib.Path): return str(obj)
@@ -381,5 +794,34 @@ def main_cli( # Parameters match the names of the click options
             log.debug(f"CLI: Error serializing data tree to JSON for debug: {escape(str(e))}")
         log.debug("CLI: --- End Generated Data Tree ---") # This simple message is fine
 
+    # --- Watch mode ---
+    if watcher is not None:
+        def on_digest_change(changed_root_node, changed_metadata):
+            updated_formatter = type(selected_formatter)(final_directory, changed_metadata)
+            try:
+                updated_digest = updated_formatter.format(changed_root_node)
+                if final_output_path:
+                    with open(final_output_path, 'w', encoding='utf-8') as f_out:
+                        f_out.write(updated_digest)
+                else:
+                    dirdigest_logger.stdout_console.print(updated_digest, end="", markup=False, soft_wrap=True)
+                    if not updated_digest.endswith('\n'):
+                        dirdigest_logger.stdout_console.print()
+            except Exception as e:
+                log.error(f"CLI: Error regenerating digest: {escape(type(e).__name__)} - {escape(str(e))}")
+                return
+            if final_clipboard and updated_digest:
+                dirdigest_clipboard.copy_to_clipboard(updated_digest)
+            log.info(
+                f"CLI: Digest updated: {changed_metadata.get('included_files_count', 0)} files, "
+                f"{changed_metadata.get('total_content_size_kb', 0.0):.2f} KB"
+            )
+
+        log.info(f"CLI: Watching [log.path]{final_directory}[/log.path] for changes (Ctrl+C to stop)...")
+        try:
+            watcher.run(on_digest_change)
+        except KeyboardInterrupt:
+            log.info("CLI: Watch stopped.")
+
 if __name__ == '__main__':
     main_cli()
\ No newline at end of file
@@ -112,4 +112,70 @@ DEFAULT_IGNORE_PATTERNS = [
     "**/MANIFEST.MF", # Java manifest files often in target/ or build/
 
     # Add any other project-specific or generally unwanted patterns here
-]
\ No newline at end of file
+]
+# --- Ignore files ---
+# Read from every traversed directory (with --ignore-files), in gitignore
+# syntax. Listed in increasing precedence: within one directory .dirdigestignore rules
+# override .gitignore rules, and any directory's rules override its parents'.
+IGNORE_FILENAMES = (".gitignore", ".dirdigestignore")
+# In --git mode git has already applied .gitignore, so only these are read
+GIT_MODE_IGNORE_FILENAMES = (".dirdigestignore",)
+
+# --- Token budget (--max-tokens) file priorities ---
+# Lower tier = kept first when files compete for the budget. Within a tier, shallower,
+# more recently modified and smaller files win (see dirdigest.budget).
+BUDGET_ENTRY_POINT_NAMES = {
+    "readme", "readme.md", "readme.rst", "readme.txt",
+    "pyproject.toml", "setup.py", "setup.cfg", "package.json", "cargo.toml", "go.mod",
+    "pom.xml", "build.gradle", "makefile", "dockerfile",
+}
+BUDGET_SOURCE_EXTENSIONS = {
+    "py", "pyi", "js", "jsx", "ts", "tsx", "mjs", "cjs", "go", "rs", "java", "kt", "scala",
+    "c", "h", "cc", "cpp", "hpp", "cs", "rb", "php", "swift", "m", "sh", "bash", "zsh",
+    "sql", "lua", "r", "jl", "ex", "exs", "erl", "hs", "ml", "clj", "dart", "vue", "svelte",
+}
+BUDGET_DOC_CONFIG_EXTENSIONS = {
+    "md", "rst", "txt", "adoc", "toml", "yaml", "yml", "json", "ini", "cfg", "conf",
+    "html", "css", "scss", "xml", "proto", "graphql",
+}
+BUDGET_LOW_VALUE_PATTERNS = [
+    "*.lock", "*.min.js", "*.min.css", "*.map", "*.csv", "*.tsv", "*.svg", "*.snap",
+    "*.ipynb", "*_pb2.py", "*.generated.*",
+]
+
+# --- Binary detection ---
+# Files are sniffed before being decoded: only the first BINARY_SNIFF_BYTES are read
+# from a file that turns out to be binary.
+BINARY_SNIFF_BYTES = 8192
+# Files of at least this size are decoded from a memory map instead of read() into a
+# bytes buffer first; with --lazy-content, Markdown output streams them in chunks.
+MMAP_READ_THRESHOLD_BYTES = 1024 * 1024
+STREAM_CHUNK_BYTES = 256 * 1024
+# Extensions that are always binary; these files are marked without being opened at all.
+# Extensions covered by DEFAULT_IGNORE_PATTERNS are deliberately absent: with
+# --no-default-ignore such files are only sniffed, like any other file.
+BINARY_FILE_EXTENSIONS = {
+    "ico", "icns", "heic", "psd", "m4a", "m4v", "opus", "webm",
+    "tgz", "xz", "zst", "lz4", "whl", "egg", "wasm",
+    "npy", "npz", "pkl", "pickle", "joblib", "pt", "pth", "ckpt", "safetensors",
+    "onnx", "h5", "hdf5", "tflite", "parquet", "feather", "arrow", "avro", "orc",
+}
+# Leading bytes of common binary formats whose header does not contain a NUL byte
+# within the sniffed prefix (NUL bytes alone already mark a file as binary).
+BINARY_MAGIC_NUMBERS = [
+    b"\x89PNG\r\n\x1a\n",
+    b"\xff\xd8\xff",  # JPEG
+    b"GIF87a", b"GIF89a",
+    b"%PDF-",
+    b"PK\x03\x04",  # zip, jar, docx, whl, ...
+    b"\x1f\x8b",  # gzip
+    b"\xfd7zXZ\x00",
+    b"7z\xbc\xaf\x27\x1c",
+    b"\x28\xb5\x2f\xfd",  # zstd
+    b"\x7fELF",
+    b"\xca\xfe\xba\xbe", b"\xcf\xfa\xed\xfe", b"\xce\xfa\xed\xfe",  # Mach-O / Java class
+    b"\x00asm",  # WebAssembly
+    b"SQLite format 3\x00",
+    b"\x93NUMPY",
+    b"OggS", b"fLaC", b"RIFF",
+]
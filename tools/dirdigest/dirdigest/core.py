@@ -1,17 +1,471 @@
 # dirdigest/dirdigest/core.py
+import codecs
+import logging
+import mmap
 import os
 import pathlib
-from typing import Any, Generator, Tuple, List, Dict
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, BinaryIO, Callable, Collection, Deque, Generator, Iterator, NamedTuple, Optional, Set, Tuple, List, Dict
 
-from dirdigest.constants import DEFAULT_IGNORE_PATTERNS
-from dirdigest.utils.patterns import matches_patterns, is_path_hidden
+from dirdigest.constants import (
+    BINARY_FILE_EXTENSIONS,
+    BINARY_MAGIC_NUMBERS,
+    BINARY_SNIFF_BYTES,
+    DEFAULT_IGNORE_PATTERNS,
+    GIT_MODE_IGNORE_FILENAMES,
+    IGNORE_FILENAMES,
+    MMAP_READ_THRESHOLD_BYTES,
+    STREAM_CHUNK_BYTES,
+)
+from dirdigest.utils.patterns import PatternSet
+from dirdigest.utils.cache import AnyContentCache
+from dirdigest.utils.gitignore import IgnoreRules, load_enclosing_ignore_rules, match_ignore_rules
+from dirdigest.utils.gitindex import GitFileEntry, GitIndexError, find_work_tree, list_git_files
+from dirdigest.utils.tokens import Tokenizer
 from dirdigest.utils.logger import logger  # Import the configured logger
+from dirdigest.utils.metrics import NULL_METRICS, RunMetrics
 
 # Type hints for clarity
 DigestItemNode = Dict[str, Any]
 ProcessedItemPayload = Dict[str, Any]
 ProcessedItem = Tuple[pathlib.Path, str, ProcessedItemPayload]
-TraversalStats = Dict[str, int]
+TraversalStats = Dict[str, Any]
+FileReadResult = Dict[str, Any]
+
+# How many reads each worker may run ahead of the consumer in parallel mode.
+# Bounds memory held by finished-but-not-yet-yielded file contents.
+READ_AHEAD_PER_WORKER = 8
+
+# Compiled once per process; shared by every traversal that keeps default ignores on
+DEFAULT_IGNORE_PATTERN_SET = PatternSet(DEFAULT_IGNORE_PATTERNS)
+
+# Exclusions are logged with this format and (item kind, relative path, reason) as
+# arguments, so a message is only rendered if a handler actually emits it
+EXCLUDED_LOG_MESSAGE = (
+    "[log.excluded]Excluded %s[/log.excluded]: [log.path]%s[/log.path] ([log.reason]%s[/log.reason])"
+)
+
+
+WalkLevel = Tuple[str, str, int, List[os.DirEntry], List[os.DirEntry]]
+
+
+class BinaryContentError(ValueError):
+    """Raised when a file's leading bytes show it is binary; the message says why."""
+
+
+def _binary_extension_reason(path: str) -> str | None:
+    """Returns why path is treated as binary from its name alone, or None."""
+    extension = os.path.splitext(path)[1].lstrip(".").lower()
+    if extension in BINARY_FILE_EXTENSIONS:
+        return f"binary extension '.{extension}'"
+    return None
+
+
+def _binary_content_reason(head: bytes) -> str | None:
+    """Returns why a file starting with `head` is treated as binary, or None."""
+    for magic_number in BINARY_MAGIC_NUMBERS:
+        if head.startswith(magic_number):
+            return f"starts with the signature {magic_number[:8]!r}"
+    if b"\x00" in head:
+        return f"NUL byte in the first {BINARY_SNIFF_BYTES // 1024}KB"
+    return None
+
+
+def _raise_if_binary(head: bytes) -> None:
+    binary_reason = _binary_content_reason(head)
+    if binary_reason is not None:
+        raise BinaryContentError(binary_reason)
+
+
+def _normalize_newlines(text: str) -> str:
+    """Universal newlines, as text-mode open() would produce."""
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+def _read_text(f: BinaryIO, size_bytes: int = 0) -> str:
+    """
+    Reads an open binary file as strict UTF-8 with universal newlines (like text mode).
+    The first BINARY_SNIFF_BYTES are checked before anything else is read, so a binary
+    file costs one small read. Files of at least MMAP_READ_THRESHOLD_BYTES (size_bytes)
+    are decoded straight from a memory map, without an intermediate bytes copy.
+    Raises BinaryContentError or UnicodeDecodeError.
+    """
+    if size_bytes >= MMAP_READ_THRESHOLD_BYTES:
+        # size_bytes may come from a stat() made before the file was opened, and the file
+        # may have shrunk since (an empty file cannot be mapped): decide on the open file
+        size_bytes = os.fstat(f.fileno()).st_size
+    if size_bytes >= MMAP_READ_THRESHOLD_BYTES:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            _raise_if_binary(mapped[:BINARY_SNIFF_BYTES])
+            return _normalize_newlines(str(mapped, "utf-8", "strict"))
+    head = f.read(BINARY_SNIFF_BYTES)
+    _raise_if_binary(head)
+    rest = f.read()
+    return _normalize_newlines((head + rest if rest else head).decode("utf-8", errors="strict"))
+
+
+def _iter_mapped_text(mapped: mmap.mmap) -> Generator[str, None, None]:
+    """
+    Decodes a memory-mapped file STREAM_CHUNK_BYTES at a time (universal newlines),
+    closing the map when done. Only one chunk is held in Python memory at a time.
+    """
+    try:
+        decoder = codecs.getincrementaldecoder("utf-8")("strict")
+        carried_cr = ""
+        for start in range(0, len(mapped), STREAM_CHUNK_BYTES):
+            final = start + STREAM_CHUNK_BYTES >= len(mapped)
+            text = carried_cr + decoder.decode(mapped[start : start + STREAM_CHUNK_BYTES], final)
+            carried_cr = ""
+            if not final and text.endswith("\r"):  # Could be the first half of a \r\n
+                text, carried_cr = text[:-1], "\r"
+            if text:
+                yield _normalize_newlines(text)
+    finally:
+        mapped.close()
+
+
+class LazyContent(NamedTuple):
+    """
+    Stand-in for a file's content in lazy mode: where to read it and what the file
+    looked like when it was traversed. Formatters call load() when they emit the
+    file and drop the result afterwards, so the tree never holds file contents.
+    """
+
+    path: str
+    size_bytes: int
+    mtime_ns: int
+
+    def _open(self) -> BinaryIO:
+        f = open(self.path, "rb")
+        if os.fstat(f.fileno()).st_mtime_ns != self.mtime_ns:
+            logger.warning(
+                f"File changed since it was traversed: [log.path]{self.path}[/log.path]"
+            )
+        return f
+
+    def load(self) -> str:
+        """
+        Reads the file as strict UTF-8. Raises BinaryContentError,
+        UnicodeDecodeError or OSError like an eager read would.
+        """
+        with self._open() as f:
+            return _read_text(f, os.fstat(f.fileno()).st_size)
+
+    def iter_chunks(self) -> Iterator[str]:
+        """
+        Like load(), but files of at least MMAP_READ_THRESHOLD_BYTES are memory-mapped
+        and returned as an iterator of decoded chunks, so they can be written out
+        without ever being held in memory whole. The file is sniffed and validated as
+        UTF-8 before this returns: errors are raised here, not halfway through writing.
+        """
+        with self._open() as f:
+            size_bytes = os.fstat(f.fileno()).st_size
+            if size_bytes < MMAP_READ_THRESHOLD_BYTES:
+                return iter((_read_text(f, size_bytes),))
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:  # The map stays valid after the file is closed
+            _raise_if_binary(mapped[:BINARY_SNIFF_BYTES])
+            decoder = codecs.getincrementaldecoder("utf-8")("strict")
+            try:
+                for start in range(0, len(mapped), STREAM_CHUNK_BYTES):
+                    decoder.decode(
+                        mapped[start : start + STREAM_CHUNK_BYTES],
+                        start + STREAM_CHUNK_BYTES >= len(mapped),
+                    )
+            except UnicodeDecodeError:
+                str(mapped, "utf-8", "strict")  # Re-raise with positions in the file, not the chunk
+                raise
+        except ValueError:  # BinaryContentError, UnicodeDecodeError
+            mapped.close()
+            raise
+        return _iter_mapped_text(mapped)
+
+
+def _scandir_walk(top: str, follow_symlinks: bool) -> Generator[WalkLevel, None, None]:
+    """
+    Top-down, depth-first walk built directly on os.scandir, visiting directories
+    in the same order as os.walk(topdown=True).
+
+    Yields (dir_path, relative_dir, depth, dir_entries, file_entries) per directory.
+    relative_dir is a plain string ("" for the top). Like os.walk, the caller may
+    prune dir_entries in place to stop descent. The DirEntry objects keep the
+    type/stat information gathered by scandir, so callers can avoid re-stat'ing.
+    Unreadable directories are skipped silently, as os.walk does by default.
+    """
+    stack: List[Tuple[str, str, int]] = [(top, "", 0)]
+    while stack:
+        dir_path, relative_dir, depth = stack.pop()
+        try:
+            with os.scandir(dir_path) as scandir_it:
+                entries = list(scandir_it)
+        except OSError:
+            continue
+
+        dir_entries: List[os.DirEntry] = []
+        file_entries: List[os.DirEntry] = []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()  # Follows symlinks, like os.walk
+            except OSError:
+                is_dir = False
+            (dir_entries if is_dir else file_entries).append(entry)
+
+        yield dir_path, relative_dir, depth, dir_entries, file_entries
+
+        relative_prefix = relative_dir + os.sep if relative_dir else ""
+        for entry in reversed(dir_entries):  # Reversed so the stack pops in listing order
+            if not follow_symlinks and entry.is_symlink():
+                continue
+            stack.append((entry.path, relative_prefix + entry.name, depth + 1))
+
+
+class _IndexEntry(NamedTuple):
+    """The parts of os.DirEntry the traversal uses, for a path listed by the git index."""
+
+    name: str
+    path: str
+    symlink: bool  # From the index entry's mode, so filtering needs no lstat
+
+    def is_symlink(self) -> bool:
+        return self.symlink
+
+    def stat(self) -> os.stat_result:
+        return os.stat(self.path)
+
+
+def _git_index_walk(top: str, git_entries: List[GitFileEntry]) -> Generator[WalkLevel, None, None]:
+    """
+    Replays a list of files from the git index as a top-down walk with the same shape
+    as _scandir_walk, so the usual depth, pattern and read pipeline applies unchanged.
+    Only directories containing listed files exist; nothing is read from disk.
+    """
+    FolderTrie = Tuple[Dict[str, Any], List[Tuple[str, bool]]]  # (subfolders, files)
+    root: FolderTrie = ({}, [])
+    for relative_path, is_symlink in git_entries:
+        *dir_names, file_name = relative_path.split("/")
+        folder = root
+        for dir_name in dir_names:
+            folder = folder[0].setdefault(dir_name, ({}, []))
+        folder[1].append((file_name, is_symlink))
+
+    stack: List[Tuple[str, str, int, FolderTrie]] = [(top, "", 0, root)]
+    while stack:
+        dir_path, relative_dir, depth, (subfolders, files) = stack.pop()
+        dir_entries = [
+            _IndexEntry(name, os.path.join(dir_path, name), False) for name in subfolders
+        ]
+        file_entries = [
+            _IndexEntry(name, os.path.join(dir_path, name), is_symlink) for name, is_symlink in files
+        ]
+
+        yield dir_path, relative_dir, depth, dir_entries, file_entries
+
+        relative_prefix = relative_dir + os.sep if relative_dir else ""
+        for entry in reversed(dir_entries):  # The caller may have pruned dir_entries
+            stack.append(
+                (entry.path, relative_prefix + entry.name, depth + 1, subfolders[entry.name])
+            )
+
+
+FileId = Tuple[int, int]  # (st_dev, st_ino)
+
+
+class SharedFileRegistry:
+    """
+    Records which path first claimed each (device, inode) in a multi-root run, so a
+    file reachable from several roots (or via symlinks and hard links) is read once.
+    Safe to share between the traversals of all roots.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._owners: Dict[FileId, str] = {}
+
+    def claim(self, file_id: FileId, path: str) -> Optional[str]:
+        """Claims file_id for path. Returns the path that claimed it first, or None if this one did."""
+        with self._lock:
+            owner = self._owners.setdefault(file_id, path)
+        return None if owner == path else owner
+
+
+class Exclusion(NamedTuple):
+    """
+    An item left out of the digest, as passed to on_excluded. reason is one of:
+    "symlink", "hidden", "exclude_pattern", "default_ignore", "ignore_file",
+    "not_included", "max_depth", "symlink_loop", "max_size", "binary",
+    "decode_error", "read_error" or "limit".
+    """
+
+    relative_path: str
+    item_type: str  # "file" or "directory"
+    reason: str
+    detail: str  # Human-readable reason, as logged
+    pattern: Optional[str] = None  # The pattern or ignore rule that matched
+    source: Optional[str] = None  # The ignore file the rule came from
+
+
+class TraversalLimits:
+    """
+    Whole-digest budgets (number of files, total file size) enforced while the
+    traversal runs. Shared by the traversals of a multi-root digest.
+    """
+
+    def __init__(self, max_files: int | None = None, max_total_size_kb: int | None = None):
+        self.max_files = max_files
+        self.max_total_size_kb = max_total_size_kb
+        self.files_count = 0
+        self.total_size_bytes = 0
+        self.reached: str | None = None  # Why the traversal stopped, once a budget is hit
+        self._lock = threading.Lock()
+
+    def admit(self, size_bytes: int) -> bool:
+        """Counts a file against the budgets. Returns False (and sets reached) if it does not fit."""
+        with self._lock:
+            if self.reached is not None:
+                return False
+            if self.max_files is not None and self.files_count >= self.max_files:
+                self.reached = f"Reached max files ({self.max_files})"
+            elif (
+                self.max_total_size_kb is not None
+                and self.total_size_bytes + size_bytes > self.max_total_size_kb * 1024
+            ):
+                self.reached = f"Reached max total size ({self.max_total_size_kb}KB)"
+            else:
+                self.files_count += 1
+                self.total_size_bytes += size_bytes
+                return True
+        return False
+
+
+def _stat_and_read(
+    file_entry: os.DirEntry,
+    max_size_bytes: int,
+    content_cache: AnyContentCache | None = None,
+    lazy_content: bool = False,
+    tokenizer: Tokenizer | None = None,
+    shared_files: SharedFileRegistry | None = None,
+    metrics: RunMetrics = NULL_METRICS,
+) -> FileReadResult:
+    """
+    Stats a file and, if it is within max_size_bytes, reads it as strict UTF-8,
+    or takes content from content_cache when the file is unchanged.
+    With lazy_content, the content is a LazyContent handle and nothing is read.
+    With a tokenizer, the content's token count is computed once here (or taken
+    from content_cache) and returned as token_count.
+    With shared_files, a file whose (device, inode) was already claimed by another
+    path is not read: its file_id is returned with duplicate_of set to that path.
+    Uses the DirEntry's stat cache where the platform provides one.
+    Runs on worker threads in parallel mode, so it must not log or touch shared
+    state other than metrics, which is thread-safe; the caller interprets the
+    returned size, content and error.
+
+    error_kind is None, "binary" (binary extension or leading bytes; see _read_text),
+    "decode" (not valid UTF-8) or "os" (stat/open/read failed).
+    """
+    result: FileReadResult = {
+        "size_bytes": None,
+        "mtime_ns": None,
+        "content": None,
+        "error_kind": None,
+        "error_message": None,
+        "token_count": None,
+        "file_id": None,
+        "duplicate_of": None,
+    }
+    try:
+        with metrics.phase("stat"):
+            file_stat = file_entry.stat()
+        metrics.count("stat_calls")
+        result["size_bytes"] = file_stat.st_size
+        result["mtime_ns"] = file_stat.st_mtime_ns
+        if file_stat.st_size > max_size_bytes:
+            return result
+
+        binary_reason = _binary_extension_reason(file_entry.name)
+        if binary_reason is not None:
+            result["error_kind"] = "binary"
+            result["error_message"] = binary_reason
+            return result
+
+        if shared_files is not None:
+            result["file_id"] = (file_stat.st_dev, file_stat.st_ino)
+            result["duplicate_of"] = shared_files.claim(result["file_id"], file_entry.path)
+            if result["duplicate_of"] is not None:
+                return result
+
+        if lazy_content:
+            result["content"] = LazyContent(
+                file_entry.path, file_stat.st_size, file_stat.st_mtime_ns
+            )
+            return result
+
+        if content_cache is not None:
+            with metrics.phase("cache"):
+                cached = content_cache.get(file_entry.path, file_stat)
+            metrics.count("cache_misses" if cached is None else "cache_hits")
+            if cached is not None:
+                result["content"] = cached["content"]
+                if cached["read_error"] is not None:
+                    result["error_kind"] = "decode"
+                    result["error_message"] = cached["read_error"]
+                elif tokenizer is not None:
+                    token_counts = cached["token_counts"]
+                    if tokenizer.cache_key not in token_counts:  # First run with this tokenizer
+                        with metrics.phase("token_count"):
+                            token_count = tokenizer.count(cached["content"])
+                        token_counts = {**token_counts, tokenizer.cache_key: token_count}
+                        content_cache.put(
+                            file_entry.path, file_stat, cached["content"], None, token_counts
+                        )
+                    result["token_count"] = token_counts[tokenizer.cache_key]
+                return result
+
+        try:
+            metrics.count("files_opened")
+            with metrics.phase("read"), open(file_entry.path, "rb") as f:
+                result["content"] = _read_text(f, file_stat.st_size)
+            metrics.count("bytes_read", file_stat.st_size)
+        except BinaryContentError as e:
+            # Sniffing is cheaper than a cache lookup, so binary verdicts are not cached
+            result["error_kind"] = "binary"
+            result["error_message"] = str(e)
+            return result
+        except UnicodeDecodeError as e:
+            result["error_kind"] = "decode"
+            result["error_message"] = str(e)
+        if tokenizer is not None and result["content"] is not None:
+            with metrics.phase("token_count"):
+                result["token_count"] = tokenizer.count(result["content"])
+        # Decode errors are a property of the bytes, so they are cached like content
+        if content_cache is not None:
+            content_cache.put(
+                file_entry.path,
+                file_stat,
+                result["content"],
+                result["error_message"],
+                {tokenizer.cache_key: result["token_count"]} if result["token_count"] is not None else None,
+            )
+    except OSError as e:
+        result["error_kind"] = "os"
+        result["error_message"] = str(e)
+    return result
+
+
+def _credit_directory_tokens(
+    directory_token_counts: Dict[str, int], relative_file_path: str, token_count: int
+) -> None:
+    """Adds a file's token_count (negative to withdraw it) to every ancestor directory, up to "."."""
+    relative_dir = relative_file_path
+    while relative_dir:
+        relative_dir = os.path.dirname(relative_dir)
+        directory_key = relative_dir or "."
+        directory_token_counts[directory_key] = (
+            directory_token_counts.get(directory_key, 0) + token_count
+        )
 
 
 def process_directory_recursive(
@@ -23,15 +477,106 @@ def process_directory_recursive(
     follow_symlinks: bool,
     max_size_kb: int,
     ignore_read_errors: bool,
+    workers: int | None = None,
+    content_cache: AnyContentCache | None = None,
+    on_directory: Callable[[str], None] | None = None,
+    lazy_content: bool = False,
+    tokenizer: Tokenizer | None = None,
+    git: bool = False,
+    git_untracked: bool = False,
+    ignore_files: bool = False,
+    shared_files: SharedFileRegistry | None = None,
+    dedup_content: bool = False,
+    max_files: int | None = None,
+    max_total_size_kb: int | None = None,
+    limits: TraversalLimits | None = None,
+    metrics: RunMetrics | None = None,
+    on_excluded: Callable[[Exclusion], None] | None = None,
+    only_paths: Collection[str] | None = None,
 ) -> Tuple[Generator[ProcessedItem, None, None], TraversalStats]:
     """
     Recursively traverses a directory, filters files and folders,
     and yields processed file items along with collected traversal statistics.
+
+    With workers > 1, stat/read/decode of included files runs on a thread pool
+    while the walk continues; items are still yielded in walk order, so the
+    resulting digest is identical to a serial run.
+
+    If content_cache is given, files whose fingerprint is unchanged since an
+    earlier run are served from it instead of being read and decoded again.
+    on_directory, if given, is called with the path of every directory walked.
+
+    With lazy_content, files are only stat'ed: each item's "content" is a
+    LazyContent handle that formatters resolve when they emit the file, so
+    read and decode errors surface at output time instead of here.
+
+    With a tokenizer, each read file's token count is stored as "token_count",
+    and stats gains "tokenizer" and "directory_token_counts" (tokens per relative
+    directory, including subdirectories; "." is the total). Lazy files are not
+    counted, as their content is not read here.
+
+    With git, files are enumerated from the git index instead of walking the
+    directory (plus untracked, non-ignored files with git_untracked); they then
+    go through the same filters. If the directory is not in a git work tree, the
+    directory is walked as usual.
+
+    With ignore_files, each directory's .gitignore and .dirdigestignore files
+    (IGNORE_FILENAMES) are compiled when the directory is entered and apply to
+    everything below it, with gitignore precedence and negation; ignored
+    directories are pruned before descent. Inside a git work tree, ignore files
+    above base_dir_path and .git/info/exclude apply as well. In git mode only
+    .dirdigestignore files are read, as git has applied the rest.
+
+    With follow_symlinks, every directory walked is recorded by (st_dev, st_ino),
+    and a symlinked directory whose target is one of its own ancestors is pruned
+    as a loop (counted in stats as "symlink_loops_count"). Links to directories
+    digested elsewhere in the tree are still followed.
+
+    shared_files is used by process_directories: read files record their
+    "file_id", and files already claimed elsewhere are not read but carry
+    "duplicate_of_path" (the absolute path that claimed them) instead of content.
+
+    With dedup_content, a read file whose content is identical to a file earlier
+    in walk order keeps its place in the tree but carries "duplicate_of" (that
+    file's relative path) instead of content and is not counted towards the
+    token totals; stats gains "duplicate_files_count". Empty files and lazy
+    contents are left alone.
+
+    max_files and max_total_size_kb (the sum of included files' sizes) are
+    enforced as files are included: the first file that does not fit is
+    excluded and the traversal stops there, without reading or walking further.
+    stats then gains "limit_reached" (the reason). process_directories passes
+    limits instead, shared by all roots.
+
+    With metrics, time spent enumerating, filtering, stat'ing, reading and
+    counting tokens is recorded per phase, along with counters such as
+    bytes_read and files_opened (see utils.metrics.RunMetrics).
+
+    on_excluded, if given, is called with an Exclusion for every item counted in
+    "excluded_items_count", from the thread consuming the generator and in walk order.
+
+    only_paths (relative file paths) restricts the traversal to those files: only
+    the directories leading to them are walked, with the same filtering rules and
+    ignore files, and other entries are skipped without being filtered or counted.
+    Listed files that no longer exist are simply not yielded. Used by watch mode
+    to refresh the files that changed.
     """
+    if metrics is None:
+        metrics = NULL_METRICS
+    # Checked once per traversal; per-file and per-directory messages are only built
+    # when a handler would emit them
+    log_debug = logger.isEnabledFor(logging.DEBUG)
+    log_info = logger.isEnabledFor(logging.INFO)
     stats: TraversalStats = {
         "included_files_count": 0,
         "excluded_items_count": 0,
     }
+    # Content -> relative path of the first file with it. The str hash is computed
+    # once per content and cached, and dict lookups confirm hits by comparison,
+    # so a hash collision can never merge two different files.
+    first_path_by_content: Dict[str, str] = {}
+    if dedup_content:
+        stats["duplicate_files_count"] = 0
 
     max_size_bytes = max_size_kb * 1024
     effective_exclude_patterns = list(
@@ -40,6 +585,12 @@ def process_directory_recursive(
     if not no_default_ignore:
         effective_exclude_patterns.extend(DEFAULT_IGNORE_PATTERNS)
 
+    # Compile pattern lists once per traversal instead of re-parsing them per path
+    dir_exclude_set = PatternSet(effective_exclude_patterns)
+    user_exclude_set = PatternSet(exclude_patterns)
+    user_exclude_patterns = frozenset(exclude_patterns)  # Tells them apart in dir_exclude_set
+    include_set = PatternSet(include_patterns)
+
     logger.debug(
         f"Core: Effective exclude patterns count: {len(effective_exclude_patterns)}"
     )
@@ -49,192 +600,493 @@ def process_directory_recursive(
     logger.debug(
         f"Core: Follow symlinks: {follow_symlinks}, No default ignore: {no_default_ignore}"
     )
+    logger.debug(f"Core: Read workers: {workers if workers else 'serial'}")
+    if lazy_content:
+        logger.debug("Core: Lazy content: files are stat'ed only, contents read at output time")
+    directory_token_counts: Dict[str, int] = {}
+    if limits is None and (max_files is not None or max_total_size_kb is not None):
+        limits = TraversalLimits(max_files, max_total_size_kb)
+    if limits is not None:
+        logger.debug(
+            f"Core: Max files: {limits.max_files if limits.max_files is not None else 'unlimited'}, "
+            f"Max total size KB: {limits.max_total_size_kb if limits.max_total_size_kb is not None else 'unlimited'}"
+        )
+    if dedup_content:
+        logger.debug("Core: Files with identical content are emitted once")
+    if tokenizer is not None:
+        logger.debug(f"Core: Counting tokens per file with '{tokenizer.name}'")
+        stats["tokenizer"] = tokenizer.name
+        stats["directory_token_counts"] = directory_token_counts
 
-    def _traverse() -> Generator[ProcessedItem, None, None]:
-        """Nested generator function to handle the actual traversal and yielding."""
-        for root, dirs_orig, files_orig in os.walk(
-            str(base_dir_path), topdown=True, followlinks=follow_symlinks
-        ):
-            current_root_path = pathlib.Path(root)
-            relative_root_path = current_root_path.relative_to(base_dir_path)
-            current_depth = (
-                len(relative_root_path.parts)
-                if relative_root_path != pathlib.Path(".")
-                else 0
+    walk_levels: Generator[WalkLevel, None, None] | None = None
+    if git or git_untracked:
+        try:
+            with metrics.phase("enumerate"):
+                git_entries = list_git_files(base_dir_path, include_untracked=git_untracked)
+            logger.debug(f"Core: Enumerating {len(git_entries)} files from the git index")
+            walk_levels = _git_index_walk(str(base_dir_path), git_entries)
+        except GitIndexError as e:
+            logger.warning(f"Git: {e}; walking the directory instead.")
+    ignore_filenames: Tuple[str, ...] = ()
+    if walk_levels is None:
+        walk_levels = _scandir_walk(str(base_dir_path), follow_symlinks)
+        if ignore_files:
+            ignore_filenames = IGNORE_FILENAMES
+    elif ignore_files:
+        ignore_filenames = GIT_MODE_IGNORE_FILENAMES
+    # Relative path -> (st_dev, st_ino) of every directory walked, to prune symlink loops
+    directory_ids: Dict[str, Tuple[int, int]] = {}
+    if follow_symlinks:
+        stats["symlink_loops_count"] = 0
+        try:
+            base_dir_stat = os.stat(base_dir_path)
+            directory_ids[""] = (base_dir_stat.st_dev, base_dir_stat.st_ino)
+        except OSError:
+            pass
+    only_dirs: Set[str] | None = None
+    if only_paths is not None:
+        only_paths = frozenset(only_paths)
+        only_dirs = {""}
+        for only_path in only_paths:
+            relative_dir = os.path.dirname(only_path)
+            while relative_dir not in only_dirs:
+                only_dirs.add(relative_dir)
+                relative_dir = os.path.dirname(relative_dir)
+    # Rules in force in the top directory, before its own ignore files are read
+    root_ignore_chain: List[IgnoreRules] = []
+    if ignore_filenames:
+        found_work_tree = find_work_tree(base_dir_path)
+        if found_work_tree is not None:
+            root_ignore_chain = load_enclosing_ignore_rules(
+                *found_work_tree,
+                base_dir_path,
+                ignore_filenames,
+                info_exclude=ignore_filenames == IGNORE_FILENAMES,
             )
-            logger.debug(
-                f"Walking: [log.path]{current_root_path}[/log.path], "
-                f"Rel: [log.path]{relative_root_path}[/log.path], Depth: {current_depth}"
+        logger.debug(
+            f"Core: Ignore files: {', '.join(ignore_filenames)}; "
+            f"{len(root_ignore_chain)} apply from enclosing directories"
+        )
+
+    def _exclude(exclusion: Exclusion) -> None:
+        """Counts an excluded item, logs it and passes it on to on_excluded."""
+        stats["excluded_items_count"] += 1
+        if log_info:
+            logger.info(
+                EXCLUDED_LOG_MESSAGE, exclusion.item_type, exclusion.relative_path, exclusion.detail
             )
+        if on_excluded is not None:
+            on_excluded(exclusion)
 
-            # --- Depth Filtering ---
-            if max_depth is not None and current_depth >= max_depth:
-                logger.info(
-                    f"Max depth ({max_depth}) reached at [log.path]{relative_root_path}[/log.path], "
-                    f"pruning its {len(dirs_orig)} subdirectories."
-                )
-                if dirs_orig:
-                    stats["excluded_items_count"] += len(dirs_orig)
-                    for pruned_dir_name in dirs_orig:
-                        logger.debug(
-                            f"[log.excluded]Excluded (due to depth)[/log.excluded]: "
-                            f"[log.path]{relative_root_path / pruned_dir_name}[/log.path] "
-                            f"([log.reason]Exceeds max depth[/log.reason])"
-                        )
-                dirs_orig[:] = []  # Prevent descent
-
-            # --- Directory Filtering ---
-            dirs_to_traverse_next = []
-            for dir_name in dirs_orig:
-                dir_path_obj = current_root_path / dir_name
-                relative_dir_path = relative_root_path / dir_name
-                relative_dir_path_str = str(relative_dir_path)
-                reason_dir_excluded = ""
-
-                if not follow_symlinks and dir_path_obj.is_symlink():
-                    reason_dir_excluded = "Is a symlink (symlink following disabled)"
-                elif is_path_hidden(relative_dir_path) and not no_default_ignore:
-                    reason_dir_excluded = "Is a hidden directory"
-                elif matches_patterns(
-                    relative_dir_path_str, effective_exclude_patterns
-                ):
-                    reason_dir_excluded = (
-                        "Matches an exclude pattern"  # TODO: Log which pattern
-                    )
+    def _finish_file(
+        relative_file_path_str: str, read_result: FileReadResult
+    ) -> ProcessedItem | None:
+        """
+        Turns the outcome of _stat_and_read into a processed item, applying the
+        max-size and read-error rules. Returns None if the file ends up excluded.
+        Always called from the generator's thread, in walk order.
+        """
+        file_attributes: ProcessedItemPayload = {}
+        file_size_bytes = read_result["size_bytes"]
+        if file_size_bytes is not None:
+            actual_size_kb = round(file_size_bytes / 1024, 3)
+            file_attributes["size_kb"] = actual_size_kb
+            file_attributes["mtime_ns"] = read_result["mtime_ns"]
 
-                if reason_dir_excluded:
-                    logger.info(
-                        f"[log.excluded]Excluded directory[/log.excluded]: "
-                        f"[log.path]{relative_dir_path_str}[/log.path] "
-                        f"([log.reason]{reason_dir_excluded}[/log.reason])"
+            if file_size_bytes > max_size_bytes:
+                _exclude(
+                    Exclusion(
+                        relative_file_path_str,
+                        "file",
+                        "max_size",
+                        f"Exceeds max size ({actual_size_kb:.1f}KB > {max_size_kb}KB)",
                     )
-                    stats["excluded_items_count"] += 1
-                    continue
-                dirs_to_traverse_next.append(dir_name)
-            dirs_orig[:] = dirs_to_traverse_next
+                )
+                return None
 
-            # --- File Filtering and Content Reading ---
-            for file_name in files_orig:
-                file_path_obj = current_root_path / file_name
-                relative_file_path = relative_root_path / file_name
-                relative_file_path_str = str(relative_file_path)
-                file_attributes: ProcessedItemPayload = {}
-                reason_file_excluded = ""
-
-                # Determine exclusion reason
-                if not follow_symlinks and file_path_obj.is_symlink():
-                    reason_file_excluded = "Is a symlink (symlink following disabled)"
-                elif is_path_hidden(relative_file_path) and not no_default_ignore:
-                    reason_file_excluded = "Is a hidden file"
-                elif matches_patterns(
-                    relative_file_path_str, exclude_patterns
-                ):  # User excludes
-                    reason_file_excluded = "Matches user-specified exclude pattern"  # TODO: specific pattern
-                elif not no_default_ignore and matches_patterns(
-                    relative_file_path_str, DEFAULT_IGNORE_PATTERNS  # Default excludes
-                ):
-                    reason_file_excluded = (
-                        "Matches default ignore pattern"  # TODO: specific pattern
-                    )
-                elif include_patterns and not matches_patterns(
-                    relative_file_path_str, include_patterns  # User includes
-                ):
-                    reason_file_excluded = "Does not match any include pattern"
-
-                if reason_file_excluded:
-                    logger.info(
-                        f"[log.excluded]Excluded file[/log.excluded]: "
-                        f"[log.path]{relative_file_path_str}[/log.path] "
-                        f"([log.reason]{reason_file_excluded}[/log.reason])"
+        if read_result["file_id"] is not None:
+            file_attributes["file_id"] = read_result["file_id"]
+        error_kind = read_result["error_kind"]
+        if read_result["duplicate_of"] is not None:
+            if log_debug:
+                logger.debug(
+                    f"    Same file as [log.path]{read_result['duplicate_of']}[/log.path], not read again: "
+                    f"[log.path]{relative_file_path_str}[/log.path]"
+                )
+            file_attributes["content"] = None
+            file_attributes["read_error"] = None
+            file_attributes["duplicate_of_path"] = read_result["duplicate_of"]
+        elif error_kind is None and (
+            dedup_content
+            and isinstance(read_result["content"], str)
+            and read_result["content"]
+            and first_path_by_content.setdefault(read_result["content"], relative_file_path_str)
+            != relative_file_path_str
+        ):
+            first_path = first_path_by_content[read_result["content"]]
+            if log_debug:
+                logger.debug(
+                    f"    Same content as [log.path]{first_path}[/log.path], not emitted again: "
+                    f"[log.path]{relative_file_path_str}[/log.path]"
+                )
+            file_attributes["content"] = None
+            file_attributes["read_error"] = None
+            file_attributes["duplicate_of"] = first_path
+            stats["duplicate_files_count"] += 1
+        elif error_kind is None:
+            if log_debug:
+                logger.debug(
+                    f"    Read content for: [log.path]{relative_file_path_str}[/log.path]"
+                )
+            file_attributes["content"] = read_result["content"]
+            file_attributes["read_error"] = None
+            token_count = read_result["token_count"]
+            if token_count is not None:
+                file_attributes["token_count"] = token_count
+                _credit_directory_tokens(directory_token_counts, relative_file_path_str, token_count)
+        else:
+            error_message = read_result["error_message"]
+            if error_kind == "binary":
+                if log_debug:
+                    logger.debug(
+                        f"Binary file [log.path]{relative_file_path_str}[/log.path]: {error_message}"
                     )
-                    stats["excluded_items_count"] += 1
-                    continue
+                reason_code = "binary"
+                reason_read_error = f"Binary file (and ignore_errors=False): {error_message}"
+                read_error_str = f"Binary file: {error_message}"
+            elif error_kind == "decode":
+                logger.warning(
+                    f"Unicode decode error for [log.path]{relative_file_path_str}[/log.path]. "
+                    f"File may be binary or use an unexpected encoding."
+                )
+                reason_code = "decode_error"
+                reason_read_error = (
+                    f"UnicodeDecodeError (and ignore_errors=False): {error_message}"
+                )
+                read_error_str = f"UnicodeDecodeError: {error_message}"
+            else:
+                logger.warning(
+                    f"Read error for [log.path]{relative_file_path_str}[/log.path]: {error_message}"
+                )
+                reason_code = "read_error"
+                reason_read_error = (
+                    f"OS read error (and ignore_errors=False): {error_message}"
+                )
+                read_error_str = error_message
 
-                # Attempt to process file if not excluded by patterns
-                try:
-                    file_stat = file_path_obj.stat()  # Stat once
-                    file_size_bytes = file_stat.st_size
-                    actual_size_kb = round(file_size_bytes / 1024, 3)
-                    file_attributes["size_kb"] = actual_size_kb
-
-                    if file_size_bytes > max_size_bytes:
-                        reason_max_size = f"Exceeds max size ({actual_size_kb:.1f}KB > {max_size_kb}KB)"
+            if not ignore_read_errors:
+                _exclude(Exclusion(relative_file_path_str, "file", reason_code, reason_read_error))
+                return None
+            file_attributes["content"] = None
+            file_attributes["read_error"] = read_error_str
+            file_attributes.setdefault("size_kb", 0.0)  # stat() itself failed
+
+        if limits is not None and not limits.admit(file_size_bytes or 0):
+            if "limit_reached" not in stats:
+                stats["limit_reached"] = limits.reached
+                logger.warning(
+                    f"{limits.reached} at [log.path]{relative_file_path_str}[/log.path]; "
+                    f"stopping the traversal. The digest is incomplete."
+                )
+            _exclude(Exclusion(relative_file_path_str, "file", "limit", limits.reached))
+            return None
+
+        # If all checks passed and content (or error placeholder) is ready
+        if log_info:
+            logger.info(
+                f"[log.included]Included file[/log.included]: "
+                f"[log.path]{relative_file_path_str}[/log.path] "
+                f"(Size: {file_attributes.get('size_kb', 0):.1f}KB)"
+            )
+        stats["included_files_count"] += 1
+        # The relative path only becomes a pathlib.Path here, at the API boundary
+        return (pathlib.Path(relative_file_path_str), "file", file_attributes)
+
+    def _file_exclusion(
+        file_entry: os.DirEntry, relative_file_path_str: str, ignore_chain: List[IgnoreRules]
+    ) -> Exclusion | None:
+        """Returns why a file is excluded by the symlink, hidden, pattern and ignore-file rules, or None."""
+        if not follow_symlinks and file_entry.is_symlink():
+            return Exclusion(
+                relative_file_path_str, "file", "symlink", "Is a symlink (symlink following disabled)"
+            )
+        if file_entry.name.startswith(".") and not no_default_ignore:
+            return Exclusion(relative_file_path_str, "file", "hidden", "Is a hidden file")
+        pattern = user_exclude_set.match(relative_file_path_str)  # User excludes
+        if pattern is not None:
+            return Exclusion(
+                relative_file_path_str,
+                "file",
+                "exclude_pattern",
+                f"Matches user-specified exclude pattern '{pattern}'",
+                pattern,
+            )
+        if not no_default_ignore:  # Default excludes
+            pattern = DEFAULT_IGNORE_PATTERN_SET.match(relative_file_path_str)
+            if pattern is not None:
+                return Exclusion(
+                    relative_file_path_str,
+                    "file",
+                    "default_ignore",
+                    f"Matches default ignore pattern '{pattern}'",
+                    pattern,
+                )
+        if ignore_chain and (
+            ignore_rule := match_ignore_rules(ignore_chain, relative_file_path_str, False)
+        ) and not ignore_rule.negated:
+            return Exclusion(
+                relative_file_path_str,
+                "file",
+                "ignore_file",
+                f"Matches ignore rule '{ignore_rule.pattern}' in {ignore_rule.source}",
+                ignore_rule.pattern,
+                ignore_rule.source,
+            )
+        if include_set and not include_set.matches(relative_file_path_str):  # User includes
+            return Exclusion(
+                relative_file_path_str, "file", "not_included", "Does not match any include pattern"
+            )
+        return None
+
+    def _walk_and_read(
+        read_pool: ThreadPoolExecutor | None,
+    ) -> Generator[ProcessedItem, None, None]:
+        """Walks and filters the tree, reading included files inline or on read_pool."""
+        pending_reads: Deque[Tuple[str, "Future[FileReadResult]"]] = deque()
+        max_pending_reads = (workers or 1) * READ_AHEAD_PER_WORKER
+        # Ignore rules in force for directories still waiting to be walked, by relative path
+        pending_ignore_chains: Dict[str, List[IgnoreRules]] = {}
+
+        for (
+            current_root,
+            relative_root,
+            current_depth,
+            dir_entries,
+            file_entries,
+        ) in metrics.timed(walk_levels, "enumerate"):
+            if limits is not None and limits.reached is not None:
+                return  # Budget spent: nothing below here will be read, so stop walking
+            metrics.count("directories_scanned")
+            metrics.count("entries_scanned", len(dir_entries) + len(file_entries))
+            if log_debug:
+                logger.debug(
+                    f"Walking: [log.path]{current_root}[/log.path], "
+                    f"Rel: [log.path]{relative_root or '.'}[/log.path], Depth: {current_depth}"
+                )
+            relative_prefix = relative_root + os.sep if relative_root else ""
+            if on_directory is not None:
+                on_directory(current_root)
+
+            with metrics.phase("filter"):
+                # --- Ignore Files ---
+                # A directory's rules are compiled once, here, and inherited by its subdirectories
+                ignore_chain = pending_ignore_chains.pop(relative_root, root_ignore_chain)
+                if ignore_filenames:
+                    ignore_file_entries = {
+                        entry.name: entry for entry in file_entries if entry.name in ignore_filenames
+                    }
+                    for ignore_filename in ignore_filenames:  # In precedence order
+                        if ignore_filename in ignore_file_entries:
+                            rules = IgnoreRules.from_file(
+                                pathlib.Path(ignore_file_entries[ignore_filename].path),
+                                relative_root.replace(os.sep, "/"),
+                            )
+                            if rules is not None:
+                                if log_debug:
+                                    logger.debug(
+                                        f"Loaded {len(rules.rules)} ignore rules from [log.path]{rules.source}[/log.path]"
+                                    )
+                                ignore_chain = ignore_chain + [rules]
+
+                if only_dirs is not None:  # Refreshing some files: nothing else is looked at
+                    dir_entries[:] = [
+                        entry for entry in dir_entries if relative_prefix + entry.name in only_dirs
+                    ]
+                    file_entries = [
+                        entry for entry in file_entries if relative_prefix + entry.name in only_paths
+                    ]
+
+                # --- Depth Filtering ---
+                if max_depth is not None and current_depth >= max_depth:
+                    if log_info:
                         logger.info(
-                            f"[log.excluded]Excluded file[/log.excluded]: "
-                            f"[log.path]{relative_file_path_str}[/log.path] "
-                            f"([log.reason]{reason_max_size}[/log.reason])"
+                            f"Max depth ({max_depth}) reached at [log.path]{relative_root or '.'}[/log.path], "
+                            f"pruning its {len(dir_entries)} subdirectories."
                         )
-                        stats["excluded_items_count"] += 1
-                        continue
+                    if dir_entries:
+                        stats["excluded_items_count"] += len(dir_entries)
+                        if log_debug or on_excluded is not None:
+                            for pruned_dir_entry in dir_entries:
+                                pruned_dir_path_str = relative_prefix + pruned_dir_entry.name
+                                if log_debug:
+                                    logger.debug(
+                                        EXCLUDED_LOG_MESSAGE,
+                                        "(due to depth)",
+                                        pruned_dir_path_str,
+                                        "Exceeds max depth",
+                                    )
+                                if on_excluded is not None:
+                                    on_excluded(
+                                        Exclusion(
+                                            pruned_dir_path_str, "directory", "max_depth", "Exceeds max depth"
+                                        )
+                                    )
+                    dir_entries[:] = []  # Prevent descent
 
-                    logger.debug(
-                        f"    Reading content for: [log.path]{relative_file_path_str}[/log.path]"
-                    )
-                    with open(
-                        file_path_obj, "r", encoding="utf-8", errors="strict"
-                    ) as f:
-                        file_attributes["content"] = f.read()
-                    file_attributes["read_error"] = None
-
-                except OSError as e:
-                    logger.warning(
-                        f"Read error for [log.path]{relative_file_path_str}[/log.path]: {e}"
-                    )
-                    if not ignore_read_errors:
-                        reason_os_error = (
-                            f"OS read error (and ignore_errors=False): {e}"
+                # --- Directory Filtering ---
+                # Hidden checks only need the entry's own name: hidden ancestors were already pruned.
+                dirs_to_traverse_next = []
+                for dir_entry in dir_entries:
+                    relative_dir_path_str = relative_prefix + dir_entry.name
+                    dir_exclusion: Exclusion | None = None
+
+                    if not follow_symlinks and dir_entry.is_symlink():
+                        dir_exclusion = Exclusion(
+                            relative_dir_path_str,
+                            "directory",
+                            "symlink",
+                            "Is a symlink (symlink following disabled)",
                         )
-                        logger.info(
-                            f"[log.excluded]Excluded file[/log.excluded]: "
-                            f"[log.path]{relative_file_path_str}[/log.path] "
-                            f"([log.reason]{reason_os_error}[/log.reason])"
+                    elif dir_entry.name.startswith(".") and not no_default_ignore:
+                        dir_exclusion = Exclusion(
+                            relative_dir_path_str, "directory", "hidden", "Is a hidden directory"
                         )
-                        stats["excluded_items_count"] += 1
-                        continue
-                    file_attributes["content"] = None
-                    file_attributes["read_error"] = str(e)
-                    if "size_kb" not in file_attributes:  # if stat() also failed
-                        try:
-                            file_attributes["size_kb"] = round(
-                                file_path_obj.stat().st_size / 1024, 3
+                    elif (pattern := dir_exclude_set.match(relative_dir_path_str)) is not None:
+                        if pattern in user_exclude_patterns:
+                            dir_exclusion = Exclusion(
+                                relative_dir_path_str,
+                                "directory",
+                                "exclude_pattern",
+                                f"Matches user-specified exclude pattern '{pattern}'",
+                                pattern,
                             )
-                        except OSError:
-                            file_attributes["size_kb"] = 0.0
-
-                except UnicodeDecodeError as e:
-                    logger.warning(
-                        f"Unicode decode error for [log.path]{relative_file_path_str}[/log.path]. "
-                        f"File may be binary or use an unexpected encoding."
-                    )
-                    if not ignore_read_errors:
-                        reason_unicode_error = (
-                            f"UnicodeDecodeError (and ignore_errors=False): {e}"
-                        )
-                        logger.info(
-                            f"[log.excluded]Excluded file[/log.excluded]: "
-                            f"[log.path]{relative_file_path_str}[/log.path] "
-                            f"([log.reason]{reason_unicode_error}[/log.reason])"
+                        else:
+                            dir_exclusion = Exclusion(
+                                relative_dir_path_str,
+                                "directory",
+                                "default_ignore",
+                                f"Matches default ignore pattern '{pattern}'",
+                                pattern,
+                            )
+                    elif ignore_chain and (
+                        ignore_rule := match_ignore_rules(ignore_chain, relative_dir_path_str, True)
+                    ) and not ignore_rule.negated:
+                        dir_exclusion = Exclusion(
+                            relative_dir_path_str,
+                            "directory",
+                            "ignore_file",
+                            f"Matches ignore rule '{ignore_rule.pattern}' in {ignore_rule.source}",
+                            ignore_rule.pattern,
+                            ignore_rule.source,
                         )
-                        stats["excluded_items_count"] += 1
-                        continue
-                    file_attributes["content"] = None
-                    file_attributes["read_error"] = f"UnicodeDecodeError: {e}"
-                    if "size_kb" not in file_attributes:  # if stat() failed
+                    elif follow_symlinks:
                         try:
-                            file_attributes["size_kb"] = round(
-                                file_path_obj.stat().st_size / 1024, 3
-                            )
+                            target_stat = dir_entry.stat()
+                            directory_ids[relative_dir_path_str] = (target_stat.st_dev, target_stat.st_ino)
                         except OSError:
-                            file_attributes["size_kb"] = 0.0
+                            pass
+                        if dir_entry.is_symlink() and relative_dir_path_str in directory_ids:
+                            target_id = directory_ids[relative_dir_path_str]
+                            ancestor = relative_root
+                            while True:  # Up the chain of directories this one was reached through
+                                if directory_ids.get(ancestor) == target_id:
+                                    dir_exclusion = Exclusion(
+                                        relative_dir_path_str,
+                                        "directory",
+                                        "symlink_loop",
+                                        f"Symlink loop (points back to ancestor '{ancestor or '.'}')",
+                                    )
+                                    stats["symlink_loops_count"] += 1
+                                    break
+                                if not ancestor:
+                                    break
+                                ancestor = os.path.dirname(ancestor)
 
-                # If all checks passed and content (or error placeholder) is ready
-                logger.info(
-                    f"[log.included]Included file[/log.included]: "
-                    f"[log.path]{relative_file_path_str}[/log.path] "
-                    f"(Size: {file_attributes.get('size_kb', 0):.1f}KB)"
+                    if dir_exclusion is not None:
+                        _exclude(dir_exclusion)
+                        continue
+                    dirs_to_traverse_next.append(dir_entry)
+                    if ignore_chain is not root_ignore_chain:
+                        pending_ignore_chains[relative_dir_path_str] = ignore_chain
+                dir_entries[:] = dirs_to_traverse_next
+
+            # --- File Filtering and Content Reading ---
+            for file_entry in file_entries:
+                if limits is not None and limits.reached is not None:
+                    break
+                relative_file_path_str = relative_prefix + file_entry.name
+                with metrics.phase("filter"):
+                    file_exclusion = _file_exclusion(file_entry, relative_file_path_str, ignore_chain)
+                    if file_exclusion is not None:
+                        _exclude(file_exclusion)
+                if file_exclusion is not None:
+                    continue
+
+                # Attempt to process file if not excluded by patterns
+                if read_pool is None:
+                    read_result = _stat_and_read(
+                        file_entry,
+                        max_size_bytes,
+                        content_cache,
+                        lazy_content,
+                        tokenizer,
+                        shared_files,
+                        metrics,
+                    )
+                    with metrics.phase("filter"):
+                        processed_item = _finish_file(relative_file_path_str, read_result)
+                    if processed_item is not None:
+                        yield processed_item
+                    continue
+
+                # Parallel mode: the pool reads ahead while results are consumed in walk order
+                pending_reads.append(
+                    (
+                        relative_file_path_str,
+                        read_pool.submit(
+                            _stat_and_read,
+                            file_entry,
+                            max_size_bytes,
+                            content_cache,
+                            lazy_content,
+                            tokenizer,
+                            shared_files,
+                            metrics,
+                        ),
+                    )
                 )
-                stats["included_files_count"] += 1
-                yield (relative_file_path, "file", file_attributes)
+                if len(pending_reads) > max_pending_reads:
+                    pending_path, pending_future = pending_reads.popleft()
+                    with metrics.phase("read_wait"):
+                        read_result = pending_future.result()
+                    with metrics.phase("filter"):
+                        processed_item = _finish_file(pending_path, read_result)
+                    if processed_item is not None:
+                        yield processed_item
+
+        while pending_reads:
+            if limits is not None and limits.reached is not None:
+                return  # Pending reads are cancelled when the pool shuts down
+            pending_path, pending_future = pending_reads.popleft()
+            with metrics.phase("read_wait"):
+                read_result = pending_future.result()
+            with metrics.phase("filter"):
+                processed_item = _finish_file(pending_path, read_result)
+            if processed_item is not None:
+                yield processed_item
+
+    def _traverse() -> Generator[ProcessedItem, None, None]:
+        """Nested generator function to handle the actual traversal and yielding."""
+        if not workers or workers <= 1:
+            yield from _walk_and_read(None)
+        else:
+            read_pool = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="dirdigest-read"
+            )
+            try:
+                yield from _walk_and_read(read_pool)
+            finally:
+                read_pool.shutdown(wait=True, cancel_futures=True)
 
         logger.debug(
             f"Core _traverse generator finished. Final stats collected by _traverse: {stats}"
@@ -243,6 +1095,237 @@ def process_directory_recursive(
     return _traverse(), stats
 
 
+def common_base_dir(base_dir_paths: List[pathlib.Path]) -> pathlib.Path:
+    """The deepest directory containing every root of a multi-root digest."""
+    return pathlib.Path(os.path.commonpath([str(path.resolve()) for path in base_dir_paths]))
+
+
+def process_directories(
+    base_dir_paths: List[pathlib.Path],
+    **traversal_options: Any,
+) -> Tuple[Generator[ProcessedItem, None, None], TraversalStats]:
+    """
+    Traverses several roots concurrently (one thread per root, each running
+    process_directory_recursive with traversal_options) and yields their items as
+    one digest, relative to common_base_dir(base_dir_paths), in root order.
+
+    Files are deduplicated by (device, inode) across all roots: each is read once,
+    by whichever traversal reaches it first. In the merged output the first path in
+    digest order carries the content and every other path gets "duplicate_of"
+    (that path) and no content. The merge waits for all roots to finish.
+
+    max_files and max_total_size_kb apply to all roots together; which files fit
+    is then decided by the order in which the concurrent traversals reach them.
+
+    With dedup_content in traversal_options, files with identical content are
+    deduplicated across all roots the same way, after merging, so the first copy
+    in digest order is the one emitted.
+
+    on_excluded in traversal_options receives every root's exclusions, with paths
+    relative to the common base, in root order once the merge has waited for them;
+    copies of a file excluded by the root that read it follow, with its reason.
+    """
+    traversal_options = dict(traversal_options)
+    dedup_content = traversal_options.pop("dedup_content", False)
+    on_excluded = traversal_options.pop("on_excluded", None)
+    max_files = traversal_options.pop("max_files", None)
+    max_total_size_kb = traversal_options.pop("max_total_size_kb", None)
+    if max_files is not None or max_total_size_kb is not None:
+        traversal_options["limits"] = TraversalLimits(max_files, max_total_size_kb)
+    # A root inside another root adds nothing but path collisions
+    resolved_roots = [path.resolve() for path in base_dir_paths]
+    base_dir_paths = [
+        path
+        for index, (path, resolved) in enumerate(zip(base_dir_paths, resolved_roots))
+        if resolved not in resolved_roots[:index]
+        and not any(other in resolved.parents for other in resolved_roots)
+    ]
+    base_dir = common_base_dir(base_dir_paths)
+    stats: TraversalStats = {
+        "included_files_count": 0,
+        "excluded_items_count": 0,
+        "duplicate_files_count": 0,
+        "roots": [],
+    }
+    shared_files = SharedFileRegistry()
+
+    def _traverse_root(
+        root: pathlib.Path,
+    ) -> Tuple[List[ProcessedItem], TraversalStats, List[Exclusion]]:
+        root_exclusions: List[Exclusion] = []
+        items_generator, root_stats = process_directory_recursive(
+            base_dir_path=root,
+            shared_files=shared_files,
+            on_excluded=root_exclusions.append if on_excluded is not None else None,
+            **traversal_options,
+        )
+        return list(items_generator), root_stats, root_exclusions
+
+    def _merge() -> Generator[ProcessedItem, None, None]:
+        merged: List[Tuple[str, ProcessedItemPayload]] = []
+        # Excluded files by their path on disk, to explain copies of them dropped below
+        excluded_files: Dict[str, Exclusion] = {}
+        with ThreadPoolExecutor(
+            max_workers=len(base_dir_paths), thread_name_prefix="dirdigest-root"
+        ) as root_pool:
+            futures = [root_pool.submit(_traverse_root, root) for root in base_dir_paths]
+            for root, future in zip(base_dir_paths, futures):
+                root_items, root_stats, root_exclusions = future.result()
+                prefix = os.path.relpath(root.resolve(), base_dir)
+                prefix = "" if prefix == "." else prefix
+                if on_excluded is not None:
+                    for exclusion in root_exclusions:
+                        if exclusion.item_type == "file":
+                            excluded_files[os.path.normpath(os.path.join(root, exclusion.relative_path))] = (
+                                exclusion
+                            )
+                        on_excluded(
+                            exclusion._replace(relative_path=os.path.join(prefix, exclusion.relative_path))
+                            if prefix
+                            else exclusion
+                        )
+                stats["roots"].append(prefix or ".")
+                stats["included_files_count"] += root_stats["included_files_count"]
+                stats["excluded_items_count"] += root_stats["excluded_items_count"]
+                if "limit_reached" in root_stats:
+                    stats["limit_reached"] = root_stats["limit_reached"]
+                if "symlink_loops_count" in root_stats:
+                    stats["symlink_loops_count"] = (
+                        stats.get("symlink_loops_count", 0) + root_stats["symlink_loops_count"]
+                    )
+                if "tokenizer" in root_stats:
+                    stats["tokenizer"] = root_stats["tokenizer"]
+                    directory_token_counts = stats.setdefault("directory_token_counts", {})
+                    for relative_dir, token_count in root_stats["directory_token_counts"].items():
+                        merged_dirs = [os.path.join(prefix, relative_dir) if relative_dir != "." else prefix]
+                        if relative_dir == ".":  # The root's total also counts towards its ancestors
+                            ancestor = prefix
+                            while ancestor:
+                                ancestor = os.path.dirname(ancestor)
+                                merged_dirs.append(ancestor)
+                        for merged_dir in merged_dirs:
+                            merged_dir = merged_dir or "."
+                            directory_token_counts[merged_dir] = (
+                                directory_token_counts.get(merged_dir, 0) + token_count
+                            )
+                for relative_path, _item_type, attributes in root_items:
+                    merged_path = os.path.join(prefix, relative_path) if prefix else str(relative_path)
+                    merged.append((merged_path, attributes))
+
+        # Group paths by file; the first in digest order becomes the primary copy
+        paths_by_file_id: Dict[FileId, List[int]] = {}
+        for index, (_merged_path, attributes) in enumerate(merged):
+            file_id = attributes.pop("file_id", None)
+            if file_id is not None:
+                paths_by_file_id.setdefault(file_id, []).append(index)
+        dropped_indexes = set()
+        for indexes in paths_by_file_id.values():
+            readers = [i for i in indexes if "duplicate_of_path" not in merged[i][1]]
+            if not readers:  # The path that read it was excluded (read error), so are its copies
+                dropped_indexes.update(indexes)
+                if on_excluded is not None:
+                    for index in indexes:
+                        merged_path, attributes = merged[index]
+                        claimer_path = attributes["duplicate_of_path"]
+                        claimer = excluded_files.get(os.path.normpath(claimer_path))
+                        reason = claimer.reason if claimer is not None else "read_error"
+                        detail = f"Same file as {claimer_path}, excluded" + (
+                            f" ({claimer.detail})" if claimer is not None else ""
+                        )
+                        on_excluded(Exclusion(merged_path, "file", reason, detail))
+                continue
+            primary_index, reader_index = indexes[0], readers[0]
+            if reader_index != primary_index:  # Another root got there first; move its content
+                primary_attributes = merged[primary_index][1]
+                reader_attributes = merged[reader_index][1]
+                for key in ("content", "read_error", "token_count"):
+                    if key in reader_attributes:
+                        primary_attributes[key] = reader_attributes.pop(key)
+            merged[primary_index][1].pop("duplicate_of_path", None)
+            for duplicate_index in indexes[1:]:
+                duplicate_attributes = merged[duplicate_index][1]
+                duplicate_attributes.pop("duplicate_of_path", None)
+                duplicate_attributes.pop("token_count", None)
+                duplicate_attributes["content"] = None
+                duplicate_attributes["duplicate_of"] = merged[primary_index][0]
+                stats["duplicate_files_count"] += 1
+        if dropped_indexes:
+            stats["included_files_count"] -= len(dropped_indexes)
+            stats["excluded_items_count"] += len(dropped_indexes)
+
+        if dedup_content:
+            first_path_by_content: Dict[str, str] = {}
+            for index, (merged_path, attributes) in enumerate(merged):
+                content = attributes.get("content")
+                if index in dropped_indexes or not isinstance(content, str) or not content:
+                    continue
+                first_path = first_path_by_content.setdefault(content, merged_path)
+                if first_path == merged_path:
+                    continue
+                attributes["content"] = None
+                attributes["duplicate_of"] = first_path
+                token_count = attributes.pop("token_count", None)
+                if token_count is not None:
+                    _credit_directory_tokens(stats["directory_token_counts"], merged_path, -token_count)
+                stats["duplicate_files_count"] += 1
+
+        for index, (merged_path, attributes) in enumerate(merged):
+            if index not in dropped_indexes:
+                yield (pathlib.Path(merged_path), "file", attributes)
+
+    return _merge(), stats
+
+
+def file_node_from_item(relative_path: str, attributes: ProcessedItemPayload) -> DigestItemNode:
+    """Creates the tree node for a processed file item."""
+    file_node: DigestItemNode = {
+        "relative_path": relative_path,
+        "type": "file",
+        "size_kb": attributes.get("size_kb", 0.0),
+    }
+    if "content" in attributes:  # Content could be None
+        file_node["content"] = attributes["content"]
+    if attributes.get("read_error"):
+        file_node["read_error"] = attributes["read_error"]
+    if attributes.get("token_count") is not None:
+        file_node["token_count"] = attributes["token_count"]
+    if attributes.get("omitted_reason"):
+        file_node["omitted_reason"] = attributes["omitted_reason"]
+    if attributes.get("duplicate_of"):
+        file_node["duplicate_of"] = attributes["duplicate_of"]
+    return file_node
+
+
+def digest_metadata(
+    base_dir_path: pathlib.Path, stats: TraversalStats, total_content_size_kb: float
+) -> Dict[str, Any]:
+    """Combines traversal statistics into the metadata passed to output formatters."""
+    metadata = {
+        "base_directory": str(base_dir_path.resolve()),
+        "included_files_count": stats.get("included_files_count", 0),
+        "excluded_files_count": stats.get("excluded_items_count", 0),
+        "total_content_size_kb": round(total_content_size_kb, 3),
+    }
+    if "tokenizer" in stats:
+        directory_token_counts = stats.get("directory_token_counts", {})
+        metadata["token_counts"] = {
+            "tokenizer": stats["tokenizer"],
+            "total": directory_token_counts.get(".", 0),
+            "directories": dict(sorted(directory_token_counts.items())),
+        }
+    if "token_budget" in stats:  # Set by budget.apply_token_budget
+        metadata["token_budget"] = stats["token_budget"]
+    if stats.get("roots"):  # Set by process_directories
+        metadata["roots"] = stats["roots"]
+    if stats.get("duplicate_files_count"):
+        metadata["duplicate_files_count"] = stats["duplicate_files_count"]
+    if stats.get("symlink_loops_count"):
+        metadata["symlink_loops_count"] = stats["symlink_loops_count"]
+    if stats.get("limit_reached"):  # The traversal stopped early
+        metadata["limit_reached"] = stats["limit_reached"]
+    return metadata
+
+
 def build_digest_tree(
     base_dir_path: pathlib.Path,
     processed_items_generator: Generator[ProcessedItem, None, None],
@@ -254,6 +1337,26 @@ def build_digest_tree(
     """
     root_node: DigestItemNode = {"relative_path": ".", "type": "folder", "children": []}
     current_total_content_size_kb = 0.0
+    # Relative folder path -> folder node, so each file finds its parent in O(1)
+    folder_index: Dict[str, DigestItemNode] = {"": root_node}
+
+    def get_or_create_folder(relative_dir: str) -> DigestItemNode:
+        """Returns the folder node for relative_dir, creating missing ancestors."""
+        folder_node = folder_index.get(relative_dir)
+        if folder_node is not None:
+            return folder_node
+        missing_dirs = [relative_dir]  # Iterative, so very deep trees cannot hit the recursion limit
+        parent_dir = os.path.dirname(relative_dir)
+        while parent_dir not in folder_index:
+            missing_dirs.append(parent_dir)
+            parent_dir = os.path.dirname(parent_dir)
+        folder_node = folder_index[parent_dir]
+        for missing_dir in reversed(missing_dirs):
+            child_node: DigestItemNode = {"relative_path": missing_dir, "type": "folder", "children": []}
+            folder_node["children"].append(child_node)
+            folder_index[missing_dir] = child_node
+            folder_node = child_node
+        return folder_node
 
     for relative_path, item_type, attributes in processed_items_generator:
         # This function currently only processes "file" items from the generator
@@ -262,60 +1365,15 @@ def build_digest_tree(
             if attributes.get("size_kb") is not None:
                 current_total_content_size_kb += attributes["size_kb"]
 
-            parts = list(relative_path.parts)
-            current_level_children = root_node["children"]
-            current_path_so_far = pathlib.Path(".")
+            relative_path_str = str(relative_path)
+            parent_node = get_or_create_folder(os.path.dirname(relative_path_str))
+            parent_node["children"].append(file_node_from_item(relative_path_str, attributes))
 
-            # Create parent directory nodes as needed
-            for i, part_name in enumerate(parts[:-1]):
-                current_path_so_far = current_path_so_far / part_name
-                folder_node = next(
-                    (
-                        child
-                        for child in current_level_children
-                        if child["relative_path"] == str(current_path_so_far)
-                        and child["type"] == "folder"
-                    ),
-                    None,
-                )
-                if not folder_node:
-                    folder_node = {
-                        "relative_path": str(current_path_so_far),
-                        "type": "folder",
-                        "children": [],
-                    }
-                    current_level_children.append(folder_node)
-                current_level_children = folder_node["children"]
-
-            # Add the file node
-            file_node: DigestItemNode = {
-                "relative_path": str(relative_path),
-                "type": "file",
-                "size_kb": attributes.get("size_kb", 0.0),
-            }
-            if "content" in attributes:  # Content could be None
-                file_node["content"] = attributes["content"]
-            if attributes.get("read_error"):
-                file_node["read_error"] = attributes["read_error"]
-
-            current_level_children.append(file_node)
-
-    def sort_children_recursive(node: DigestItemNode):
-        """Sorts children of a node by relative_path for consistent output."""
-        if node.get("type") == "folder" and "children" in node:
-            node["children"].sort(key=lambda x: x["relative_path"])
-            for child in node["children"]:
-                sort_children_recursive(child)
-
-    sort_children_recursive(root_node)
-
-    # Prepare final metadata for output formatters
-    final_metadata = {
-        "base_directory": str(base_dir_path.resolve()),
-        "included_files_count": initial_stats.get("included_files_count", 0),
-        "excluded_files_count": initial_stats.get("excluded_items_count", 0),
-        "total_content_size_kb": round(current_total_content_size_kb, 3),
-    }
+    # One sort per folder, once all children are known, for consistent output
+    for folder_node in folder_index.values():
+        folder_node["children"].sort(key=lambda x: x["relative_path"])
+
+    final_metadata = digest_metadata(base_dir_path, initial_stats, current_total_content_size_kb)
     logger.debug(f"build_digest_tree returning metadata: {final_metadata}")
 
     return root_node, final_metadata
@@ -2,14 +2,26 @@
 import json
 import datetime
 from pathlib import Path
-from typing import Any, Dict, List  # Changed from dict, list to Dict, List
+from typing import Any, Dict, Generator, Iterable, Iterator, List, Optional, TextIO, Tuple, Union  # Changed from dict, list to Dict, List
 
 from dirdigest.constants import TOOL_VERSION  # Import TOOL_VERSION
-from dirdigest.core import DigestItemNode  # Import the type hint
+from dirdigest import core
+from dirdigest.core import BinaryContentError, DigestItemNode, LazyContent, ProcessedItem, TraversalStats  # Import the type hint
+from dirdigest.utils.logger import logger
 
 # Define a common structure for metadata earlier if not already defined elsewhere
 Metadata = Dict[str, Any]
 
+# Metadata that core.digest_metadata adds only when the run produced it
+OPTIONAL_SUMMARY_KEYS = (
+    "token_counts",
+    "token_budget",
+    "roots",
+    "duplicate_files_count",
+    "symlink_loops_count",
+    "limit_reached",
+)
+
 
 class BaseFormatter:
     """Base class for output formatters."""
@@ -39,6 +51,39 @@ class BaseFormatter:
         """
         raise NotImplementedError("Subclasses must implement this method.")
 
+    def format_stream(self, data_tree: DigestItemNode, fileobj: TextIO) -> None:
+        """
+        Writes the formatted data_tree to fileobj (anything with a write(str) method).
+        Formatters that can emit incrementally override this; the default writes format().
+        """
+        fileobj.write(self.format(data_tree))
+
+    def _resolve_content(
+        self, relative_path: str, content: Any, as_chunks: bool = False
+    ) -> Tuple[Union[str, Iterator[str], None], Optional[str]]:
+        """
+        Returns (content, read_error) for a file node's content value, loading
+        LazyContent handles. The loaded text is not stored back into the node.
+        With as_chunks, a lazily loaded file comes back as an iterator of text chunks
+        (see LazyContent.iter_chunks) instead of one string.
+        """
+        if not isinstance(content, LazyContent):
+            return content, None
+        try:
+            return (content.iter_chunks() if as_chunks else content.load()), None
+        except BinaryContentError as e:
+            logger.debug(f"Binary file [log.path]{relative_path}[/log.path]: {e}")
+            return None, f"Binary file: {e}"
+        except UnicodeDecodeError as e:
+            logger.warning(
+                f"Unicode decode error for [log.path]{relative_path}[/log.path]. "
+                f"File may be binary or use an unexpected encoding."
+            )
+            return None, f"UnicodeDecodeError: {e}"
+        except OSError as e:
+            logger.warning(f"Read error for [log.path]{relative_path}[/log.path]: {e}")
+            return None, str(e)
+
     def _get_file_extension(self, file_path: str) -> str:
         """Helper to get file extension for language hints."""
         return Path(file_path).suffix.lstrip(".").lower()
@@ -89,45 +134,47 @@ class BaseFormatter:
                     lines.append(f"{indent}{prefix}{child_display_name}")
         return lines
 
-    def _collect_file_contents_for_markdown(
-        self, node: DigestItemNode, files_list: List
-    ) -> None:
-        """
-        Recursively collects file paths and contents for Markdown output.
-        Ensures files are collected in a sorted order (traversal order).
-        """
-        if node["type"] == "file" and "content" in node and node["content"] is not None:
-            files_list.append(
-                {
-                    "relative_path": node["relative_path"],
-                    "content": node["content"],
-                    "lang_hint": self._get_file_extension(node["relative_path"]),
-                }
-            )
-        elif node["type"] == "file" and node.get("read_error"):
-            files_list.append(
-                {
-                    "relative_path": node["relative_path"],
-                    "content": f"Error reading file: {node['read_error']}",
-                    "lang_hint": "text",  # Or no hint
-                }
-            )
-
-        if node["type"] == "folder" and "children" in node:
-            # Children are already sorted by build_digest_tree
+    def _iter_file_nodes(
+        self, node: DigestItemNode
+    ) -> Generator[DigestItemNode, None, None]:
+        """Yields file nodes in traversal order (children are already sorted)."""
+        if node["type"] == "file":
+            yield node
+        elif node["type"] == "folder" and "children" in node:
             for child in node["children"]:
-                self._collect_file_contents_for_markdown(child, files_list)
+                yield from self._iter_file_nodes(child)
 
 
 class JsonFormatter(BaseFormatter):
     """Formats the directory digest as JSON."""
 
+    def _with_resolved_content(self, node: DigestItemNode) -> DigestItemNode:
+        """
+        Returns node with LazyContent handles replaced by the file contents (or
+        read errors). Only nodes that need it are copied; data_tree is not modified.
+        """
+        if node.get("type") == "folder" and "children" in node:
+            children = [self._with_resolved_content(child) for child in node["children"]]
+            if all(new is old for new, old in zip(children, node["children"])):
+                return node
+            return {**node, "children": children}
+        if isinstance(node.get("content"), LazyContent):
+            content, read_error = self._resolve_content(node["relative_path"], node["content"])
+            resolved_node = {**node, "content": content}
+            if read_error:
+                resolved_node["read_error"] = read_error
+            return resolved_node
+        return node
+
     def format(self, data_tree: DigestItemNode) -> str:
         """
         Generates a JSON string representation of the directory digest.
         data_tree is the root_node from core.build_digest_tree.
         """
-        output_data = {"metadata": self.final_metadata, "root": data_tree}
+        output_data = {
+            "metadata": self.final_metadata,
+            "root": self._with_resolved_content(data_tree),
+        }
 
         def default_serializer(obj):
             if isinstance(
@@ -149,47 +196,178 @@ class MarkdownFormatter(BaseFormatter):
         Generates a Markdown string representation of the directory digest.
         data_tree is the root_node from core.build_digest_tree.
         """
-        md_lines = []
+        return "\n".join(self._iter_markdown_lines(data_tree))
+
+    def format_stream(self, data_tree: DigestItemNode, fileobj: TextIO) -> None:
+        """
+        Writes the same Markdown as format() to fileobj piece by piece, fetching each
+        file's content only when it is emitted. Nothing is accumulated, so memory use
+        is bounded by the largest single file rather than the whole digest.
+        Lazily loaded files are written in chunks, so large ones are never held whole.
+        Every write after the first starts at a line boundary.
+        """
+        for line_number, line in enumerate(self._iter_markdown_lines(data_tree, stream_content=True)):
+            if line_number:
+                fileobj.write("\n")
+            if isinstance(line, str):
+                fileobj.write(line)
+            else:
+                for chunk in line:
+                    fileobj.write(chunk)
 
+    def _iter_markdown_lines(
+        self, data_tree: DigestItemNode, stream_content: bool = False
+    ) -> Generator[Union[str, Iterator[str]], None, None]:
+        """
+        Yields the digest as lines to be joined with newlines (a file's content is one line).
+        With stream_content, a lazily loaded file's content is yielded as an iterator of chunks.
+        """
         # 1. Header Section
-        md_lines.append(f"# Directory Digest: {self.final_metadata['base_directory']}")
-        md_lines.append(
-            f"\n*Generated by dirdigest v{self.final_metadata['tool_version']} on {self.final_metadata['created_at']}*"
-        )
-        md_lines.append(
-            f"*Included files: {self.final_metadata['included_files_count']}, Total content size: {self.final_metadata['total_content_size_kb']:.2f} KB*"
-        )
+        yield f"# Directory Digest: {self.final_metadata['base_directory']}"
+        yield f"\n*Generated by dirdigest v{self.final_metadata['tool_version']} on {self.final_metadata['created_at']}*"
+        yield f"*Included files: {self.final_metadata['included_files_count']}, Total content size: {self.final_metadata['total_content_size_kb']:.2f} KB*"
+        roots = self.final_metadata.get("roots")
+        if roots:
+            yield f"*Roots: {', '.join(f'`{root}`' for root in roots)}*"
+        limit_reached = self.final_metadata.get("limit_reached")
+        if limit_reached:
+            yield f"*Incomplete: {limit_reached}; the traversal stopped there.*"
+        token_budget = self.final_metadata.get("token_budget")
+        if token_budget:
+            yield (
+                f"*Token budget: ~{token_budget['estimated_tokens']:,} of {token_budget['max_tokens']:,} tokens; "
+                f"content omitted for {token_budget['omitted_files_count']} file(s), "
+                f"truncated for {token_budget['truncated_files_count']}*"
+            )
         # Add excluded_files_count when available
-        md_lines.append("\n---")
+        yield "\n---"
 
         # 2. Directory Structure Visualization
-        md_lines.append("\n## Directory Structure")
+        yield "\n## Directory Structure"
         # The root node itself ('relative_path': '.') shouldn't have a prefix like '├──'
         # The _generate_directory_structure_string starts with the name of the node.
         # We need to pass the root node directly to the helper.
-        structure_lines = self._generate_directory_structure_string(data_tree)
-        md_lines.append("\n```text")  # Use text to avoid markdown interpreting it
-        md_lines.extend(structure_lines)
-        md_lines.append("```\n")
-        md_lines.append("\n---")
+        yield "\n```text"  # Use text to avoid markdown interpreting it
+        yield from self._generate_directory_structure_string(data_tree)
+        yield "```\n"
+        yield "\n---"
 
         # 3. File Contents
-        md_lines.append("\n## Contents")
-
-        collected_files: List[Dict[str, Any]] = []
-        self._collect_file_contents_for_markdown(data_tree, collected_files)
-
-        if not collected_files:
-            md_lines.append("\n*No files with content to display.*")
-        else:
-            for file_info in collected_files:
-                md_lines.append(
-                    f"\n### `./{file_info['relative_path']}`"
-                )  # Ensure ./ prefix
-                lang_hint = file_info["lang_hint"] if file_info["lang_hint"] else ""
-                md_lines.append(f"```{lang_hint}")
-                md_lines.append(file_info["content"])
-                md_lines.append("```")
-
-        md_lines.append("\n")  # Trailing newline for cleanliness
-        return "\n".join(md_lines)
+        yield "\n## Contents"
+
+        emitted_any_file = False
+        for file_node in self._iter_file_nodes(data_tree):
+            if file_node.get("duplicate_of"):
+                emitted_any_file = True
+                yield f"\n### `./{file_node['relative_path']}`"
+                yield f"*Identical to `./{file_node['duplicate_of']}` (content shown there).*"
+                continue
+            content, read_error = self._resolve_content(
+                file_node["relative_path"], file_node.get("content"), as_chunks=stream_content
+            )
+            read_error = read_error or file_node.get("read_error")
+            if content is not None:
+                lang_hint = self._get_file_extension(file_node["relative_path"])
+            elif read_error:
+                content = f"Error reading file: {read_error}"
+                lang_hint = "text"
+            else:
+                continue
+            emitted_any_file = True
+            yield f"\n### `./{file_node['relative_path']}`"  # Ensure ./ prefix
+            yield f"```{lang_hint}"
+            yield content
+            yield "```"
+
+        if not emitted_any_file:
+            yield "\n*No files with content to display.*"
+
+        yield "\n"  # Trailing newline for cleanliness
+
+
+class JsonLinesFormatter(BaseFormatter):
+    """
+    Formats the directory digest as JSON Lines: a metadata record, one compact
+    record per file, and a summary record with the final counts.
+
+    format_items_stream() writes straight from the traversal generator, so file
+    records are emitted as soon as each file is read and no tree is built.
+    """
+
+    def _record_line(self, record: Dict[str, Any]) -> str:
+        return json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+    def _header_line(self) -> str:
+        return self._record_line(
+            {
+                "type": "metadata",
+                "tool_version": self.final_metadata["tool_version"],
+                "created_at": self.final_metadata["created_at"],
+                "base_directory": self.final_metadata["base_directory"],
+            }
+        )
+
+    def _file_line(self, file_node: DigestItemNode) -> str:
+        content, read_error = self._resolve_content(
+            file_node["relative_path"], file_node.get("content")
+        )
+        record = {**file_node, "content": content}
+        if read_error:
+            record["read_error"] = read_error
+        return self._record_line(record)
+
+    def _summary_line(self, metadata: Dict[str, Any]) -> str:
+        summary = {
+            "type": "summary",
+            "included_files_count": metadata["included_files_count"],
+            "excluded_files_count": metadata["excluded_files_count"],
+            "total_content_size_kb": metadata["total_content_size_kb"],
+        }
+        for key in OPTIONAL_SUMMARY_KEYS:  # Only known once the traversal is done
+            if key in metadata:
+                summary[key] = metadata[key]
+        return self._record_line(summary)
+
+    def _iter_lines(self, data_tree: DigestItemNode) -> Generator[str, None, None]:
+        yield self._header_line()
+        for file_node in self._iter_file_nodes(data_tree):
+            yield self._file_line(file_node)
+        yield self._summary_line(self.final_metadata)
+
+    def format(self, data_tree: DigestItemNode) -> str:
+        """
+        Generates the JSON Lines digest from an already built tree.
+        data_tree is the root_node from core.build_digest_tree.
+        """
+        return "".join(self._iter_lines(data_tree))
+
+    def format_stream(self, data_tree: DigestItemNode, fileobj: TextIO) -> None:
+        """Writes the same records as format() to fileobj, one line at a time."""
+        for line in self._iter_lines(data_tree):
+            fileobj.write(line)
+
+    def format_items_stream(
+        self,
+        processed_items: Iterable[ProcessedItem],
+        stats: TraversalStats,
+        fileobj: TextIO,
+    ) -> Dict[str, Any]:
+        """
+        Writes the digest directly from core.process_directory_recursive's items and
+        stats, in walk order. Returns the final metadata (as build_digest_tree would).
+        """
+        fileobj.write(self._header_line())
+        total_content_size_kb = 0.0
+        for relative_path, item_type, attributes in processed_items:
+            if item_type != "file":
+                continue
+            total_content_size_kb += attributes.get("size_kb") or 0.0
+            fileobj.write(
+                self._file_line(core.file_node_from_item(str(relative_path), attributes))
+            )
+        # The stats dict is filled in by the generator, so it is final only now
+        final_metadata = core.digest_metadata(
+            self.base_dir_path, stats, total_content_size_kb
+        )
+        fileobj.write(self._summary_line(final_metadata))
+        return final_metadata
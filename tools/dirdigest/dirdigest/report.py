@@ -0,0 +1,49 @@
+# dirdigest/dirdigest/report.py
+import json
+from pathlib import Path
+from typing import Any, Dict
+
+from dirdigest.core import Exclusion
+
+# Records are small, so they are collected in a large write buffer and reach the
+# file in a few big writes instead of one per excluded item
+REPORT_BUFFER_BYTES = 1024 * 1024
+
+
+class ExclusionReport:
+    """
+    Writes the items a traversal excluded to a JSON Lines file (--report), one
+    compact record per item: path, type, reason code, the matching pattern and the
+    ignore file it came from where there is one, and the reason as logged.
+    Pass record as on_excluded to core.process_directory_recursive.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.records_count = 0
+        self._file = open(path, "w", encoding="utf-8", buffering=REPORT_BUFFER_BYTES)
+
+    def record(self, exclusion: Exclusion) -> None:
+        """Appends one exclusion to the report."""
+        record: Dict[str, Any] = {
+            "path": exclusion.relative_path,
+            "type": exclusion.item_type,
+            "reason": exclusion.reason,
+        }
+        if exclusion.pattern is not None:
+            record["pattern"] = exclusion.pattern
+        if exclusion.source is not None:
+            record["source"] = exclusion.source
+        record["detail"] = exclusion.detail
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self.records_count += 1
+
+    def close(self) -> None:
+        """Flushes and closes the report file."""
+        self._file.close()
+
+    def __enter__(self) -> "ExclusionReport":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
@@ -0,0 +1,247 @@
+# dirdigest/dirdigest/utils/cache.py
+import contextlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from dirdigest.utils.logger import logger
+
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024 * 1024  # Total decoded content kept on disk
+CACHE_DB_FILENAME = "content-cache.sqlite3"
+CACHE_SCHEMA_VERSION = 3
+
+CachedRead = Dict[str, Any]
+
+
+def default_cache_dir() -> Path:
+    """
+    Returns the cache directory: $DIRDIGEST_CACHE_DIR if set, otherwise
+    dirdigest/ under $XDG_CACHE_HOME (falling back to ~/.cache).
+    """
+    override = os.environ.get("DIRDIGEST_CACHE_DIR")
+    if override:
+        return Path(override)
+    xdg_cache_home = os.environ.get("XDG_CACHE_HOME")
+    base = Path(xdg_cache_home) if xdg_cache_home else Path.home() / ".cache"
+    return base / "dirdigest"
+
+
+def _fingerprint(file_stat: os.stat_result) -> Tuple[int, int, int, int, int]:
+    """
+    Identity of a file's current contents. ctime is included alongside mtime so
+    that permission changes (chmod) also invalidate an entry.
+    """
+    return (
+        file_stat.st_dev,
+        file_stat.st_ino,
+        file_stat.st_size,
+        file_stat.st_mtime_ns,
+        file_stat.st_ctime_ns,
+    )
+
+
+class ContentCache:
+    """
+    On-disk cache of decoded file contents (and decode errors), keyed by absolute
+    path and validated against the file's (device, inode, size, mtime_ns, ctime_ns).
+    Least recently used entries are evicted once the stored content exceeds max_bytes.
+
+    Safe to share between the read worker threads of a single traversal.
+    """
+
+    def __init__(
+        self, cache_dir: Path | None = None, max_bytes: int = DEFAULT_CACHE_MAX_BYTES
+    ):
+        self.cache_dir = cache_dir if cache_dir is not None else default_cache_dir()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._touched: Dict[str, float] = {}  # Hit paths -> access time, flushed on close
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            str(self.cache_dir / CACHE_DB_FILENAME), timeout=5.0, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != CACHE_SCHEMA_VERSION:
+            self._conn.execute("DROP TABLE IF EXISTS entries")
+            self._conn.execute(f"PRAGMA user_version={CACHE_SCHEMA_VERSION}")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                path TEXT PRIMARY KEY,
+                dev INTEGER, ino INTEGER, size INTEGER, mtime_ns INTEGER, ctime_ns INTEGER,
+                size_kb REAL,
+                content TEXT,
+                read_error TEXT,
+                token_counts TEXT,
+                nbytes INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)"
+        )
+        self._conn.commit()
+        logger.debug(
+            f"Cache: Opened content cache at [log.path]{self.cache_dir}[/log.path]"
+        )
+
+    def get(self, path: str, file_stat: os.stat_result) -> Optional[CachedRead]:
+        """
+        Returns {"size_kb", "content", "read_error", "token_counts"} for path if the
+        cached entry still matches file_stat, otherwise None. token_counts maps
+        tokenizer names to the content's token count.
+        """
+        path = os.path.abspath(path)
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT dev, ino, size, mtime_ns, ctime_ns, size_kb, content, read_error, token_counts "
+                    "FROM entries WHERE path = ?",
+                    (path,),
+                ).fetchone()
+            except sqlite3.Error:  # e.g. locked by another dirdigest run; just read the file
+                row = None
+            if row is None or tuple(row[:5]) != _fingerprint(file_stat):
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touched[path] = time.time()
+        return {
+            "size_kb": row[5],
+            "content": row[6],
+            "read_error": row[7],
+            "token_counts": json.loads(row[8]) if row[8] else {},
+        }
+
+    def put(
+        self,
+        path: str,
+        file_stat: os.stat_result,
+        content: Optional[str],
+        read_error: Optional[str],
+        token_counts: Optional[Dict[str, int]] = None,
+    ) -> None:
+        """Stores the decoded content (or decode error message) and token counts for path."""
+        nbytes = file_stat.st_size if content is not None else 0
+        if nbytes > self.max_bytes:
+            return
+        path = os.path.abspath(path)
+        with self._lock, contextlib.suppress(sqlite3.Error):
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries "
+                "(path, dev, ino, size, mtime_ns, ctime_ns, size_kb, content, read_error, token_counts, "
+                "nbytes, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    path,
+                    *_fingerprint(file_stat),
+                    round(file_stat.st_size / 1024, 3),
+                    content,
+                    read_error,
+                    json.dumps(token_counts) if token_counts else None,
+                    nbytes,
+                    time.time(),
+                ),
+            )
+
+    def _evict(self) -> int:
+        """Deletes least recently used entries until the total content fits max_bytes."""
+        total_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(nbytes), 0) FROM entries"
+        ).fetchone()[0]
+        if total_bytes <= self.max_bytes:
+            return 0
+        evicted_paths: List[Tuple[str]] = []
+        for path, nbytes in self._conn.execute(
+            "SELECT path, nbytes FROM entries ORDER BY last_access"
+        ).fetchall():
+            if total_bytes <= self.max_bytes:
+                break
+            evicted_paths.append((path,))
+            total_bytes -= nbytes
+        self._conn.executemany("DELETE FROM entries WHERE path = ?", evicted_paths)
+        return len(evicted_paths)
+
+    def close(self) -> None:
+        """Records access times of hits, evicts down to max_bytes and closes the database."""
+        with self._lock:
+            try:
+                self._conn.executemany(
+                    "UPDATE entries SET last_access = ? WHERE path = ?",
+                    [(access_time, path) for path, access_time in self._touched.items()],
+                )
+                evicted_count = self._evict()
+                self._conn.commit()
+                logger.debug(
+                    f"Cache: {self.hits} hits, {self.misses} misses, {evicted_count} entries evicted"
+                )
+            finally:
+                self._conn.close()
+
+
+class MemoryContentCache:
+    """
+    In-process counterpart of ContentCache with the same get/put interface and
+    fingerprint checks, used to keep contents resident between rescans (watch mode).
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[Tuple[int, int, int, int, int], CachedRead]] = {}
+
+    def get(self, path: str, file_stat: os.stat_result) -> Optional[CachedRead]:
+        """Returns the stored read for path if file_stat still matches, otherwise None."""
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None or entry[0] != _fingerprint(file_stat):
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def put(
+        self,
+        path: str,
+        file_stat: os.stat_result,
+        content: Optional[str],
+        read_error: Optional[str],
+        token_counts: Optional[Dict[str, int]] = None,
+    ) -> None:
+        """Stores the decoded content (or decode error message) and token counts for path."""
+        with self._lock:
+            self._entries[path] = (
+                _fingerprint(file_stat),
+                {
+                    "size_kb": round(file_stat.st_size / 1024, 3),
+                    "content": content,
+                    "read_error": read_error,
+                    "token_counts": dict(token_counts or {}),
+                },
+            )
+
+    def retain(self, paths: set) -> None:
+        """Drops entries for paths not in `paths` (files deleted or newly excluded)."""
+        with self._lock:
+            for path in [p for p in self._entries if p not in paths]:
+                del self._entries[path]
+
+    def discard(self, paths: Iterable[str]) -> None:
+        """Drops the entries for `paths`, if there are any."""
+        with self._lock:
+            for path in paths:
+                self._entries.pop(path, None)
+
+
+# Anything core.process_directory_recursive accepts as content_cache
+AnyContentCache = Union[ContentCache, MemoryContentCache]
@@ -1,12 +1,25 @@
-import pyperclip  # type: ignore[import-untyped]
-
-# Using ignore for import-untyped because pyperclip stubs might not be comprehensive
-# or always present, but it's a well-known library.
-# Alternatively, add 'pyperclip' to a pyright/mypy include list if using strict type checking.
+import sys
+from typing import Any
 
 from dirdigest.utils.logger import logger
 
 
+def __getattr__(name: str) -> Any:
+    """
+    Exposes pyperclip as a module attribute, imported on first use: pyperclip probes
+    for a clipboard mechanism when imported, which only runs with --clipboard.
+    Only called while the attribute is unset, so a patched pyperclip is left alone.
+    """
+    if name == "pyperclip":
+        # Using ignore for import-untyped because pyperclip stubs might not be comprehensive
+        # or always present, but it's a well-known library.
+        import pyperclip  # type: ignore[import-untyped]
+
+        globals()["pyperclip"] = pyperclip
+        return pyperclip
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 def copy_to_clipboard(text: str) -> bool:
     """
     Copies the given text to the system clipboard.
@@ -17,6 +30,7 @@ def copy_to_clipboard(text: str) -> bool:
     if not text:
         logger.debug("Clipboard: No text provided to copy.")
         return False
+    pyperclip = sys.modules[__name__].pyperclip  # An existing (or patched) binding wins
     try:
         pyperclip.copy(text)
         logger.info("Output copied to clipboard successfully.")
@@ -41,6 +55,7 @@ def is_clipboard_available() -> bool:
     Checks if the clipboard functionality seems to be available.
     Tries a benign paste operation.
     """
+    pyperclip = sys.modules[__name__].pyperclip  # An existing (or patched) binding wins
     try:
         # Pyperclip might raise an error on initialization if no backend is found.
         # Calling a function like paste() is a way to trigger this check.
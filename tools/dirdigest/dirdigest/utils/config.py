@@ -1,4 +1,3 @@
-import yaml
 from pathlib import Path
 from typing import Dict, Any, Optional, List
 import click
@@ -41,6 +40,8 @@ def load_config_file(config_path: Optional[Path] = None) -> Dict[str, Any]:
         )
         return {}
 
+    import yaml  # Only needed when there is a file to load
+
     logger.info(
         f"Config: Loading configuration from [log.path]{cfg_path_to_load}[/log.path]"
     )
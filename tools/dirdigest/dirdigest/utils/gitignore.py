@@ -0,0 +1,232 @@
+# dirdigest/dirdigest/utils/gitignore.py
+import os
+import re
+from pathlib import Path
+from typing import Iterable, List, NamedTuple, Optional, Sequence
+
+
+class IgnoreRule(NamedTuple):
+    """One compiled line of an ignore file."""
+
+    pattern: str  # The line as written (after trimming), for reporting
+    regex: "re.Pattern[str]"  # Matches paths relative to the ignore file's directory
+    negated: bool  # "!pattern": re-includes what an earlier rule excluded
+    dir_only: bool  # "pattern/": only matches directories
+    source: str  # Where the rule came from, e.g. "src/.gitignore"
+
+
+def _translate_glob(glob: str) -> str:
+    """
+    Translates a gitignore glob (leading and trailing '/' already removed) into a regex
+    body. '*', '?' and brackets never match '/'; '**' between slashes matches any
+    number of directories, and a trailing '/**' matches everything below.
+    """
+    parts: List[str] = []
+    i, n = 0, len(glob)
+    while i < n:
+        c = glob[i]
+        if c == "*":
+            j = i
+            while j < n and glob[j] == "*":
+                j += 1
+            if j - i == 2 and (i == 0 or glob[i - 1] == "/") and (j == n or glob[j] == "/"):
+                if j == n:
+                    parts.append(".*")
+                else:
+                    parts.append("(?:.*/)?")
+                    j += 1  # The slash is part of the "zero or more directories" group
+            else:
+                parts.append("[^/]*")
+            i = j
+        elif c == "?":
+            parts.append("[^/]")
+            i += 1
+        elif c == "[":
+            j = i + 1
+            if j < n and glob[j] in "!^":
+                j += 1
+            if j < n and glob[j] == "]":
+                j += 1
+            while j < n and glob[j] != "]":
+                j += 1
+            if j >= n:  # No closing bracket: a literal '['
+                parts.append(re.escape(c))
+                i += 1
+                continue
+            body = glob[i + 1 : j]
+            if body[:1] in ("!", "^"):
+                parts.append("[^/" + body[1:].replace("\\", "\\\\") + "]")
+            else:
+                parts.append("[" + body.replace("\\", "\\\\") + "]")
+            i = j + 1
+        elif c == "\\" and i + 1 < n:
+            parts.append(re.escape(glob[i + 1]))
+            i += 2
+        else:
+            parts.append(re.escape(c))
+            i += 1
+    return "".join(parts)
+
+
+def parse_ignore_line(line: str, source: str = "") -> Optional[IgnoreRule]:
+    """Compiles one gitignore line; returns None for blank lines and comments."""
+    line = line.rstrip("\n").rstrip("\r")
+    # Trailing spaces are ignored unless escaped with a backslash
+    stripped = line.rstrip(" ")
+    if stripped.endswith("\\") and len(stripped) < len(line):
+        stripped += " "
+    line = stripped
+    if not line or line.startswith("#"):
+        return None
+
+    negated = line.startswith("!")
+    glob = line[1:] if negated else line
+    if glob.startswith(("\\!", "\\#")):
+        glob = glob[1:]
+    dir_only = glob.endswith("/")
+    glob = glob.rstrip("/")
+    if not glob:
+        return None
+    # A slash at the start or in the middle anchors the pattern to the ignore file's
+    # directory; otherwise it matches a name at any depth below it
+    anchored = "/" in glob
+    glob = glob.lstrip("/")
+    body = _translate_glob(glob)
+    regex = re.compile(body if anchored else "(?:.*/)?" + body, re.DOTALL)
+    return IgnoreRule(line, regex, negated, dir_only, source)
+
+
+def _compile_last_match(rules: List[IgnoreRule]) -> Optional["re.Pattern[str]"]:
+    """
+    Compiles rules into one regex whose alternatives run from the last rule to the
+    first, so a single fullmatch() finds the rule that wins (the last matching one).
+    Group r<i> identifies the rule; rule regexes only contain non-capturing groups.
+    """
+    if not rules:
+        return None
+    return re.compile(
+        "|".join(
+            f"(?P<r{index}>{rules[index].regex.pattern})"
+            for index in range(len(rules) - 1, -1, -1)
+        ),
+        re.DOTALL,
+    )
+
+
+class IgnoreRules:
+    """
+    The rules of one ignore file, compiled once. Paths given to match() are relative
+    to the top of the traversal ('/'-separated): relative_dir is where the file sits
+    below that top, and root_prefix is where the top sits below the file's directory
+    (for ignore files in directories above the traversal).
+    Within a file the last matching rule wins, as in git.
+    """
+
+    def __init__(
+        self,
+        lines: Iterable[str],
+        relative_dir: str = "",
+        source: str = "",
+        root_prefix: str = "",
+    ):
+        self.relative_dir = relative_dir
+        self.root_prefix = root_prefix
+        self.source = source
+        self.rules: List[IgnoreRule] = []
+        for line in lines:
+            rule = parse_ignore_line(line, source)
+            if rule is not None:
+                self.rules.append(rule)
+        # Files can only be matched by rules without a trailing '/'
+        self._file_rules = [rule for rule in self.rules if not rule.dir_only]
+        self._file_regex = _compile_last_match(self._file_rules)
+        self._dir_regex = _compile_last_match(self.rules)
+
+    @classmethod
+    def from_file(
+        cls, path: Path, relative_dir: str = "", root_prefix: str = "", source: str = ""
+    ) -> Optional["IgnoreRules"]:
+        """Loads an ignore file; returns None if it is missing, unreadable or has no rules."""
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                lines = f.readlines()
+        except OSError:
+            return None
+        if not source:
+            source = f"{relative_dir}/{path.name}" if relative_dir else path.name
+        rules = cls(lines, relative_dir, source, root_prefix)
+        return rules if rules.rules else None
+
+    def match(self, relative_path: str, is_dir: bool) -> Optional[IgnoreRule]:
+        """Returns the last rule matching relative_path, or None."""
+        if self.root_prefix:
+            relative_path = f"{self.root_prefix}/{relative_path}"
+        elif self.relative_dir:
+            if not relative_path.startswith(self.relative_dir + "/"):
+                return None
+            relative_path = relative_path[len(self.relative_dir) + 1 :]
+        regex = self._dir_regex if is_dir else self._file_regex
+        if regex is None:
+            return None
+        m = regex.fullmatch(relative_path)
+        if m is None:
+            return None
+        rules = self.rules if is_dir else self._file_rules
+        return rules[int(m.lastgroup[1:])]
+
+
+def match_ignore_rules(
+    rule_chain: Sequence[IgnoreRules], relative_path: str, is_dir: bool
+) -> Optional[IgnoreRule]:
+    """
+    Returns the rule deciding relative_path across a chain of ignore files ordered
+    from lowest to highest precedence (e.g. info/exclude, then .gitignore files from
+    the top of the tree down to the path's directory), or None if nothing matches.
+    The path is ignored if a rule is returned and it is not negated.
+    """
+    relative_path = relative_path.replace(os.sep, "/")
+    for rules in reversed(rule_chain):
+        rule = rules.match(relative_path, is_dir)
+        if rule is not None:
+            return rule
+    return None
+
+
+def load_enclosing_ignore_rules(
+    work_tree: Path,
+    git_dir: Path,
+    directory: Path,
+    filenames: Sequence[str],
+    info_exclude: bool = True,
+) -> List[IgnoreRules]:
+    """
+    Returns the ignore rules that apply to directory from outside it: git_dir's
+    info/exclude (unless info_exclude is False), then the ignore files (filenames,
+    in precedence order) of work_tree and every directory down to directory's
+    parent. They are rebased so that their match() takes paths relative to directory.
+    """
+    directory_in_tree = directory.resolve().relative_to(work_tree).as_posix()
+    if directory_in_tree == ".":
+        directory_in_tree = ""
+    rule_chain: List[IgnoreRules] = []
+    if info_exclude:
+        info_exclude_rules = IgnoreRules.from_file(
+            git_dir / "info" / "exclude", root_prefix=directory_in_tree, source="info/exclude"
+        )
+        if info_exclude_rules is not None:
+            rule_chain.append(info_exclude_rules)
+    if not directory_in_tree:
+        return rule_chain
+
+    parts = directory_in_tree.split("/")
+    for depth in range(len(parts)):
+        enclosing_dir = "/".join(parts[:depth])
+        for filename in filenames:
+            rules = IgnoreRules.from_file(
+                work_tree / enclosing_dir / filename,
+                root_prefix="/".join(parts[depth:]),
+                source=f"{enclosing_dir}/{filename}" if enclosing_dir else filename,
+            )
+            if rules is not None:
+                rule_chain.append(rules)
+    return rule_chain
@@ -0,0 +1,236 @@
+# dirdigest/dirdigest/utils/gitindex.py
+import os
+import re
+import struct
+from pathlib import Path
+from typing import List, Optional, Set, Tuple
+
+from dirdigest.utils.gitignore import IgnoreRules, match_ignore_rules
+from dirdigest.utils.logger import logger
+
+INDEX_SIGNATURE = b"DIRC"
+SUPPORTED_INDEX_VERSIONS = (2, 3, 4)
+# ctime, mtime (seconds + nanoseconds each), dev, ino, mode, uid, gid, size
+INDEX_ENTRY_STAT_FORMAT = ">10I"
+INDEX_ENTRY_STAT_SIZE = struct.calcsize(INDEX_ENTRY_STAT_FORMAT)
+
+# Entry flags (see git's Documentation/gitformat-index.txt)
+INDEX_FLAG_EXTENDED = 0x4000
+INDEX_FLAG_STAGE_MASK = 0x3000
+INDEX_FLAG_NAME_MASK = 0x0FFF
+INDEX_EXTENDED_FLAG_SKIP_WORKTREE = 0x4000
+
+S_IFGITLINK = 0o160000  # Submodule commit: a directory in the work tree, not a file
+S_IFLNK = 0o120000
+
+# (relative path with '/' separators, is_symlink)
+GitFileEntry = Tuple[str, bool]
+
+
+class GitIndexError(ValueError):
+    """Raised when .git/index is missing, truncated or in an unsupported format."""
+
+
+def find_git_dir(work_tree: Path) -> Optional[Path]:
+    """
+    Returns the git directory of a work tree given its top-level directory, or None.
+    Handles the "gitdir: <path>" file used by linked worktrees and submodules.
+    """
+    dot_git = work_tree / ".git"
+    if dot_git.is_dir():
+        return dot_git
+    if dot_git.is_file():
+        try:
+            first_line = dot_git.read_text(encoding="utf-8").splitlines()[0]
+        except (OSError, IndexError, UnicodeDecodeError):
+            return None
+        if first_line.startswith("gitdir:"):
+            git_dir = Path(first_line[len("gitdir:") :].strip())
+            return git_dir if git_dir.is_absolute() else (work_tree / git_dir).resolve()
+    return None
+
+
+def find_work_tree(path: Path) -> Optional[Tuple[Path, Path]]:
+    """Returns (work tree top, git directory) for path or its nearest enclosing work tree."""
+    path = path.resolve()
+    for candidate in (path, *path.parents):
+        git_dir = find_git_dir(candidate)
+        if git_dir is not None:
+            return candidate, git_dir
+    return None
+
+
+def _object_id_size(git_dir: Path) -> int:
+    """20 bytes for SHA-1 repositories, 32 for extensions.objectFormat=sha256."""
+    config_paths = [git_dir / "config"]
+    common_dir_file = git_dir / "commondir"  # Linked worktrees share the main config
+    if common_dir_file.is_file():
+        try:
+            config_paths.append(git_dir / common_dir_file.read_text(encoding="utf-8").strip() / "config")
+        except OSError:
+            pass
+    for config_path in config_paths:
+        try:
+            config_text = config_path.read_text(encoding="utf-8", errors="replace")
+        except OSError:
+            continue
+        if re.search(r"^\s*objectformat\s*=\s*sha256\s*$", config_text, re.IGNORECASE | re.MULTILINE):
+            return 32
+    return 20
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    """Decodes git's offset varint (index v4 path prefix lengths); returns (value, new_pos)."""
+    byte = data[pos]
+    pos += 1
+    value = byte & 0x7F
+    while byte & 0x80:
+        value += 1
+        byte = data[pos]
+        pos += 1
+        value = (value << 7) + (byte & 0x7F)
+    return value, pos
+
+
+def read_index_entries(git_dir: Path) -> List[GitFileEntry]:
+    """
+    Parses git_dir/index (versions 2-4) and returns the tracked files present in the
+    work tree, in index (path) order. Submodules and skip-worktree (sparse checkout)
+    entries are left out, and conflicted paths are listed once.
+    Raises GitIndexError (or OSError) if the index cannot be read.
+    """
+    data = (git_dir / "index").read_bytes()
+    if len(data) < 12 or data[:4] != INDEX_SIGNATURE:
+        raise GitIndexError("not a git index file")
+    version, entry_count = struct.unpack_from(">II", data, 4)
+    if version not in SUPPORTED_INDEX_VERSIONS:
+        raise GitIndexError(f"unsupported index version {version}")
+    object_id_size = _object_id_size(git_dir)
+
+    entries: List[GitFileEntry] = []
+    pos = 12
+    previous_name = b""
+    try:
+        for _ in range(entry_count):
+            entry_start = pos
+            mode = struct.unpack_from(INDEX_ENTRY_STAT_FORMAT, data, pos)[6]
+            pos += INDEX_ENTRY_STAT_SIZE + object_id_size
+            (flags,) = struct.unpack_from(">H", data, pos)
+            pos += 2
+            extended_flags = 0
+            if flags & INDEX_FLAG_EXTENDED and version >= 3:
+                (extended_flags,) = struct.unpack_from(">H", data, pos)
+                pos += 2
+
+            if version == 4:
+                strip_length, pos = _read_varint(data, pos)
+                name_end = data.index(b"\x00", pos)
+                name = previous_name[: len(previous_name) - strip_length] + data[pos:name_end]
+                pos = name_end + 1
+            else:
+                name_length = flags & INDEX_FLAG_NAME_MASK
+                if name_length < INDEX_FLAG_NAME_MASK:
+                    name_end = pos + name_length
+                else:  # Names of 0xFFF bytes or more are only NUL-terminated
+                    name_end = data.index(b"\x00", pos)
+                name = data[pos:name_end]
+                # Entries are NUL-padded to a multiple of 8 bytes (at least one NUL)
+                pos = entry_start + ((name_end - entry_start + 8) & ~7)
+            previous_name = name
+
+            if extended_flags & INDEX_EXTENDED_FLAG_SKIP_WORKTREE:
+                continue
+            if mode & 0o170000 == S_IFGITLINK:
+                continue
+            if flags & INDEX_FLAG_STAGE_MASK and entries and entries[-1][0] == os.fsdecode(name):
+                continue  # Further stages of a conflicted path
+            entries.append((os.fsdecode(name), mode & 0o170000 == S_IFLNK))
+    except (struct.error, ValueError, IndexError) as e:
+        raise GitIndexError(f"truncated or corrupt index ({e})") from e
+    return entries
+
+
+def _untracked_files(
+    work_tree: Path, git_dir: Path, start_dir: str, tracked_paths: Set[str]
+) -> List[GitFileEntry]:
+    """
+    Walks start_dir (relative to work_tree, "" for all of it) for files that are
+    neither tracked nor ignored, honouring .git/info/exclude and the .gitignore file
+    of every directory from the top down. Ignored directories are pruned unvisited.
+    """
+    rule_chain: List[IgnoreRules] = []
+    info_exclude = IgnoreRules.from_file(git_dir / "info" / "exclude")
+    if info_exclude is not None:
+        rule_chain.append(info_exclude)
+    # .gitignore files above start_dir still apply below it
+    relative_dir = ""
+    for part in start_dir.split("/") if start_dir else []:
+        parent_ignore = IgnoreRules.from_file(work_tree / relative_dir / ".gitignore", relative_dir)
+        if parent_ignore is not None:
+            rule_chain.append(parent_ignore)
+        relative_dir = f"{relative_dir}/{part}" if relative_dir else part
+
+    untracked: List[GitFileEntry] = []
+    stack: List[Tuple[str, str, List[IgnoreRules]]] = [
+        (str(work_tree / start_dir), start_dir, rule_chain)
+    ]
+    while stack:
+        dir_path, relative_dir, parent_rules = stack.pop()
+        rules = parent_rules
+        dir_ignore = IgnoreRules.from_file(Path(dir_path) / ".gitignore", relative_dir)
+        if dir_ignore is not None:
+            rules = parent_rules + [dir_ignore]
+        try:
+            with os.scandir(dir_path) as scandir_it:
+                entries = sorted(scandir_it, key=lambda e: e.name)
+        except OSError:
+            continue
+        relative_prefix = relative_dir + "/" if relative_dir else ""
+        subdirectories = []
+        for entry in entries:
+            relative_path = relative_prefix + entry.name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if is_dir and entry.name == ".git":
+                continue
+            rule = match_ignore_rules(rules, relative_path, is_dir)
+            if rule is not None and not rule.negated:
+                continue
+            if is_dir:
+                subdirectories.append((entry.path, relative_path, rules))
+            elif relative_path not in tracked_paths:
+                untracked.append((relative_path, entry.is_symlink()))
+        stack.extend(reversed(subdirectories))
+    return untracked
+
+
+def list_git_files(directory: Path, include_untracked: bool = False) -> List[GitFileEntry]:
+    """
+    Lists the files under directory (a git work tree or a directory inside one) from
+    the git index, without walking the tree: tracked files, plus (with
+    include_untracked) files that are not ignored, as in
+    `git ls-files --cached --others --exclude-standard`. Paths are relative to
+    directory with '/' separators, sorted.
+    Raises GitIndexError if directory is not in a work tree with a readable index.
+    """
+    found = find_work_tree(directory)
+    if found is None:
+        raise GitIndexError(f"{directory} is not inside a git work tree")
+    work_tree, git_dir = found
+    start_dir = directory.resolve().relative_to(work_tree).as_posix()
+    start_dir = "" if start_dir == "." else start_dir
+    try:
+        entries = read_index_entries(git_dir)
+    except OSError as e:
+        raise GitIndexError(f"cannot read {git_dir / 'index'} ({e})") from e
+    logger.debug(f"Git: {len(entries)} tracked files in [log.path]{git_dir / 'index'}[/log.path]")
+    if include_untracked:
+        untracked = _untracked_files(work_tree, git_dir, start_dir, {path for path, _ in entries})
+        logger.debug(f"Git: {len(untracked)} untracked, non-ignored files")
+        entries = sorted(entries + untracked)
+    if start_dir:
+        prefix = start_dir + "/"
+        entries = [(path[len(prefix) :], is_link) for path, is_link in entries if path.startswith(prefix)]
+    return entries
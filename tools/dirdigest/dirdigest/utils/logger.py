@@ -2,32 +2,52 @@
 import logging
 import sys
 from pathlib import Path  # Added for type hint of log_file_path
-from rich.console import Console
-from rich.logging import RichHandler
-from rich.theme import Theme
-
-# Global console instances
-stdout_console = Console(file=sys.stdout)
-stderr_console = Console(
-    stderr=True,
-    theme=Theme(
-        {
-            "logging.level.debug": "dim cyan",
-            "logging.level.info": "dim blue",  # Adjusted for better visibility if needed
-            "logging.level.warning": "magenta",
-            "logging.level.error": "bold red",
-            "logging.level.critical": "bold red reverse",
-            "log.included": "green",
-            "log.excluded": "red",
-            "log.reason": "dim yellow",
-            "log.path": "cyan",
-            "log.summary_key": "bold",
-            "log.summary_value_inc": "bold green",
-            "log.summary_value_exc": "bold red",
-            "log.summary_value_neutral": "bold blue",
-        }
-    ),
-)
+from typing import Any
+
+LOG_THEME_STYLES = {
+    "logging.level.debug": "dim cyan",
+    "logging.level.info": "dim blue",  # Adjusted for better visibility if needed
+    "logging.level.warning": "magenta",
+    "logging.level.error": "bold red",
+    "logging.level.critical": "bold red reverse",
+    "log.included": "green",
+    "log.excluded": "red",
+    "log.reason": "dim yellow",
+    "log.path": "cyan",
+    "log.summary_key": "bold",
+    "log.summary_value_inc": "bold green",
+    "log.summary_value_exc": "bold red",
+    "log.summary_value_neutral": "bold blue",
+}
+
+
+def __getattr__(name: str) -> Any:
+    """
+    Creates the global console instances (stdout_console, stderr_console) on first
+    use, so that importing this module (e.g. for --help or --version) does not
+    import Rich.
+    """
+    if name == "stdout_console":
+        from rich.console import Console
+
+        console = Console(file=sys.stdout)
+    elif name == "stderr_console":
+        from rich.console import Console
+        from rich.theme import Theme
+
+        console = Console(stderr=True, theme=Theme(LOG_THEME_STYLES))
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = console
+    return console
+
+
+def escape(markup: str) -> str:
+    """Escapes Rich markup in a string (rich.markup.escape, imported on first use)."""
+    from rich.markup import escape as rich_escape
+
+    return rich_escape(markup)
+
 
 # Global logger instance for the application
 logger = logging.getLogger("dirdigest")
@@ -40,14 +60,15 @@ def setup_logging(
     Configures logging for the application using RichHandler for console
     and an optional FileHandler for file-based logging.
 
-    The main logger is set to DEBUG, allowing fine-grained control by handlers.
+    The main logger is set to the lowest level any handler accepts, so that
+    logger.isEnabledFor() tells hot loops whether a message would be emitted at all.
 
     :param verbose_level: 0 (default for console: WARNING), 1 (-v for console: INFO), 2 (-vv for console: DEBUG)
     :param quiet: If True, suppresses console output below ERROR.
     :param log_file_path: Optional pathlib.Path to a file for logging (will log at DEBUG level).
     """
-    # Set the main logger to the lowest level we want to handle globally (DEBUG)
-    # Individual handlers will then filter what they output from this stream.
+    # Let everything through while the handlers are set up; the level is lowered to
+    # what the handlers actually accept once they are in place (see below).
     logger.setLevel(logging.DEBUG)
 
     # Determine console log level based on verbosity/quietness
@@ -67,8 +88,10 @@ def setup_logging(
 
     # --- Console Handler (Rich) ---
     # This handler's level determines what from the DEBUG-level logger stream gets to the console.
+    from rich.logging import RichHandler
+
     console_handler = RichHandler(
-        console=stderr_console,
+        console=sys.modules[__name__].stderr_console,  # Created on first use, see __getattr__
         level=logging.getLevelName(
             console_log_level_name
         ),  # Set handler level from determined name
@@ -111,10 +134,14 @@ def setup_logging(
     else:
         file_logging_status = "Disabled"
 
+    # Records below every handler's level would be built only to be dropped; with the
+    # logger at the lowest handler level they are discarded before any formatting
+    logger.setLevel(min(handler.level for handler in logger.handlers))
+
     # This initial debug message will go to handlers that accept DEBUG
     # (i.e., the file handler by default, and console if -vv)
     logger.debug(
-        f"Logging initialized. Main logger level: DEBUG. "
+        f"Logging initialized. Main logger level: {logging.getLevelName(logger.level)}. "
         f"Console handler effective level: {console_log_level_name}. "
         f"File logging: {file_logging_status}"
     )
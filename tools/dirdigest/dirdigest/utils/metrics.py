@@ -0,0 +1,156 @@
+# dirdigest/dirdigest/utils/metrics.py
+import datetime
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, TypeVar
+
+from dirdigest.constants import TOOL_VERSION
+
+STATS_SCHEMA_VERSION = 1
+
+T = TypeVar("T")
+
+
+class _Phase:
+    """Context manager timing one entry into a phase; see RunMetrics.phase."""
+
+    __slots__ = ("_metrics", "_name", "_frame")
+
+    def __init__(self, metrics: "RunMetrics", name: str):
+        self._metrics = metrics
+        self._name = name
+
+    def __enter__(self) -> None:
+        # [name, wall start, cpu start, wall spent in nested phases, cpu spent in nested phases]
+        self._frame = [self._name, time.perf_counter(), time.thread_time(), 0.0, 0.0]
+        self._metrics._stack().append(self._frame)
+
+    def __exit__(self, *exc_info: Any) -> None:
+        wall = time.perf_counter() - self._frame[1]
+        cpu = time.thread_time() - self._frame[2]
+        stack = self._metrics._stack()
+        stack.pop()
+        if stack:  # The parent phase only keeps the time not spent in this one
+            stack[-1][3] += wall
+            stack[-1][4] += cpu
+        self._metrics._add(self._name, wall - self._frame[3], cpu - self._frame[4])
+
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(self, *exc_info: Any) -> None:
+        pass
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class RunMetrics:
+    """
+    Wall-clock and CPU time per phase of a run (enumerate, filter, stat, read,
+    tree_build, format, write, ...) plus counters (bytes read, files opened, ...).
+
+    Phases nest: time spent in an inner phase is not counted again in the outer
+    one, so phase times add up to the time actually spent. Nesting is tracked per
+    thread and CPU time is per-thread CPU time, so phases running on read worker
+    threads can add up to more than the run's wall-clock time. Safe to update from
+    several threads.
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._phases: Dict[str, List[float]] = {}  # name -> [wall, cpu, entries]
+        self.counters: Dict[str, int] = {}
+        self._started_at = datetime.datetime.now(datetime.timezone.utc)
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+
+    def _stack(self) -> List[list]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _add(self, name: str, wall: float, cpu: float) -> None:
+        with self._lock:
+            totals = self._phases.get(name)
+            if totals is None:
+                totals = self._phases[name] = [0.0, 0.0, 0]
+            totals[0] += wall
+            totals[1] += cpu
+            totals[2] += 1
+
+    def phase(self, name: str) -> _Phase:
+        """Returns a context manager that times the enclosed block as phase `name`."""
+        return _Phase(self, name)
+
+    def timed(self, iterable: Iterable[T], name: str) -> Iterator[T]:
+        """Yields from iterable, timing only the work of producing each item as phase `name`."""
+        iterator = iter(iterable)
+        while True:
+            with self.phase(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """Adds amount to counter `name`."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def to_dict(self, **extra: Any) -> Dict[str, Any]:
+        """The run summary written by --stats-json; extra keys are added at the top level."""
+        with self._lock:
+            phases = {
+                name: {"wall_seconds": round(wall, 6), "cpu_seconds": round(cpu, 6), "entries": entries}
+                for name, (wall, cpu, entries) in self._phases.items()
+            }
+            counters = dict(sorted(self.counters.items()))
+        return {
+            "schema_version": STATS_SCHEMA_VERSION,
+            "dirdigest_version": TOOL_VERSION,
+            "started_at": self._started_at.isoformat(),
+            "wall_seconds": round(time.perf_counter() - self._wall_start, 6),
+            "cpu_seconds": round(time.process_time() - self._cpu_start, 6),
+            "phases": phases,
+            "counters": counters,
+            **extra,
+        }
+
+    def write_json(self, path: Path, **extra: Any) -> None:
+        """Writes to_dict(**extra) to path as JSON."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(**extra), f, indent=2)
+            f.write("\n")
+
+
+class _NullMetrics(RunMetrics):
+    """RunMetrics that records nothing, so instrumented code costs next to nothing without --stats-json."""
+
+    enabled = False
+
+    def __init__(self):
+        pass
+
+    def phase(self, name: str) -> _NullPhase:  # type: ignore[override]
+        return _NULL_PHASE
+
+    def timed(self, iterable: Iterable[T], name: str) -> Iterable[T]:  # type: ignore[override]
+        return iterable
+
+    def count(self, name: str, amount: int = 1) -> None:
+        pass
+
+
+NULL_METRICS: RunMetrics = _NullMetrics()
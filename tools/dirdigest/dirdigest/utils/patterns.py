@@ -1,8 +1,9 @@
 # dirdigest/utils/patterns.py
 import fnmatch
+import re
 from pathlib import Path
 import os
-from typing import List # Ensure List is imported
+from typing import List, Optional # Ensure List is imported
 
 def matches_pattern(path_str: str, pattern_str: str) -> bool:
     """
@@ -63,4 +64,99 @@ def is_path_hidden(path_obj: Path) -> bool:
     """
     # Path(".").parts is ('.',), Path(".git").parts is ('.git',)
     # Path("src/.config").parts is ("src", ".config")
-    return any(part.startswith(".") for part in path_obj.parts if part not in ('.', os.sep))
\ No newline at end of file
+    return any(part.startswith(".") for part in path_obj.parts if part not in ('.', os.sep))
+
+def _compile_alternation(globs: List[str]) -> Optional["re.Pattern[str]"]:
+    """
+    Compiles fnmatch-style globs into one regex with a capturing group per glob,
+    so a single match() both tests all of them and reports which one matched.
+    """
+    if not globs:
+        return None
+    flags = re.IGNORECASE if os.path.normcase("A") == "a" else 0  # As fnmatch does on Windows
+    # Named outer groups: older fnmatch.translate() output can contain groups of its own,
+    # but the outer group always closes last, so lastgroup identifies the glob.
+    return re.compile(
+        "|".join(
+            f"(?P<p{index}>{fnmatch.translate(glob)})" for index, glob in enumerate(globs)
+        ),
+        flags,
+    )
+
+
+class PatternSet:
+    """
+    A list of include/exclude patterns compiled once, with the same semantics as
+    matches_patterns() but without re-parsing every pattern for every path.
+
+    Patterns are split into three buckets, each compiled into a single regex:
+    - directory patterns ('name/', '**/name/'): matched against every path component
+    - basename patterns ('**/glob'): matched against the last path component
+    - full-path patterns (anything else): matched against the whole relative path
+    """
+
+    def __init__(self, patterns: List[str]):
+        self.patterns = list(patterns)
+        dir_patterns: List[str] = []
+        basename_patterns: List[str] = []
+        full_path_patterns: List[str] = []
+        self._dir_sources: List[str] = []
+        self._basename_sources: List[str] = []
+        self._full_path_sources: List[str] = []
+
+        for pattern_str in self.patterns:
+            norm_pattern = pattern_str.replace(os.sep, "/")
+            if norm_pattern.endswith("/"):
+                dir_target_name_pattern = norm_pattern.rstrip("/")
+                if dir_target_name_pattern.startswith("**/"):
+                    dir_target_name_pattern = dir_target_name_pattern[3:]
+                dir_patterns.append(dir_target_name_pattern)
+                self._dir_sources.append(pattern_str)
+            elif norm_pattern.startswith("**/"):
+                basename_patterns.append(norm_pattern[3:])
+                self._basename_sources.append(pattern_str)
+            else:
+                full_path_patterns.append(norm_pattern)
+                self._full_path_sources.append(pattern_str)
+
+        self._dir_re = _compile_alternation(dir_patterns)
+        self._basename_re = _compile_alternation(basename_patterns)
+        self._full_path_re = _compile_alternation(full_path_patterns)
+
+    def __bool__(self) -> bool:
+        return bool(self.patterns)
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def match(self, path_str: str) -> Optional[str]:
+        """
+        Returns the pattern (as originally given) that matches path_str, or None.
+        When several patterns match, full-path patterns are reported first, then
+        basename patterns, then directory patterns.
+        """
+        # Same normalisation as Path(path_str) followed by str() with '/' separators
+        parts = [
+            part
+            for part in path_str.replace(os.sep, "/").split("/")
+            if part and part != "."
+        ]
+
+        if self._full_path_re is not None:
+            m = self._full_path_re.match("/".join(parts) or ".")
+            if m:
+                return self._full_path_sources[int(m.lastgroup[1:])]
+        if self._basename_re is not None:
+            m = self._basename_re.match(parts[-1] if parts else "")
+            if m:
+                return self._basename_sources[int(m.lastgroup[1:])]
+        if self._dir_re is not None:
+            for part in parts:
+                m = self._dir_re.match(part)
+                if m:
+                    return self._dir_sources[int(m.lastgroup[1:])]
+        return None
+
+    def matches(self, path_str: str) -> bool:
+        """Checks if path_str matches any pattern in the set."""
+        return self.match(path_str) is not None
@@ -0,0 +1,443 @@
+# dirdigest/dirdigest/watch.py
+import bisect
+import ctypes
+import ctypes.util
+import os
+import pathlib
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Set, Tuple
+
+from dirdigest import budget, core
+from dirdigest.constants import IGNORE_FILENAMES
+from dirdigest.core import DigestItemNode, ProcessedItemPayload, TraversalStats
+from dirdigest.utils.cache import MemoryContentCache
+from dirdigest.utils.logger import logger
+
+DEFAULT_POLL_INTERVAL_SECONDS = 1.0
+# Editors often save in several steps (write temp, rename, chmod); wait for the burst to end
+DEBOUNCE_SECONDS = 0.2
+
+# inotify event masks (see inotify(7))
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+INOTIFY_WATCH_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+)
+# Events after which the changed files cannot be told from the event itself
+INOTIFY_RESCAN_MASK = IN_ISDIR | IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED
+# struct inotify_event: wd, mask, cookie, len, then len bytes of NUL-padded name
+INOTIFY_EVENT_HEADER = struct.Struct("iIII")
+
+# traversal_options under which one file's change can change which other files are
+# admitted (the limits count files in walk order), so only a rescan is exact
+RESCAN_ONLY_OPTIONS = ("max_files", "max_total_size_kb")
+
+DigestChangeCallback = Callable[[DigestItemNode, Dict[str, Any]], None]
+
+
+class _InotifyWaiter:
+    """
+    Blocks until something changes in one of the watched directories (Linux inotify)
+    and reports which files changed.
+    """
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c")
+        if not sys.platform.startswith("linux") or not libc_name:
+            raise OSError("inotify is only available on Linux")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_init1 failed: {os.strerror(errno)}")
+        self._watch_descriptors: Dict[str, int] = {}
+        self._directories_by_wd: Dict[int, str] = {}
+
+    def watch(self, directories: Set[str]) -> None:
+        """Makes the watched set equal `directories`."""
+        for directory in directories - self._watch_descriptors.keys():
+            wd = self._libc.inotify_add_watch(
+                self._fd, os.fsencode(directory), INOTIFY_WATCH_MASK
+            )
+            if wd >= 0:
+                self._watch_descriptors[directory] = wd
+                self._directories_by_wd[wd] = directory
+        for directory in self._watch_descriptors.keys() - directories:
+            wd = self._watch_descriptors.pop(directory)
+            del self._directories_by_wd[wd]
+            # Fails harmlessly if the kernel already dropped the watch (directory deleted)
+            self._libc.inotify_rm_watch(self._fd, wd)
+
+    def wait(self, timeout: float) -> Set[str] | None:
+        """
+        Waits for events and returns the paths of the files they name (after debouncing),
+        or an empty set on timeout. Returns None if the events do not say which files
+        changed: the queue overflowed, or a directory was created, removed or moved.
+        """
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        time.sleep(DEBOUNCE_SECONDS)
+        changed_paths: Set[str] = set()
+        needs_rescan = False
+        while True:  # Drain everything queued during the debounce
+            try:
+                data = os.read(self._fd, 65536)  # The kernel only returns whole events
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, name_length = INOTIFY_EVENT_HEADER.unpack_from(data, offset)
+                offset += INOTIFY_EVENT_HEADER.size
+                name = data[offset : offset + name_length].rstrip(b"\0")
+                offset += name_length
+                directory = self._directories_by_wd.get(wd)
+                if mask & IN_Q_OVERFLOW:
+                    needs_rescan = True
+                elif directory is None:  # Left over from a watch removed since
+                    continue
+                elif mask & INOTIFY_RESCAN_MASK or not name:
+                    needs_rescan = True
+                else:
+                    changed_paths.add(os.path.join(directory, os.fsdecode(name)))
+        return None if needs_rescan else changed_paths
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class _PollingWaiter:
+    """Fallback for platforms without inotify: asks for a rescan every interval."""
+
+    def watch(self, directories: Set[str]) -> None:
+        pass
+
+    def wait(self, timeout: float) -> Set[str] | None:
+        time.sleep(timeout)
+        return None
+
+    def close(self) -> None:
+        pass
+
+
+class DigestWatcher:
+    """
+    Keeps a digest tree resident in memory and patches it as files change.
+
+    A refresh given the files that changed runs the normal traversal restricted to
+    them (core.process_directory_recursive's only_paths), so filtering rules are
+    identical but only those files and the directories leading to them are looked
+    at. A full rescan is made when the changes are not known, when an ignore file
+    changed, or when one file can affect others (RESCAN_ONLY_OPTIONS, max_tokens,
+    or with dedup_content, a changed file whose old or new content another file shares).
+    Either way contents come from an in-memory cache keyed by file fingerprint:
+    only new or modified files are read. Only file nodes whose data changed are
+    touched in the tree; folders are created and pruned as files appear and disappear.
+    """
+
+    def __init__(
+        self,
+        base_dir_path: pathlib.Path,
+        traversal_options: Dict[str, Any],
+        max_tokens: int | None = None,
+        on_excluded: Callable[[core.Exclusion], None] | None = None,
+    ):
+        """
+        traversal_options are passed to core.process_directory_recursive
+        (include_patterns, exclude_patterns, max_size_kb, ...). With max_tokens,
+        every scan is run through budget.apply_token_budget. on_excluded, if given,
+        receives the exclusions of the initial scan (not of rescans).
+        """
+        self.base_dir_path = base_dir_path
+        self.traversal_options = dict(traversal_options)
+        self.max_tokens = max_tokens
+        self._content_cache = MemoryContentCache()
+        self._directories: Set[str] = set()
+        # Files excluded by the last scan, and the count of other excluded items (directories)
+        self._excluded_files: Set[str] = set()
+        self._excluded_directories_count = 0
+        # With dedup_content: the file showing each content, and the files others refer to
+        self._path_by_content: Dict[str, str] = {}
+        self._duplicated_paths: Set[str] = set()
+
+        self._items, self._stats = self._scan(on_excluded)
+        self.root_node, self.metadata = core.build_digest_tree(
+            base_dir_path,
+            ((pathlib.Path(rel), "file", attrs) for rel, attrs in self._items.items()),
+            self._stats,
+        )
+        self._file_nodes: Dict[str, DigestItemNode] = {}
+        self._folder_nodes: Dict[str, DigestItemNode] = {"": self.root_node}
+        self._index_tree(self.root_node)
+
+    def _index_tree(self, node: DigestItemNode) -> None:
+        for child in node.get("children", []):
+            if child["type"] == "folder":
+                self._folder_nodes[child["relative_path"]] = child
+                self._index_tree(child)
+            else:
+                self._file_nodes[child["relative_path"]] = child
+
+    def _scan(
+        self, on_excluded: Callable[[core.Exclusion], None] | None = None
+    ) -> Tuple[Dict[str, ProcessedItemPayload], TraversalStats]:
+        """Runs the traversal, returning included items by relative path and the stats."""
+        directories: Set[str] = set()
+        excluded_files: Set[str] = set()
+
+        def record_exclusion(exclusion: core.Exclusion) -> None:
+            if exclusion.item_type == "file":
+                excluded_files.add(exclusion.relative_path)
+            if on_excluded is not None:
+                on_excluded(exclusion)
+
+        items_generator, stats = core.process_directory_recursive(
+            base_dir_path=self.base_dir_path,
+            content_cache=self._content_cache,
+            on_directory=directories.add,
+            on_excluded=record_exclusion,
+            **self.traversal_options,
+        )
+        if self.max_tokens is not None:
+            items_generator = budget.apply_token_budget(items_generator, stats, self.max_tokens)
+        items = {str(rel): attrs for rel, _, attrs in items_generator}
+        base_dir_str = str(self.base_dir_path)
+        self._content_cache.retain({os.path.join(base_dir_str, rel) for rel in items})
+        self._directories = directories
+        self._excluded_files = excluded_files
+        self._excluded_directories_count = stats["excluded_items_count"] - len(excluded_files)
+        if self.traversal_options.get("dedup_content"):
+            self._path_by_content = {
+                attrs["content"]: rel
+                for rel, attrs in items.items()
+                if isinstance(attrs.get("content"), str) and attrs["content"]
+            }
+            self._duplicated_paths = {
+                attrs["duplicate_of"] for attrs in items.values() if attrs.get("duplicate_of")
+            }
+        return items, stats
+
+    def _scan_files(
+        self, relative_paths: Set[str]
+    ) -> Tuple[Dict[str, ProcessedItemPayload], Set[str]]:
+        """
+        Runs the traversal over relative_paths only, returning the included items by
+        relative path and the paths excluded. Paths missing from both no longer exist.
+        """
+        excluded_files: Set[str] = set()
+        items_generator, _ = core.process_directory_recursive(
+            base_dir_path=self.base_dir_path,
+            content_cache=self._content_cache,
+            on_excluded=lambda exclusion: excluded_files.add(exclusion.relative_path),
+            only_paths=relative_paths,
+            **self.traversal_options,
+        )
+        items = {str(rel): attrs for rel, _, attrs in items_generator}
+        base_dir_str = str(self.base_dir_path)
+        self._content_cache.discard(
+            os.path.join(base_dir_str, rel) for rel in relative_paths if rel not in items
+        )
+        return items, excluded_files
+
+    def _shares_content(self, relative_paths: Set[str], items: Dict[str, ProcessedItemPayload]) -> bool:
+        """
+        With dedup_content, whether a file in relative_paths shared its previous content
+        or shares its new one (items) with another file: which copy shows the content
+        depends on walk order, so only a rescan settles it.
+        """
+        if not self.traversal_options.get("dedup_content"):
+            return False
+        for relative_path in relative_paths:
+            previous_attributes = self._items.get(relative_path, {})
+            if previous_attributes.get("duplicate_of") or relative_path in self._duplicated_paths:
+                return True
+            attributes = items.get(relative_path, {})
+            if attributes.get("duplicate_of"):  # A copy of another changed file
+                return True
+            content = attributes.get("content")
+            if isinstance(content, str) and self._path_by_content.get(content, relative_path) != relative_path:
+                return True
+        return False
+
+    def _needs_rescan(self, changed_paths: Set[str]) -> bool:
+        """Whether changes to changed_paths can affect files other than those."""
+        if self.max_tokens is not None or any(
+            self.traversal_options.get(option) for option in RESCAN_ONLY_OPTIONS
+        ):
+            return True
+        return any(
+            os.path.basename(path) in IGNORE_FILENAMES or path in self._directories
+            for path in changed_paths
+        )
+
+    def _ensure_folder(self, relative_dir: str) -> DigestItemNode:
+        folder_node = self._folder_nodes.get(relative_dir)
+        if folder_node is None:
+            parent_node = self._ensure_folder(os.path.dirname(relative_dir))
+            folder_node = {"relative_path": relative_dir, "type": "folder", "children": []}
+            bisect.insort(
+                parent_node["children"], folder_node, key=lambda n: n["relative_path"]
+            )
+            self._folder_nodes[relative_dir] = folder_node
+        return folder_node
+
+    def _add_file(self, relative_path: str, attributes: ProcessedItemPayload) -> None:
+        file_node = core.file_node_from_item(relative_path, attributes)
+        parent_node = self._ensure_folder(os.path.dirname(relative_path))
+        bisect.insort(parent_node["children"], file_node, key=lambda n: n["relative_path"])
+        self._file_nodes[relative_path] = file_node
+
+    def _update_file(self, relative_path: str, attributes: ProcessedItemPayload) -> None:
+        file_node = self._file_nodes[relative_path]
+        file_node.clear()  # In place, so the parent's children list stays untouched
+        file_node.update(core.file_node_from_item(relative_path, attributes))
+
+    def _remove_file(self, relative_path: str) -> None:
+        file_node = self._file_nodes.pop(relative_path)
+        relative_dir = os.path.dirname(relative_path)
+        self._folder_nodes[relative_dir]["children"].remove(file_node)
+        # Prune folders left empty, walking up towards the root
+        while relative_dir and not self._folder_nodes[relative_dir]["children"]:
+            folder_node = self._folder_nodes.pop(relative_dir)
+            relative_dir = os.path.dirname(relative_dir)
+            self._folder_nodes[relative_dir]["children"].remove(folder_node)
+
+    def _patch_tree(self, relative_paths: Set[str], items: Dict[str, ProcessedItemPayload]) -> int:
+        """
+        Brings the tree nodes for relative_paths in line with items (where a path
+        missing from items is no longer included). Returns how many changed.
+        """
+        changed_count = 0
+        for relative_path in relative_paths:
+            previous_attributes = self._items.get(relative_path)
+            attributes = items.get(relative_path)
+            if attributes is None:
+                if previous_attributes is None:
+                    continue
+                self._remove_file(relative_path)
+                del self._items[relative_path]
+            elif previous_attributes is None:
+                self._add_file(relative_path, attributes)
+                self._items[relative_path] = attributes
+            elif previous_attributes != attributes:
+                self._update_file(relative_path, attributes)
+                self._items[relative_path] = attributes
+            else:
+                continue
+            changed_count += 1
+        return changed_count
+
+    def refresh(self, changed_paths: Set[str] | None = None) -> int:
+        """
+        Patches the resident tree to match the directory. With changed_paths (absolute
+        paths of the files that changed, as reported by inotify), only those files are
+        looked at, unless _needs_rescan; otherwise the directory is rescanned.
+        Returns the number of files added, modified or removed.
+        """
+        if changed_paths is None or self._needs_rescan(changed_paths):
+            items, self._stats = self._scan()
+            changed_count = self._patch_tree(self._items.keys() | items.keys(), items)
+            self._items = items  # In walk order
+            logger.debug(f"Watch: Rescan found {changed_count} changed file(s)")
+        else:
+            base_dir_str = str(self.base_dir_path)
+            relative_paths = {os.path.relpath(path, base_dir_str) for path in changed_paths}
+            previous_token_counts = {
+                relative_path: self._items[relative_path].get("token_count")
+                for relative_path in relative_paths
+                if relative_path in self._items
+            }
+            items, excluded_files = self._scan_files(relative_paths)
+            if self._shares_content(relative_paths, items):
+                return self.refresh()
+            if self.traversal_options.get("dedup_content"):
+                for relative_path in relative_paths:
+                    previous_content = self._items.get(relative_path, {}).get("content")
+                    if self._path_by_content.get(previous_content) == relative_path:
+                        del self._path_by_content[previous_content]
+                    content = items.get(relative_path, {}).get("content")
+                    if isinstance(content, str) and content:
+                        self._path_by_content[content] = relative_path
+            changed_count = self._patch_tree(relative_paths, items)
+            self._excluded_files.difference_update(relative_paths)
+            self._excluded_files.update(excluded_files)
+            self._stats["included_files_count"] = len(self._items)
+            self._stats["excluded_items_count"] = (
+                self._excluded_directories_count + len(self._excluded_files)
+            )
+            directory_token_counts = self._stats.get("directory_token_counts")
+            if directory_token_counts is not None:
+                for relative_path in relative_paths:
+                    previous_token_count = previous_token_counts.get(relative_path)
+                    if previous_token_count is not None:
+                        core._credit_directory_tokens(
+                            directory_token_counts, relative_path, -previous_token_count
+                        )
+                    token_count = items.get(relative_path, {}).get("token_count")
+                    if token_count is not None:
+                        core._credit_directory_tokens(directory_token_counts, relative_path, token_count)
+            logger.debug(
+                f"Watch: {changed_count} of {len(relative_paths)} reported file(s) changed"
+            )
+
+        if changed_count:
+            self.metadata = core.digest_metadata(
+                self.base_dir_path,
+                self._stats,
+                sum(attrs.get("size_kb") or 0.0 for attrs in self._items.values()),
+            )
+        return changed_count
+
+    def run(
+        self,
+        on_change: DigestChangeCallback,
+        poll_interval: float = DEFAULT_POLL_INTERVAL_SECONDS,
+        use_inotify: bool = True,
+        stop_event: threading.Event | None = None,
+    ) -> None:
+        """
+        Waits for filesystem changes and calls on_change(root_node, metadata) after
+        each refresh that changed something. Runs until stop_event is set (or forever).
+        """
+        waiter: _InotifyWaiter | _PollingWaiter
+        try:
+            waiter = _InotifyWaiter() if use_inotify else _PollingWaiter()
+            logger.debug(f"Watch: Using {type(waiter).__name__}")
+        except OSError as e:
+            logger.info(f"Watch: inotify unavailable ({e}), polling every {poll_interval}s")
+            waiter = _PollingWaiter()
+
+        try:
+            while stop_event is None or not stop_event.is_set():
+                waiter.watch(self._directories)
+                changed_paths = waiter.wait(poll_interval)
+                if changed_paths is not None and not changed_paths:
+                    continue  # Timed out
+                if self.refresh(changed_paths):
+                    on_change(self.root_node, self.metadata)
+        finally:
+            waiter.close()
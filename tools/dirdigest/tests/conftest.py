@@ -9,6 +9,16 @@ from unittest import mock
 # Define the root for mock directory structures, relative to this conftest.py file
 MOCK_DIRS_ROOT = Path(__file__).parent / "fixtures" / "test_dirs"
 
+@pytest.fixture(autouse=True)
+def isolated_content_cache(tmp_path_factory, monkeypatch) -> Path:
+    """
+    Points the persistent content cache at a per-test temporary directory so tests
+    never read from or write to the user's real ~/.cache/dirdigest.
+    """
+    cache_dir = tmp_path_factory.mktemp("dirdigest_cache")
+    monkeypatch.setenv("DIRDIGEST_CACHE_DIR", str(cache_dir))
+    return cache_dir
+
 @pytest.fixture
 def runner() -> CliRunner:
     """Provides a Click CliRunner instance for invoking CLI commands."""
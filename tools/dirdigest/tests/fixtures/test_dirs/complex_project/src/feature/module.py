@@ -0,0 +1 @@
+class MyModule: pass
@@ -0,0 +1 @@
+def helper(): pass
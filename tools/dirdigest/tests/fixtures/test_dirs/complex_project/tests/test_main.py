@@ -0,0 +1 @@
+# test main
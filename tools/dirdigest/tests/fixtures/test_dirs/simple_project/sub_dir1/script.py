@@ -0,0 +1,18 @@
+6KE+KY9YzK2iIPy9ENZHUXX5/wINaPJC+HyT1rVAQVpxuZJyMj0X/hV3neExhxxT+7JTKtHTLJg5
+leqSjwnvB1dPUGt3mi025pf+m6o/9RWYw3LwUvjU+6Cn0Qx53Ve1WD9SQm0l1M62F+tOWSYhGVZp
+D6kE4/4UFpMUY3NFeg1yiJs2HYG/D89Yl9LmQBUUj0xQIr80nqk/yphqgEdpzm0Fr/bdDQXOBFlK
+qYkMvEF5rUASVojiYOSlNgGAB7i3HsLu0+/J/PpOXUBeymXKI5p2OMnpwQmZhuGYnhw37HrHGLdN
+jrHNsW3DLTvEEkKtuV7lDiE/+2EnjMUNFJ8RWZZbER8kqiC1RpSR9LJZIrFz0rlPL4nOBe1sIV+l
+ryZHsnaztnZmUdy3MGGPIhctGo9sHN3RpAPUul4hiMOgdQcksX6ZfuIAdgMQEEaKPy+bFGPtp5Yi
+gz50VhEdiOSPvb5HPpUZr41wnj2v6mtuK80RynxaSz7v92P2Y+ZaftWni14QsBJI9bzh/EagDsNq
+2uv1JQAmETTZ4CH9UDdc0hsHI/iOSoqK8Yz26iUsMfYRmRr1IT1mONwuRrNQkalTyX7j5jIDJyn1
+BZkR6NdLzJurEe2uEFJLEgiOubF1xUf9N05BYvLpbh0uZNK8ra4udv/56dVSJFFgwrEl73SWeFVn
+r1HObQXfe112+7/vIFLfsSMXvn0JGQ8QsWAG2z+2+pdn55btRjUKdVjZGUXLp6RBPRRXz5hIGnfK
+YzlTd+ibGoLrRnSDc5ZLW8UixF4GmFqCYqGaHd6lU4x1xGFRp9r1tAnNenXx1qXzyjNdyUTV9h/x
+hETvPhEedLvMy6auAEqD5Gxy2EC5XqGidxb6GvX7FDV1olTuZS607UlYvnW2Ug2fXVV2CikIPrXK
+FW4aRTgWbZnWrtaXWs4qAFLiRsCU1KzN4EOBaPda1yODLsmrxBRbyDCFto6rUx0OxLdn5XbtbOvL
+R7QmMUD75X6MNdc+A1aCeN14I9zMscJ/fTajAmXXsE21dZ2bH6exU4aOD3HY1kSmBQlxGVp2FniE
+saz6IyZhyTwcboGCrpsTXXposo3u0HRXamcGpQy04nQCqQYZxY4B1xSke4QUHkrFzzMhQuSxzDxQ
+Lyo60D/kZ1IfUkgVHfpvpXIFD6fBBmhyLUjqpYJM0lCXDwV1fLr+WX01G9Np+omKsRRk+Q/JFi3A
+R2wk4QhKM/Kc7HyfLWFjHu2PtiNHy0LVu3yvM6E9gzcHAG+MTs65utHNttwhESVauIP8fpJExRLW
+ESJnh5+EONsFBJZfJX4JWfNNCj3EYGRThwFw31wzfKeMa+a3L8eY29tvHrOrnEdQIv1MdMy4Zg==
@@ -264,12 +264,36 @@ def test_cli_max_depth_option_parsing(
     assert kwargs["max_depth"] == 3
 
 
+@mock.patch("dirdigest.core.process_directory_recursive")
+@mock.patch("dirdigest.core.build_digest_tree", return_value=({}, {}))
+@mock.patch("dirdigest.formatter.MarkdownFormatter.format", return_value="Mocked Markdown")
+@pytest.mark.parametrize("temp_test_dir", ["simple_project"], indirect=True)
+def test_cli_workers_option_parsing(
+    mock_md_format, mock_build_tree, mock_process_dir,
+    runner: CliRunner, temp_test_dir: Path
+):
+    """
+    Test ID: (Parallel reads)
+    Description: Verifies that '--workers' is parsed and passed as 'workers' to the core
+    processing function, and that it defaults to None (serial reads). Mocks core functions.
+    """
+    mock_process_dir.return_value = (iter([]), {})
+
+    runner.invoke(dirdigest_cli.main_cli, ["--workers", "4"])
+    assert mock_process_dir.call_args.kwargs["workers"] == 4
+
+    runner.invoke(dirdigest_cli.main_cli, [])
+    assert mock_process_dir.call_args.kwargs["workers"] is None
+
+
 @pytest.mark.parametrize(
     "flag_name, arg_name_in_core, expected_value",
     [
         ("--no-default-ignore", "no_default_ignore", True),    # CLI-013
         ("--follow-symlinks", "follow_symlinks", True),      # CLI-014
         ("--ignore-errors", "ignore_read_errors", True),      # CLI-015
+        ("--ignore-files", "ignore_files", True),
+        ("--dedup", "dedup_content", True),
     ]
 )
 @mock.patch("dirdigest.core.process_directory_recursive")
@@ -296,6 +320,28 @@ def test_cli_boolean_flags_for_core(
     assert kwargs.get(arg_name_in_core) == expected_value
 
 
+@pytest.mark.parametrize("arg_name_in_core", ["ignore_files", "dedup_content"])
+@mock.patch("dirdigest.core.process_directory_recursive")
+@mock.patch("dirdigest.core.build_digest_tree", return_value=({}, {}))
+@mock.patch("dirdigest.formatter.MarkdownFormatter.format", return_value="Mocked Markdown")
+@pytest.mark.parametrize("temp_test_dir", ["simple_project"], indirect=True)
+def test_cli_opt_in_flags_off_by_default(
+    mock_md_format, mock_build_tree, mock_process_dir,
+    runner: CliRunner, temp_test_dir: Path, arg_name_in_core: str
+):
+    """
+    Test ID: (Opt-in flags)
+    Description: Verifies that flags which change what an existing digest contains (honouring
+    .gitignore files, deduplicating identical files) are off unless given, so upgrading does not change anyone's output.
+    """
+    mock_process_dir.return_value = (iter([]), {})
+
+    runner.invoke(dirdigest_cli.main_cli, [])
+
+    mock_process_dir.assert_called_once()
+    assert mock_process_dir.call_args.kwargs.get(arg_name_in_core) is False
+
+
 @mock.patch("dirdigest.utils.clipboard.copy_to_clipboard")
 @pytest.mark.parametrize("temp_test_dir", ["simple_project"], indirect=True)
 def test_cli_no_clipboard_option(mock_copy_to_clipboard, runner: CliRunner, temp_test_dir: Path):
@@ -326,4 +372,115 @@ def test_cli_clipboard_called_by_default(mock_copy_to_clipboard, runner: CliRunn
     mock_copy_to_clipboard.assert_called_once()
     # Optional: Check content passed to clipboard
     # args, _ = mock_copy_to_clipboard.call_args
-    # assert "# Directory Digest" in args[0]
\ No newline at end of file
+    # assert "# Directory Digest" in args[0]
+
+@pytest.mark.parametrize("temp_test_dir", ["simple_project"], indirect=True)
+def test_cli_clipboard_uses_patched_pyperclip(mock_pyperclip, runner: CliRunner, temp_test_dir: Path):
+    """
+    Test ID: (Deferred pyperclip import)
+    Description: Verifies that patching 'dirdigest.utils.clipboard.pyperclip' (as the mock_pyperclip
+    fixture does) takes effect although pyperclip is only imported on first use, and that the
+    digest written to the output is what reaches the clipboard.
+    """
+    from dirdigest.utils import clipboard as dirdigest_clipboard
+
+    mock_copy, _mock_paste, clipboard_content = mock_pyperclip
+    result = runner.invoke(dirdigest_cli.main_cli, ["--no-cache", "-o", "digest.out", "-x", "*.out"])
+    assert result.exit_code == 0
+    mock_copy.assert_called_once()
+    assert clipboard_content["text"] == (temp_test_dir / "digest.out").read_text(encoding="utf-8")
+    assert dirdigest_clipboard.is_clipboard_available()
+
+    with mock.patch("dirdigest.utils.clipboard.pyperclip") as patched_pyperclip:
+        assert dirdigest_clipboard.copy_to_clipboard("text")
+    patched_pyperclip.copy.assert_called_once_with("text")
+
+@mock.patch("dirdigest.utils.clipboard.copy_to_clipboard")
+@pytest.mark.parametrize("temp_test_dir", ["simple_project"], indirect=True)
+def test_cli_output_write_error_reported(mock_copy_to_clipboard, runner: CliRunner, temp_test_dir: Path, tmp_path: Path):
+    """
+    Test ID: (Background output writer)
+    Description: Verifies that an error raised while the output thread writes the digest is
+    reported by the CLI, and that the clipboard, fed separately, still gets the complete digest.
+    """
+    log_path = tmp_path / "run.log"
+    with mock.patch("dirdigest.utils.logger.stdout_console.print", side_effect=OSError("No space left on device")):
+        result = runner.invoke(dirdigest_cli.main_cli, ["--no-cache", "--log-file", str(log_path)])
+    assert result.exit_code == 0
+
+    log_text = log_path.read_text(encoding="utf-8")
+    assert "Error during output formatting or writing. Type: OSError, Message: No space left on device" in log_text
+    mock_copy_to_clipboard.assert_called_once()
+    assert mock_copy_to_clipboard.call_args.args[0].startswith("# Directory Digest")
+
+@pytest.mark.parametrize("workers", [None, 2])
+@pytest.mark.parametrize("temp_test_dir", ["simple_project"], indirect=True)
+def test_cli_stats_json_option(runner: CliRunner, temp_test_dir: Path, tmp_path: Path, workers):
+    """
+    Test ID: (Run statistics)
+    Description: Verifies that '--stats-json' writes per-phase wall/CPU times and counters for the
+    run, that phase times are exclusive (nested phases are not counted twice), and that counters
+    agree with the digest that was written.
+    """
+    import json
+
+    stats_path = tmp_path / "stats.json"
+    output_path = tmp_path / "digest.md"
+    worker_args = ["--workers", str(workers)] if workers else []
+    result = runner.invoke(
+        dirdigest_cli.main_cli,
+        ["--no-clipboard", "--no-cache", "-o", str(output_path), "--stats-json", str(stats_path), *worker_args],
+    )
+    assert result.exit_code == 0, f"CLI failed. Stderr: {result.stderr}"
+
+    stats = json.loads(stats_path.read_text())
+    assert stats["dirdigest_version"] == TOOL_VERSION
+    for phase_name in ("enumerate", "filter", "stat", "read", "tree_build", "format", "write"):
+        assert stats["phases"][phase_name]["entries"] > 0, phase_name
+    counters = stats["counters"]
+    assert counters["files_opened"] == counters["stat_calls"] == stats["digest"]["included_files_count"]
+    assert counters["bytes_read"] == sum(
+        path.stat().st_size for path in temp_test_dir.rglob("*") if path.is_file() and not path.name.startswith(".")
+    )
+    assert counters["output_chars"] == len(output_path.read_text(encoding="utf-8"))
+    if workers is None:  # Everything ran on one thread, so exclusive phase times fit in the run
+        assert sum(phase["wall_seconds"] for phase in stats["phases"].values()) <= stats["wall_seconds"]
+
+    # Without the option nothing is written or recorded
+    stats_path.unlink()
+    result = runner.invoke(dirdigest_cli.main_cli, ["--no-clipboard", "--no-cache", "-o", str(output_path)])
+    assert result.exit_code == 0
+    assert not stats_path.exists()
+
+@pytest.mark.parametrize("temp_test_dir", ["simple_project"], indirect=True)
+def test_cli_logger_level_follows_handlers(runner: CliRunner, temp_test_dir: Path, tmp_path: Path):
+    """
+    Test ID: (Logging levels)
+    Description: Verifies that the 'dirdigest' logger is set to the lowest level a handler accepts,
+    so per-file messages are not built at the default verbosity, and that exclusion messages
+    (logged with deferred arguments) are still rendered in full for handlers that emit them.
+    """
+    import logging
+    from dirdigest.utils.logger import logger
+
+    output_path = tmp_path / "digest.md"
+    base_args = ["--no-clipboard", "--no-cache", "-o", str(output_path), "--exclude", "*.md"]
+    result = runner.invoke(dirdigest_cli.main_cli, base_args)
+    assert result.exit_code == 0, f"CLI failed. Stderr: {result.stderr}"
+    assert logger.level == logging.WARNING
+    assert not logger.isEnabledFor(logging.INFO)
+
+    result = runner.invoke(dirdigest_cli.main_cli, [*base_args, "-q"])
+    assert result.exit_code == 0
+    assert logger.level == logging.ERROR
+
+    log_path = tmp_path / "run.log"
+    result = runner.invoke(dirdigest_cli.main_cli, [*base_args, "--log-file", str(log_path)])
+    assert result.exit_code == 0
+    assert logger.level == logging.DEBUG  # The log file takes everything
+    log_text = log_path.read_text(encoding="utf-8")
+    assert (
+        "[log.excluded]Excluded file[/log.excluded]: [log.path]file2.md[/log.path] "
+        "([log.reason]Matches user-specified exclude pattern '*.md'[/log.reason])"
+    ) in log_text
+    assert "[log.included]Included file[/log.included]: [log.path]file1.txt[/log.path]" in log_text
@@ -178,4 +178,626 @@ class TestErrorHandling:
         assert "read_error" not in file_node, "UTF-8 test file has unexpected read_error."
         assert "你好世界" in file_node.get("content", ""), "UTF-8 content not read correctly."
         assert "Привет" in file_node.get("content", "")
-        assert "€αβγ" in file_node.get("content", "")
\ No newline at end of file
+        assert "€αβγ" in file_node.get("content", "")
+
+@pytest.mark.parametrize("temp_test_dir", ["content_processing_dir"], indirect=True)
+class TestContentCache:
+    def run_dirdigest_and_get_json(self, runner: CliRunner, extra_args: list) -> str:
+        cli_args = ["--format", "json", "--no-clipboard", "--ignore-errors"] + extra_args
+        with mock.patch("dirdigest.utils.logger.stdout_console.print") as mock_rich_print:
+            result = runner.invoke(dirdigest_cli.main_cli, cli_args)
+            json_output_str = "".join(str(call.args[0]) for call in mock_rich_print.call_args_list if call.args)
+        assert result.exit_code == 0, f"CLI failed. Stderr: {result.stderr}"
+        return json_output_str
+
+    def test_warm_run_serves_unchanged_files_from_cache(self, runner: CliRunner, temp_test_dir: Path):
+        """Test ID: (Content cache). A second run reads nothing from disk for unchanged files,
+        and produces the same content and decode errors as the first."""
+        cold_output = self.run_dirdigest_and_get_json(runner, [])
+        with mock.patch("builtins.open", side_effect=AssertionError("file was re-read")):
+            warm_output = self.run_dirdigest_and_get_json(runner, [])
+        assert json.loads(warm_output)["root"] == json.loads(cold_output)["root"]
+        binary_node = get_file_node_from_json(warm_output, "binary_file.bin")
+        assert "UnicodeDecodeError" in binary_node["read_error"]
+
+    def test_modified_file_is_reread(self, runner: CliRunner, temp_test_dir: Path):
+        """Test ID: (Content cache). A file whose size/mtime changed is read again."""
+        self.run_dirdigest_and_get_json(runner, [])
+        (temp_test_dir / "utf8_chars.txt").write_text("changed content", encoding="utf-8")
+        file_node = get_file_node_from_json(self.run_dirdigest_and_get_json(runner, []), "utf8_chars.txt")
+        assert file_node["content"] == "changed content"
+
+    def test_no_cache_flag_disables_cache(self, runner: CliRunner, temp_test_dir: Path, isolated_content_cache: Path):
+        """Test ID: (Content cache). '--no-cache' neither creates nor uses the cache database."""
+        self.run_dirdigest_and_get_json(runner, ["--no-cache"])
+        assert not any(isolated_content_cache.iterdir())
+
+
+@pytest.mark.parametrize("extra_args", [[], ["--no-clipboard"], ["--format", "json"], ["--format", "jsonl"]])
+@pytest.mark.parametrize("temp_test_dir", ["simple_project"], indirect=True)
+def test_default_run_with_cache_logs_no_warning(runner: CliRunner, temp_test_dir: Path, extra_args: list):
+    """Test ID: (Content cache). The cache is closed once per run, so a run using it logs no
+    warning (closing it a second time used to warn that the database was closed)."""
+    with mock.patch("dirdigest.utils.logger.logger.warning") as mock_warning, \
+         mock.patch("dirdigest.utils.clipboard.copy_to_clipboard"):
+        result = runner.invoke(dirdigest_cli.main_cli, ["-o", "digest.out", "-x", "*.out", *extra_args])
+    assert result.exit_code == 0, f"CLI failed. Stderr: {result.stderr}"
+    mock_warning.assert_not_called()
+
+
+def test_content_cache_evicts_least_recently_used(tmp_path: Path):
+    """Test ID: (Content cache). Eviction drops the oldest entries once max_bytes is exceeded."""
+    from dirdigest.utils.cache import ContentCache
+
+    files = []
+    for name in ("old.txt", "newer.txt", "newest.txt"):
+        file_path = tmp_path / name
+        file_path.write_text("x" * 100)
+        files.append(file_path)
+
+    content_cache = ContentCache(tmp_path / "cache", max_bytes=250)
+    for file_path in files:
+        content_cache.put(str(file_path), file_path.stat(), file_path.read_text(), None)
+    content_cache.close()
+
+    content_cache = ContentCache(tmp_path / "cache", max_bytes=250)
+    assert content_cache.get(str(files[0]), files[0].stat()) is None
+    assert content_cache.get(str(files[2]), files[2].stat())["content"] == "x" * 100
+    content_cache.close()
+
+
+def test_watcher_refresh_patches_only_changed_nodes(tmp_path: Path):
+    """Test ID: (Watch mode). A rescan re-reads only modified/new files, patches their nodes in
+    place, prunes emptied folders, and leaves unchanged nodes untouched."""
+    from dirdigest.watch import DigestWatcher
+
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "keep.py").write_text("keep")
+    (tmp_path / "src" / "edit.py").write_text("before")
+    (tmp_path / "old").mkdir()
+    (tmp_path / "old" / "gone.txt").write_text("gone")
+    watcher = DigestWatcher(
+        tmp_path,
+        dict(include_patterns=[], exclude_patterns=[], no_default_ignore=False, max_depth=None,
+             follow_symlinks=False, max_size_kb=300, ignore_read_errors=True),
+    )
+    src_node = watcher.root_node["children"][1]
+    keep_node, edit_node = src_node["children"][1], src_node["children"][0]
+    assert src_node["relative_path"] == "src" and keep_node["relative_path"] == "src/keep.py"
+    assert watcher.refresh() == 0
+
+    (tmp_path / "src" / "edit.py").write_text("after, longer")
+    (tmp_path / "old" / "gone.txt").unlink()
+    (tmp_path / "new").mkdir()
+    (tmp_path / "new" / "added.md").write_text("added")
+    real_open = open
+    opened_paths = []
+    def recording_open(path, *args, **kwargs):
+        opened_paths.append(os.path.basename(path))
+        return real_open(path, *args, **kwargs)
+    with mock.patch("builtins.open", side_effect=recording_open):
+        assert watcher.refresh() == 3
+
+    assert sorted(opened_paths) == ["added.md", "edit.py"]
+    assert [child["relative_path"] for child in watcher.root_node["children"]] == ["new", "src"]
+    assert watcher.root_node["children"][1] is src_node
+    assert src_node["children"][1] is keep_node and keep_node["content"] == "keep"
+    assert src_node["children"][0] is edit_node and edit_node["content"] == "after, longer"
+    assert watcher.metadata["included_files_count"] == 3
+
+
+WATCH_TRAVERSAL_OPTIONS = dict(
+    include_patterns=[], exclude_patterns=["*.log"], no_default_ignore=False, max_depth=None,
+    follow_symlinks=False, max_size_kb=300, ignore_read_errors=True, ignore_files=True,
+)
+
+
+def test_watcher_refresh_of_changed_files_skips_the_rest_of_the_tree(tmp_path: Path):
+    """Test ID: (Watch mode). Given the files that changed, a refresh only lists the directories
+    leading to them and stats only them, applies the same filters as a full scan, and ends with
+    the tree and counts a fresh scan would produce. Ignore-file changes fall back to a rescan."""
+    from dirdigest.watch import DigestWatcher
+
+    for package in ("a", "b", "c"):
+        (tmp_path / package / "deep").mkdir(parents=True)
+        (tmp_path / package / "deep" / "mod.py").write_text(f"# {package}")
+        (tmp_path / package / "README.md").write_text(package)
+    watcher = DigestWatcher(tmp_path, WATCH_TRAVERSAL_OPTIONS, on_excluded=lambda exclusion: None)
+
+    (tmp_path / "a" / "deep" / "mod.py").write_text("# a, edited")
+    (tmp_path / "a" / "README.md").unlink()
+    (tmp_path / "a" / "deep" / "new.py").write_text("new")
+    (tmp_path / "a" / "deep" / "debug.log").write_text("excluded by pattern")
+    changed_paths = {
+        str(tmp_path / "a" / "deep" / name) for name in ("mod.py", "new.py", "debug.log")
+    } | {str(tmp_path / "a" / "README.md")}
+    real_scandir = os.scandir
+    scanned_dirs = []
+    def recording_scandir(path):
+        scanned_dirs.append(os.path.relpath(path, tmp_path))
+        return real_scandir(path)
+    with mock.patch("os.scandir", side_effect=recording_scandir):
+        assert watcher.refresh(changed_paths) == 3
+
+    assert scanned_dirs == [".", "a", os.path.join("a", "deep")]
+    fresh = DigestWatcher(tmp_path, WATCH_TRAVERSAL_OPTIONS)
+    assert watcher.root_node == fresh.root_node
+    assert watcher.metadata["excluded_files_count"] == fresh.metadata["excluded_files_count"] == 1
+    assert watcher.metadata["included_files_count"] == fresh.metadata["included_files_count"] == 6
+
+    (tmp_path / ".gitignore").write_text("b/\n")
+    with mock.patch("os.scandir", side_effect=recording_scandir):
+        scanned_dirs.clear()
+        assert watcher.refresh({str(tmp_path / ".gitignore")}) == 2
+    assert os.path.join("c", "deep") in scanned_dirs  # Rescanned
+    assert watcher.root_node == DigestWatcher(tmp_path, WATCH_TRAVERSAL_OPTIONS).root_node
+
+
+def test_watcher_refresh_with_dedup_rescans_only_for_shared_content(tmp_path: Path):
+    """Test ID: (Watch mode, content dedup). With dedup, a changed file whose content no other file
+    shares is refreshed alone; one that becomes (or stops being) a copy of another triggers a rescan,
+    so the first copy in walk order keeps the content as in a fresh scan."""
+    from dirdigest.watch import DigestWatcher
+
+    options = dict(WATCH_TRAVERSAL_OPTIONS, dedup_content=True)
+    for package in ("a", "b"):
+        (tmp_path / package).mkdir()
+        (tmp_path / package / "LICENSE").write_text(f"license {package}")
+    (tmp_path / "b" / "main.py").write_text("main")
+    watcher = DigestWatcher(tmp_path, options)
+    real_scandir = os.scandir
+    scanned_dirs = []
+    def recording_scandir(path):
+        scanned_dirs.append(os.path.relpath(path, tmp_path))
+        return real_scandir(path)
+
+    for path, content, rescanned in (
+        (tmp_path / "b" / "main.py", "main, edited", False),
+        (tmp_path / "b" / "LICENSE", "license a", True),  # Becomes a copy of a/LICENSE
+        (tmp_path / "a" / "LICENSE", "license a, edited", True),  # Stops being shared
+    ):
+        path.write_text(content)
+        scanned_dirs.clear()
+        with mock.patch("os.scandir", side_effect=recording_scandir):
+            assert watcher.refresh({str(path)}) >= 1  # Which copy shows the content depends on scandir order
+        assert ("a" in scanned_dirs and "b" in scanned_dirs) == rescanned
+        fresh = DigestWatcher(tmp_path, options)
+        assert watcher.root_node == fresh.root_node
+        assert watcher.metadata.get("duplicate_files_count") == fresh.metadata.get("duplicate_files_count")
+
+
+def test_watcher_run_refreshes_files_reported_by_inotify(tmp_path: Path):
+    """Test ID: (Watch mode). run() waits on inotify and passes the paths it reports to refresh(),
+    then calls on_change with the updated tree; creating a directory triggers a full rescan."""
+    import threading
+    import time
+    from dirdigest import watch
+
+    try:
+        watch._InotifyWaiter().close()
+    except OSError as e:
+        pytest.skip(f"inotify unavailable: {e}")
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "main.py").write_text("before")
+    watcher = watch.DigestWatcher(tmp_path, WATCH_TRAVERSAL_OPTIONS)
+    refresh_calls = []
+    real_refresh = watcher.refresh
+    def recording_refresh(changed_paths=None):
+        refresh_calls.append(changed_paths)
+        return real_refresh(changed_paths)
+    changes = []
+    stop_event = threading.Event()
+    def on_change(root_node, metadata):
+        changes.append(metadata["included_files_count"])
+        if len(changes) == 2:
+            stop_event.set()
+
+    with mock.patch.object(watcher, "refresh", side_effect=recording_refresh):
+        runner_thread = threading.Thread(
+            target=watcher.run, args=(on_change,), kwargs=dict(poll_interval=0.05, stop_event=stop_event)
+        )
+        runner_thread.start()
+        try:
+            time.sleep(0.3)  # Let run() add its watches
+            (tmp_path / "src" / "main.py").write_text("after")
+            deadline = time.monotonic() + 5
+            while not changes and time.monotonic() < deadline:
+                time.sleep(0.05)
+            (tmp_path / "docs").mkdir()
+            (tmp_path / "docs" / "index.md").write_text("docs")
+            runner_thread.join(timeout=5)
+        finally:
+            stop_event.set()
+            runner_thread.join()
+
+    assert changes == [1, 2]
+    assert refresh_calls[0] == {str(tmp_path / "src" / "main.py")}
+    assert refresh_calls[-1] is None  # The new directory was rescanned
+    assert watcher.root_node["children"][1]["children"][0]["content"] == "after"
+
+
+@mock.patch("dirdigest.watch.DigestWatcher.run", side_effect=KeyboardInterrupt)
+@pytest.mark.parametrize("temp_test_dir", ["simple_project"], indirect=True)
+def test_cli_watch_writes_initial_digest_then_watches(mock_run, runner: CliRunner, temp_test_dir: Path):
+    """Test ID: (Watch mode). '--watch' emits the first digest, then hands over to the watcher
+    and exits cleanly on Ctrl+C."""
+    with mock.patch("dirdigest.utils.logger.stdout_console.print") as mock_rich_print:
+        result = runner.invoke(dirdigest_cli.main_cli, ["--watch", "--format", "json", "--no-clipboard"])
+        json_output_str = "".join(str(call.args[0]) for call in mock_rich_print.call_args_list if call.args)
+    assert result.exit_code == 0, f"CLI failed. Stderr: {result.stderr}"
+    assert get_file_node_from_json(json_output_str, "file1.txt") is not None
+    mock_run.assert_called_once()
+
+
+@pytest.mark.parametrize("temp_test_dir", ["content_processing_dir"], indirect=True)
+def test_lazy_content_defers_reads_to_output(runner: CliRunner, temp_test_dir: Path):
+    """Test ID: (Lazy content). With lazy_content, building the tree reads no file and file nodes
+    only carry LazyContent handles; the formatted output matches an eager '--ignore-errors' run."""
+    from dirdigest import core
+    from dirdigest.core import LazyContent
+
+    with mock.patch("builtins.open", side_effect=AssertionError("file read during traversal")):
+        items, stats = core.process_directory_recursive(
+            temp_test_dir, [], [], False, None, False, 300, True, lazy_content=True
+        )
+        root_node, metadata = core.build_digest_tree(temp_test_dir, items, stats)
+    file_nodes = [node for node in root_node["children"] if node["type"] == "file"]
+    assert file_nodes and all(isinstance(node["content"], LazyContent) for node in file_nodes)
+    assert metadata["total_content_size_kb"] > 0
+
+    outputs = {}
+    for output_format in ("json", "markdown"):
+        for mode_args in (["--ignore-errors"], ["--lazy-content"]):
+            cli_args = ["--format", output_format, "--no-clipboard"] + mode_args
+            with mock.patch("dirdigest.formatter.datetime") as mock_datetime, \
+                 mock.patch("dirdigest.utils.logger.stdout_console.print") as mock_rich_print:
+                mock_datetime.datetime.now.return_value.isoformat.return_value = "2024-01-01T00:00:00"
+                result = runner.invoke(dirdigest_cli.main_cli, cli_args)
+            assert result.exit_code == 0, f"CLI failed. Stderr: {result.stderr}"
+            outputs[output_format, mode_args[0]] = "".join(
+                str(call.args[0]) for call in mock_rich_print.call_args_list if call.args
+            )
+        assert outputs[output_format, "--lazy-content"] == outputs[output_format, "--ignore-errors"]
+    assert "UnicodeDecodeError" in get_file_node_from_json(outputs["json", "--lazy-content"], "binary_file.bin")["read_error"]
+
+
+def test_token_budget_selects_by_priority_and_truncates(tmp_path: Path):
+    """Test ID: (Token budget). apply_token_budget keeps whole files in priority order (entry
+    points, then source, then data), truncates the best file left out to the remaining budget,
+    omits the rest, and yields items in their original order."""
+    from dirdigest import budget
+    from dirdigest.core import LazyContent
+
+    items = [
+        (Path("data/rows.csv"), "file", {"size_kb": 4.0, "content": "a,b\n" * 1000}),
+        (Path("README.md"), "file", {"size_kb": 0.4, "content": "# Project\n" * 40}),
+        (Path("src/app/main.py"), "file", {"size_kb": 0.4, "content": "print('x')\n" * 40}),
+        (Path("src/big.py"), "file", {"size_kb": 2.0, "content": "value = 1\n" * 200}),
+        (Path("notes.txt"), "file", {"size_kb": 1.0, "content": LazyContent(str(tmp_path / "missing"), 1000, 0)}),
+    ]
+    stats = {"included_files_count": 5}
+    structure_tokens = 28  # Five files and three folders
+    whole_file_tokens = sum(budget.estimate_item_tokens(str(p), a["content"]) for p, _, a in items[1:3])
+    max_tokens = budget.DIGEST_OVERHEAD_TOKENS + structure_tokens + whole_file_tokens + 100
+
+    result = list(budget.apply_token_budget(iter(items), stats, max_tokens))
+
+    assert [path for path, _, _ in result] == [path for path, _, _ in items]
+    by_path = {str(path): attrs for path, _, attrs in result}
+    assert by_path["README.md"] is items[1][2] and by_path["src/app/main.py"] is items[2][2]
+    truncated = by_path["src/big.py"]["content"]
+    assert truncated.endswith(budget.TRUNCATION_MARKER) and truncated.startswith("value = 1\n")
+    assert len(truncated) < len(items[3][2]["content"])
+    for omitted_path in ("data/rows.csv", "notes.txt"):  # The lazy file is never read
+        assert by_path[omitted_path]["content"] is None
+        assert by_path[omitted_path]["omitted_reason"] == budget.OMITTED_REASON
+    assert stats["token_budget"]["omitted_files_count"] == 2
+    assert stats["token_budget"]["truncated_files_count"] == 1
+    assert stats["token_budget"]["estimated_tokens"] <= max_tokens
+
+
+def test_token_budget_omits_lazy_binary_truncation_candidate(tmp_path: Path):
+    """Test ID: (Token budget, lazy content). If the best file left out turns out to be binary when
+    loaded for truncation (no binary extension, NUL bytes in its content), it is omitted like any
+    other unreadable file instead of failing the digest."""
+    from dirdigest import budget
+    from dirdigest.core import LazyContent
+
+    readme_path = tmp_path / "README"
+    readme_path.write_bytes(b"a\0b\n" * 500)
+    readme_stat = readme_path.stat()
+    items = [
+        (Path("main.py"), "file", {"size_kb": 0.1, "content": "print('x')\n" * 5}),
+        (Path("README"), "file", {
+            "size_kb": 2.0,
+            "content": LazyContent(str(readme_path), readme_stat.st_size, readme_stat.st_mtime_ns),
+        }),
+    ]
+    stats = {"included_files_count": 2}
+    structure_tokens = 12  # Two files and the root
+    max_tokens = (
+        budget.DIGEST_OVERHEAD_TOKENS + structure_tokens
+        + budget.estimate_item_tokens("main.py", items[0][2]["content"]) + 100
+    )
+
+    result = list(budget.apply_token_budget(iter(items), stats, max_tokens))
+
+    by_path = {str(path): attrs for path, _, attrs in result}
+    assert by_path["main.py"]["content"] == "print('x')\n" * 5
+    assert by_path["README"]["content"] is None
+    assert by_path["README"]["omitted_reason"] == budget.OMITTED_REASON
+    assert stats["token_budget"]["omitted_files_count"] == 1
+    assert stats["token_budget"]["truncated_files_count"] == 0
+
+
+def test_token_budget_with_deduplicated_copies():
+    """Test ID: (Token budget, content dedup). A file whose identical copies point at it is ranked as
+    its best copy; if its content is still cut, the copies are omitted too rather than referring to
+    content that is not in the digest."""
+    from dirdigest import budget
+
+    shared = "col,value\n" * 60
+    items = [
+        (Path("a.csv"), "file", {"size_kb": 0.6, "content": shared}),
+        (Path("notes.txt"), "file", {"size_kb": 0.6, "content": "n" * len(shared)}),
+        (Path("sub/b.py"), "file", {"size_kb": 0.6, "content": None, "duplicate_of": "a.csv"}),
+    ]
+    structure_tokens = 20  # Three files, one folder and the root
+    fixed_tokens = budget.DIGEST_OVERHEAD_TOKENS + structure_tokens + budget.estimate_item_tokens("sub/b.py", "")
+    one_file_tokens = budget.estimate_item_tokens("a.csv", shared)
+
+    # Room for one file: a.csv (data, but a copy of source code) beats notes.txt
+    stats = {"duplicate_files_count": 1}
+    result = list(budget.apply_token_budget(iter(items), stats, fixed_tokens + one_file_tokens + 2))
+    by_path = {str(path): attrs for path, _, attrs in result}
+    assert by_path["a.csv"]["content"] == shared
+    assert by_path["sub/b.py"]["duplicate_of"] == "a.csv"
+    assert by_path["notes.txt"]["omitted_reason"] == budget.OMITTED_REASON
+    assert stats["duplicate_files_count"] == 1
+
+    # No room: a.csv is cut, and b.py no longer refers to it
+    stats = {"duplicate_files_count": 1}
+    result = list(budget.apply_token_budget(iter(items), stats, fixed_tokens))
+    by_path = {str(path): attrs for path, _, attrs in result}
+    assert by_path["a.csv"]["omitted_reason"] == budget.OMITTED_REASON
+    assert "duplicate_of" not in by_path["sub/b.py"]
+    assert by_path["sub/b.py"]["omitted_reason"] == budget.OMITTED_REASON
+    assert stats["duplicate_files_count"] == 0
+    assert stats["token_budget"]["omitted_files_count"] == 3
+
+
+@pytest.mark.parametrize("temp_test_dir", ["complex_project"], indirect=True)
+def test_cli_max_tokens_limits_digest(runner: CliRunner, temp_test_dir: Path):
+    """Test ID: (Token budget). '--max-tokens' keeps every file in the tree but omits content
+    that does not fit, and reports the budget in the metadata."""
+    cli_args = ["--format", "json", "--no-clipboard", "--max-tokens", "300"]
+    with mock.patch("dirdigest.utils.logger.stdout_console.print") as mock_rich_print:
+        result = runner.invoke(dirdigest_cli.main_cli, cli_args)
+        json_output_str = "".join(str(call.args[0]) for call in mock_rich_print.call_args_list if call.args)
+    assert result.exit_code == 0, f"CLI failed. Stderr: {result.stderr}"
+    data = json.loads(json_output_str)
+    token_budget = data["metadata"]["token_budget"]
+    assert token_budget["max_tokens"] == 300 and token_budget["omitted_files_count"] > 0
+    assert get_file_node_from_json(json_output_str, "README.md")["content"] == "# Complex Project\n"
+    omitted_node = get_file_node_from_json(json_output_str, "data/small_data.csv")
+    assert omitted_node["content"] is None and "max-tokens" in omitted_node["omitted_reason"]
+
+
+def write_test_bpe_vocabulary(path: Path) -> Path:
+    """A tiktoken-format vocabulary: all single bytes plus a few merges for 'def' and ' x'."""
+    import base64
+
+    tokens = [bytes([b]) for b in range(256)] + [b"de", b"def", b" x", b" x ="]  # " x =" spans pieces
+    path.write_text("".join(f"{base64.b64encode(t).decode()} {rank}\n" for rank, t in enumerate(tokens)))
+    return path
+
+
+def test_bpe_tokenizer_counts_and_registry_fallback(tmp_path: Path):
+    """Test ID: (Tokenizers). The offline BPE backend merges by rank within pre-tokenized pieces,
+    and get_tokenizer falls back to the heuristic for unknown or unloadable specs."""
+    from dirdigest.utils import tokens
+
+    vocab_path = write_test_bpe_vocabulary(tmp_path / "tiny.tiktoken")
+    tokenizer = tokens.get_tokenizer(f"bpe:{vocab_path}")
+    assert tokenizer.name == "bpe:tiny"
+    assert tokenizer.count("def") == 1
+    assert tokenizer.count("def f():") == 6  # "def", " f", "():" -> 1 + 2 + 3
+    assert tokenizer.count(" x = 1") == 5  # Pieces " x", " =", " ", "1"; merges never cross pieces
+    assert tokenizer.count("") == 0
+
+    assert isinstance(tokens.get_tokenizer("heuristic"), tokens.HeuristicTokenizer)
+    assert isinstance(tokens.get_tokenizer("nonexistent"), tokens.HeuristicTokenizer)
+    assert isinstance(tokens.get_tokenizer(f"bpe:{tmp_path / 'missing.tiktoken'}"), tokens.HeuristicTokenizer)
+
+
+@pytest.mark.parametrize("temp_test_dir", ["complex_project"], indirect=True)
+def test_tokenizer_counts_per_file_and_directory_once(runner: CliRunner, temp_test_dir: Path, tmp_path: Path):
+    """Test ID: (Tokenizers). '--tokenizer' reports per-file counts and per-directory totals, and a
+    warm run takes the counts from the content cache instead of tokenizing again."""
+    from dirdigest.utils.tokens import BPETokenizer
+
+    vocab_path = write_test_bpe_vocabulary(tmp_path / "tiny.tiktoken")
+    cli_args = ["--format", "json", "--no-clipboard", "--tokenizer", f"bpe:{vocab_path}"]
+
+    def run_and_get_json():
+        with mock.patch("dirdigest.utils.logger.stdout_console.print") as mock_rich_print:
+            result = runner.invoke(dirdigest_cli.main_cli, cli_args)
+            output = "".join(str(call.args[0]) for call in mock_rich_print.call_args_list if call.args)
+        assert result.exit_code == 0, f"CLI failed. Stderr: {result.stderr}"
+        return json.loads(output)
+
+    cold = run_and_get_json()
+    token_counts = cold["metadata"]["token_counts"]
+    assert token_counts["tokenizer"] == "bpe:tiny"
+    main_node = get_file_node_from_json(json.dumps(cold), "src/main.py")
+    assert main_node["token_count"] == BPETokenizer(vocab_path).count(main_node["content"])
+    src_total = sum(
+        get_file_node_from_json(json.dumps(cold), path)["token_count"]
+        for path in ("src/main.py", "src/utils.py", "src/feature/module.py")
+    )
+    assert token_counts["directories"]["src"] == src_total
+    assert token_counts["total"] == token_counts["directories"]["."] > src_total
+
+    with mock.patch.object(BPETokenizer, "count", side_effect=AssertionError("re-tokenized")):
+        warm = run_and_get_json()
+    assert warm["metadata"]["token_counts"] == token_counts
+
+    # An edited vocabulary under the same name is not served counts cached with the old one
+    vocab_lines = vocab_path.read_text().splitlines(keepends=True)
+    vocab_path.write_text("".join(vocab_lines[:256]))  # Single bytes only, no merges
+    edited = run_and_get_json()
+    assert edited["metadata"]["token_counts"]["tokenizer"] == "bpe:tiny"
+    utils_node = get_file_node_from_json(json.dumps(cold), "src/utils.py")  # Has "def"
+    edited_utils_node = get_file_node_from_json(json.dumps(edited), "src/utils.py")
+    assert edited_utils_node["token_count"] == BPETokenizer(vocab_path).count(utils_node["content"])
+    assert edited_utils_node["token_count"] > utils_node["token_count"]
+
+
+def test_binary_files_are_sniffed_before_decoding(runner: CliRunner, tmp_path: Path):
+    """Test ID: (Binary sniffing). Binary files are recognised from their first few KB (NUL bytes,
+    magic numbers) or their extension, without the rest of the file being read."""
+    import io
+    from dirdigest.constants import BINARY_SNIFF_BYTES
+    from dirdigest.core import BinaryContentError, _read_text
+
+    large_binary = io.BytesIO(b"\x00" * (4 * BINARY_SNIFF_BYTES))
+    with pytest.raises(BinaryContentError, match="NUL byte"):
+        _read_text(large_binary)
+    assert large_binary.tell() == BINARY_SNIFF_BYTES
+    with pytest.raises(BinaryContentError, match="signature"):
+        _read_text(io.BytesIO(b"%PDF-1.7\n" + b"x" * 100))
+    assert _read_text(io.BytesIO("crlf\r\nline\rend é".encode("utf-8"))) == "crlf\nline\nend é"
+
+    (tmp_path / "text.txt").write_text("plain text\n")
+    (tmp_path / "nul.txt").write_bytes(b"abc\x00def")
+    (tmp_path / "weights.safetensors").write_text("text, but the extension says binary")
+    with mock.patch("dirdigest.utils.logger.stdout_console.print") as mock_rich_print:
+        result = runner.invoke(
+            dirdigest_cli.main_cli,
+            [str(tmp_path), "--format", "json", "--no-clipboard", "--ignore-errors"],
+        )
+        output = "".join(str(call.args[0]) for call in mock_rich_print.call_args_list if call.args)
+    assert result.exit_code == 0, f"CLI failed. Stderr: {result.stderr}"
+    assert get_file_node_from_json(output, "text.txt")["content"] == "plain text\n"
+    assert "NUL byte" in get_file_node_from_json(output, "nul.txt")["read_error"]
+    assert get_file_node_from_json(output, "weights.safetensors")["read_error"].startswith(
+        "Binary file: binary extension"
+    )
+
+
+def test_large_file_truncated_after_stat_is_read(runner: CliRunner, tmp_path: Path):
+    """Test ID: (Memory-mapped reads). A file stat'ed above the mmap threshold but emptied or
+    shrunk before it is opened (e.g. by an editor saving it) is read as it is now, not mapped
+    at its old size."""
+    import builtins
+    from dirdigest import core
+
+    (tmp_path / "emptied.txt").write_text("x" * 2048)
+    (tmp_path / "shrunk.txt").write_text("y" * 2048)
+    new_content = {"emptied.txt": "", "shrunk.txt": "short\n"}
+    real_open = builtins.open
+
+    def truncating_open(file, mode="r", *args, **kwargs):
+        name = os.path.basename(str(file))
+        if name in new_content and mode == "rb":
+            with real_open(file, "w") as f:
+                f.write(new_content[name])
+        return real_open(file, mode, *args, **kwargs)
+
+    for worker_args in ([], ["--workers", "2"]):
+        with mock.patch.object(core, "MMAP_READ_THRESHOLD_BYTES", 1024), \
+                mock.patch("builtins.open", side_effect=truncating_open), \
+                mock.patch("dirdigest.utils.logger.stdout_console.print") as mock_rich_print:
+            result = runner.invoke(
+                dirdigest_cli.main_cli,
+                [str(tmp_path), "--format", "json", "--no-clipboard", "--no-cache", *worker_args],
+            )
+            output = "".join(str(call.args[0]) for call in mock_rich_print.call_args_list if call.args)
+        assert result.exit_code == 0, f"CLI failed: {result.exception!r}"
+        json.loads(output)
+        for name, content in new_content.items():
+            (tmp_path / name).write_text("z" * 2048)  # Large again for the next run
+            assert get_file_node_from_json(output, name)["content"] == content
+
+
+def test_large_files_are_memory_mapped_and_streamed(runner: CliRunner, tmp_path: Path):
+    """Test ID: (Memory-mapped reads). Files above the mmap threshold decode to the same text as
+    small files, and lazily loaded ones stream in chunks that split neither \\r\\n nor UTF-8 sequences."""
+    from dirdigest import core
+    from dirdigest.core import LazyContent, _read_text
+
+    raw = ("line é\r\n" * 500 + "last\r").encode("utf-8")
+    large_path = tmp_path / "generated.txt"
+    large_path.write_bytes(raw)
+    expected_text = raw.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+    handle = LazyContent(str(large_path), len(raw), large_path.stat().st_mtime_ns)
+
+    with mock.patch.object(core, "MMAP_READ_THRESHOLD_BYTES", 1024), \
+            mock.patch.object(core, "STREAM_CHUNK_BYTES", 7):
+        with open(large_path, "rb") as f:
+            assert _read_text(f, len(raw)) == expected_text
+        chunks = list(handle.iter_chunks())
+        assert len(chunks) > 1 and all(len(chunk) <= 7 for chunk in chunks)
+        assert "".join(chunks) == expected_text
+
+        (tmp_path / "invalid.txt").write_bytes(b"ok\n" * 1000 + b"\xff")
+        invalid = LazyContent(str(tmp_path / "invalid.txt"), 3001, (tmp_path / "invalid.txt").stat().st_mtime_ns)
+        with pytest.raises(UnicodeDecodeError):
+            invalid.iter_chunks()  # Validated before any chunk is handed out
+
+        outputs = {}
+        for mode_args in ([], ["--lazy-content"]):
+            output_path = tmp_path.parent / f"digest{len(mode_args)}.md"
+            result = runner.invoke(
+                dirdigest_cli.main_cli,
+                [str(tmp_path), "--format", "markdown", "--no-clipboard", "--ignore-errors",
+                 "-o", str(output_path), *mode_args],
+            )
+            assert result.exit_code == 0, f"CLI failed. Stderr: {result.stderr}"
+            outputs[tuple(mode_args)] = output_path.read_text().split("\n", 3)[3]  # Skip the timestamp
+    assert outputs[()] == outputs[("--lazy-content",)]
+    assert expected_text in outputs[("--lazy-content",)]
+
+
+def test_identical_files_are_emitted_once(runner: CliRunner, tmp_path: Path):
+    """Test ID: (Content dedup). Byte-identical files after the first refer to it instead of repeating
+    their content and no longer count towards token totals with --dedup; empty files, and runs without
+    --dedup (the default), are left alone."""
+    license_text = "MIT License\n\nPermission is hereby granted...\n"
+    (tmp_path / "LICENSE").write_text(license_text)
+    for package in ("pkg_a", "pkg_b"):
+        (tmp_path / package).mkdir()
+        (tmp_path / package / "LICENSE").write_text(license_text)
+        (tmp_path / package / "__init__.py").write_text("")
+        (tmp_path / package / "main.py").write_text(f"NAME = '{package}'\n")
+
+    def run_digest(*extra_args: str) -> str:
+        with mock.patch("dirdigest.utils.logger.stdout_console.print") as mock_rich_print:
+            result = runner.invoke(
+                dirdigest_cli.main_cli,
+                [str(tmp_path), "--no-clipboard", "--no-cache", "--tokenizer", "heuristic", *extra_args],
+            )
+        assert result.exit_code == 0, f"CLI failed. Stderr: {result.stderr}"
+        return "".join(str(call.args[0]) for call in mock_rich_print.call_args_list if call.args)
+
+    json_output = run_digest("--format", "json", "--dedup")
+    assert get_file_node_from_json(json_output, "LICENSE")["content"] == license_text
+    for package in ("pkg_a", "pkg_b"):
+        duplicate_node = get_file_node_from_json(json_output, f"{package}/LICENSE")
+        assert duplicate_node["duplicate_of"] == "LICENSE"
+        assert duplicate_node["content"] is None and "token_count" not in duplicate_node
+        assert "duplicate_of" not in get_file_node_from_json(json_output, f"{package}/__init__.py")
+    metadata = json.loads(json_output)["metadata"]
+    assert metadata["duplicate_files_count"] == 2
+    assert metadata["token_counts"]["directories"]["pkg_a"] == get_file_node_from_json(
+        json_output, "pkg_a/main.py"
+    )["token_count"]
+
+    markdown_output = run_digest("--format", "markdown", "--dedup")
+    assert markdown_output.count(license_text) == 1
+    assert "### `./pkg_b/LICENSE`\n*Identical to `./LICENSE` (content shown there).*" in markdown_output
+
+    for no_dedup_args in ([], ["--no-dedup"]):  # Off by default
+        json_output = run_digest("--format", "json", *no_dedup_args)
+        assert get_file_node_from_json(json_output, "pkg_b/LICENSE")["content"] == license_text
+        assert "duplicate_files_count" not in json.loads(json_output)["metadata"]
@@ -227,4 +227,116 @@ def test_json_output_metadata_and_root_structure(runner: CliRunner, temp_test_di
     assert root_node["type"] == "folder"
     assert "children" in root_node
     assert isinstance(root_node["children"], list)
-    assert len(root_node["children"]) == 3
\ No newline at end of file
+    assert len(root_node["children"]) == 3
+
+@pytest.mark.parametrize("temp_test_dir", ["complex_project"], indirect=True)
+def test_markdown_streamed_output_matches_format(runner: CliRunner, temp_test_dir: Path):
+    """
+    Test ID: (Streaming Markdown)
+    Description: Verifies that '-o FILE' writes the same Markdown with and without '--clipboard'
+    (which also collects the streamed chunks for the clipboard), and that format_stream never writes
+    a chunk holding more than one file's content.
+    """
+    with mock.patch("dirdigest.formatter.datetime") as mock_datetime, \
+         mock.patch("dirdigest.utils.clipboard.copy_to_clipboard") as mock_copy:
+        mock_datetime.datetime.now.return_value.isoformat.return_value = "2024-01-01T00:00:00"
+        result = runner.invoke(dirdigest_cli.main_cli, ["-o", "streamed.out", "-x", "*.out", "--no-clipboard"])
+        assert result.exit_code == 0
+        result = runner.invoke(dirdigest_cli.main_cli, ["-o", "buffered.out", "-x", "*.out", "--clipboard"])
+        assert result.exit_code == 0
+    buffered_output = mock_copy.call_args.args[0]
+    assert (temp_test_dir / "buffered.out").read_text(encoding="utf-8") == buffered_output
+    assert (temp_test_dir / "streamed.out").read_text(encoding="utf-8") == buffered_output
+
+    from dirdigest import core, formatter as dirdigest_formatter
+    items, stats = core.process_directory_recursive(
+        temp_test_dir, [], ["*.out"], False, None, False, 300, True
+    )
+    root_node, metadata = core.build_digest_tree(temp_test_dir, items, stats)
+    sink = mock.Mock()
+    dirdigest_formatter.MarkdownFormatter(temp_test_dir, metadata).format_stream(root_node, sink)
+    chunks = [call.args[0] for call in sink.write.call_args_list]
+    assert sum("```" in chunk for chunk in chunks) == 2 * metadata["included_files_count"] + 2
+
+
+@pytest.mark.parametrize("temp_test_dir", ["complex_project"], indirect=True)
+def test_jsonl_output_records(runner: CliRunner, temp_test_dir: Path):
+    """
+    Test ID: (JSON Lines output)
+    Description: Verifies '--format jsonl': a metadata record, one compact record per included file
+    (same files and contents as '--format json'), and a summary record with the final counts and
+    the same optional metadata (token counts, token budget, duplicates) as the JSON output.
+    """
+    outputs = {}
+    for output_format in ("json", "jsonl"):
+        with mock.patch("dirdigest.utils.logger.stdout_console.print") as mock_rich_print:
+            result = runner.invoke(dirdigest_cli.main_cli, ["--format", output_format, "--no-clipboard"])
+            outputs[output_format] = "".join(str(call.args[0]) for call in mock_rich_print.call_args_list if call.args)
+        assert result.exit_code == 0
+
+    records = [json.loads(line) for line in outputs["jsonl"].splitlines()]
+    header, file_records, summary = records[0], records[1:-1], records[-1]
+    assert header["type"] == "metadata" and header["tool_version"] == TOOL_VERSION
+    assert header["base_directory"] == str(temp_test_dir.resolve())
+    assert {record["relative_path"] for record in file_records} == get_included_files_from_json(outputs["json"])
+    assert all(record["type"] == "file" and record["content"] is not None for record in file_records)
+
+    json_metadata = json.loads(outputs["json"])["metadata"]
+    assert summary == {
+        "type": "summary",
+        "included_files_count": json_metadata["included_files_count"],
+        "excluded_files_count": json_metadata["excluded_files_count"],
+        "total_content_size_kb": json_metadata["total_content_size_kb"],
+    }
+
+    # Optional metadata (token counts, budget, duplicates) is carried by the summary record too
+    extra_args = ["--tokenizer", "heuristic", "--max-tokens", "200", "--dedup", "--no-clipboard"]
+    for output_format in ("json", "jsonl"):
+        with mock.patch("dirdigest.utils.logger.stdout_console.print") as mock_rich_print:
+            result = runner.invoke(dirdigest_cli.main_cli, ["--format", output_format, *extra_args])
+            outputs[output_format] = "".join(str(call.args[0]) for call in mock_rich_print.call_args_list if call.args)
+        assert result.exit_code == 0
+    json_metadata = json.loads(outputs["json"])["metadata"]
+    summary = json.loads(outputs["jsonl"].splitlines()[-1])
+    assert {"token_counts", "token_budget"} <= set(summary)
+    for key in ("token_counts", "token_budget", "duplicate_files_count"):
+        assert summary.get(key) == json_metadata.get(key)
+    assert summary["token_counts"]["tokenizer"] == "heuristic"
+
+
+@pytest.mark.parametrize("temp_test_dir", ["simple_project"], indirect=True)
+def test_jsonl_records_written_during_traversal(runner: CliRunner, temp_test_dir: Path):
+    """
+    Test ID: (JSON Lines output)
+    Description: Verifies that JSON Lines records are handed to the output writer while the traversal
+    is still running (no digest tree is built first).
+    """
+    from dirdigest import core
+
+    events = []
+    real_traversal = core.process_directory_recursive
+    real_write = dirdigest_cli._BackgroundWriter.write
+
+    def traced_write(self, chunk):
+        events.append(("write", chunk))
+        return real_write(self, chunk)
+
+    def traced_traversal(*args, **kwargs):
+        items, stats = real_traversal(*args, **kwargs)
+        def traced_items():
+            for item in items:
+                events.append(("read", str(item[0])))
+                yield item
+        return traced_items(), stats
+
+    with mock.patch("dirdigest.core.process_directory_recursive", side_effect=traced_traversal), \
+         mock.patch("dirdigest.core.build_digest_tree", side_effect=AssertionError("tree built")), \
+         mock.patch.object(dirdigest_cli._BackgroundWriter, "write", traced_write):
+        result = runner.invoke(dirdigest_cli.main_cli, ["--format", "jsonl", "--no-clipboard"])
+    assert result.exit_code == 0, result.output
+
+    kinds = [kind for kind, _ in events]
+    first_read = kinds.index("read")
+    assert kinds[:first_read] == ["write"]  # Only the metadata header precedes the walk
+    assert kinds.count("read") == 3
+    assert "write" in kinds[first_read:kinds.index("read", first_read + 1)]  # Interleaved
@@ -0,0 +1,473 @@
+# tests/test_performance.py
+
+import os
+import pathlib
+import subprocess
+import sys
+import time
+
+import pytest
+
+from dirdigest import core
+
+# Benchmarks build large synthetic trees and take a while, so they only run on request:
+#   DIRDIGEST_BENCHMARK=1 pytest tests/test_performance.py -s
+run_benchmarks = pytest.mark.skipif(
+    not os.environ.get("DIRDIGEST_BENCHMARK"),
+    reason="Set DIRDIGEST_BENCHMARK=1 to run performance benchmarks.",
+)
+
+
+def make_synthetic_tree(root: pathlib.Path, num_dirs: int, files_per_dir: int, depth: int = 1) -> int:
+    """
+    Creates num_dirs directories, each nested `depth` levels deep and holding files_per_dir
+    small files. Returns the number of files created.
+    """
+    for d in range(num_dirs):
+        dir_path = root.joinpath(*[f"dir_{d}_{level}" for level in range(depth)])
+        dir_path.mkdir(parents=True, exist_ok=True)
+        for f in range(files_per_dir):
+            (dir_path / f"file_{f}.txt").write_text("x")
+    return num_dirs * files_per_dir
+
+
+def legacy_walk_enumeration(base_dir_path: pathlib.Path) -> int:
+    """
+    Per-entry work done by the previous os.walk-based traversal: a Path per directory and
+    file, relative_to() per directory, a separate is_symlink() and stat() per file.
+    """
+    count = 0
+    for root, dirs, files in os.walk(str(base_dir_path)):
+        current_root_path = pathlib.Path(root)
+        relative_root_path = current_root_path.relative_to(base_dir_path)
+        for dir_name in dirs:
+            (current_root_path / dir_name).is_symlink()
+            str(relative_root_path / dir_name)
+        for file_name in files:
+            file_path_obj = current_root_path / file_name
+            str(relative_root_path / file_name)
+            file_path_obj.is_symlink()
+            file_path_obj.stat()
+            count += 1
+    return count
+
+
+def scandir_walk_enumeration(base_dir_path: pathlib.Path) -> int:
+    """The same per-entry work done through core._scandir_walk and cached DirEntry data."""
+    count = 0
+    for _, relative_root, _, dir_entries, file_entries in core._scandir_walk(str(base_dir_path), False):
+        relative_prefix = relative_root + os.sep if relative_root else ""
+        for dir_entry in dir_entries:
+            dir_entry.is_symlink()
+            relative_prefix + dir_entry.name
+        for file_entry in file_entries:
+            relative_prefix + file_entry.name
+            file_entry.is_symlink()
+            file_entry.stat()
+            count += 1
+    return count
+
+
+def test_scandir_walk_matches_os_walk_order(tmp_path: pathlib.Path):
+    """
+    Test ID: (Traversal engine)
+    Description: Verifies that core._scandir_walk visits directories in the same order as
+    os.walk(topdown=True) and classifies the same entries as directories and files.
+    """
+    make_synthetic_tree(tmp_path, num_dirs=4, files_per_dir=3, depth=3)
+    (tmp_path / "top_level.txt").write_text("x")
+
+    expected = [
+        (os.path.relpath(root, tmp_path), sorted(dirs), sorted(files))
+        for root, dirs, files in os.walk(str(tmp_path))
+    ]
+    actual = [
+        (relative_root or ".", sorted(e.name for e in dir_entries), sorted(e.name for e in file_entries))
+        for _, relative_root, _, dir_entries, file_entries in core._scandir_walk(str(tmp_path), False)
+    ]
+    assert actual == expected
+
+
+@run_benchmarks
+def test_benchmark_scandir_walk_100k_files(tmp_path: pathlib.Path):
+    """
+    Test ID: (Traversal engine benchmark)
+    Description: Compares the previous os.walk + pathlib per-entry enumeration against the
+    scandir walker on a synthetic 100k-file tree (100 directories x 1000 files).
+
+    Reference numbers (Linux container, warm dentry cache, Python 3.12):
+        os.walk + pathlib: ~2.5-3.2 s    scandir walker: ~0.33-0.44 s    (~7x faster)
+    """
+    num_files = make_synthetic_tree(tmp_path, num_dirs=100, files_per_dir=1000)
+
+    # Warm the dentry/inode caches so both runs measure Python-side overhead, not disk I/O
+    legacy_walk_enumeration(tmp_path)
+
+    start = time.perf_counter()
+    assert legacy_walk_enumeration(tmp_path) == num_files
+    before = time.perf_counter() - start
+
+    start = time.perf_counter()
+    assert scandir_walk_enumeration(tmp_path) == num_files
+    after = time.perf_counter() - start
+
+    print(f"\n{num_files} files: os.walk + pathlib {before:.3f}s, scandir walker {after:.3f}s "
+          f"({before / after:.1f}x)")
+    assert after < before
+
+
+def synthetic_processed_items(num_files: int, shape: str):
+    """
+    ProcessedItems as yielded by core.process_directory_recursive, without touching disk.
+    "wide": every file in its own folder, all folders side by side in one parent.
+    "deep": files spread over a chain of folders up to 200 levels deep.
+    """
+    for i in range(num_files):
+        if shape == "wide":
+            relative_path_str = os.path.join("generated", f"dir_{i}", f"file_{i}.txt")
+        else:
+            relative_path_str = os.path.join(*[f"d{level}" for level in range(i % 200)], f"file_{i}.txt")
+        # Built from one string like the traversal does; str() caches the rendered path
+        relative_path = pathlib.Path(relative_path_str)
+        str(relative_path)
+        yield relative_path, "file", {"size_kb": 0.001, "content": "x", "read_error": None}
+
+
+def test_build_digest_tree_deep_and_wide_structure():
+    """
+    Test ID: (Tree building)
+    Description: Verifies that build_digest_tree nests folders correctly for deep paths and keeps
+    every folder's children sorted, using synthetic items.
+    """
+    items = list(synthetic_processed_items(400, "deep")) + list(synthetic_processed_items(50, "wide"))
+    (generated_node,) = [child for child in core.build_digest_tree(pathlib.Path("."), iter(items), {})[0]["children"]
+                         if child["relative_path"] == "generated"]
+    assert [child["relative_path"] for child in generated_node["children"]] == sorted(
+        os.path.join("generated", f"dir_{i}") for i in range(50)
+    )
+    root_node, metadata = core.build_digest_tree(pathlib.Path("."), iter(reversed(items)), {"included_files_count": 450})
+    assert metadata["total_content_size_kb"] == 0.45
+
+    node, depth, files_seen = root_node, 0, 0
+    while True:
+        paths = [child["relative_path"] for child in node["children"]]
+        assert paths == sorted(paths)
+        files_seen += sum(child["type"] == "file" for child in node["children"])
+        folders = [child for child in node["children"] if child["type"] == "folder" and child["relative_path"] != "generated"]
+        if not folders:
+            break
+        (node,) = folders
+        depth += 1
+        assert node["relative_path"] == os.path.join(*[f"d{level}" for level in range(depth)])
+    assert depth == 199 and files_seen == 400
+
+
+@run_benchmarks
+@pytest.mark.parametrize("shape", ["wide", "deep"])
+def test_benchmark_build_digest_tree_scales_linearly(shape: str):
+    """
+    Test ID: (Tree building benchmark)
+    Description: Times build_digest_tree on 20k and 80k synthetic items in 20k/80k sibling
+    folders ("wide") or spread over folders up to 200 levels deep ("deep"). Linear scaling means
+    ~4x the time for 4x the items; the former per-level scan over a folder's children was
+    quadratic on the wide shape and rebuilt a Path per level on the deep one.
+
+    Reference numbers (Linux container, Python 3.12), previous builder -> indexed builder:
+        wide 20k: 37.8 s -> 0.16 s    deep 20k: 126.7 s -> 0.08 s
+    """
+    timings = {}
+    for num_files in (20_000, 80_000):
+        items = list(synthetic_processed_items(num_files, shape))
+        start = time.perf_counter()
+        core.build_digest_tree(pathlib.Path("."), iter(items), {})
+        timings[num_files] = time.perf_counter() - start
+
+    ratio = timings[80_000] / timings[20_000]
+    print(f"\n{shape}: 20k items {timings[20_000]:.3f}s, 80k items {timings[80_000]:.3f}s (x{ratio:.1f})")
+    assert ratio < 8  # Quadratic growth would be ~16x
+
+
+# --- Benchmark suite: synthetic repository shapes ---
+#
+# Each shape builds a tree under tmp_path, then the pipeline stages are timed one by one:
+# traversal (process_directory_recursive), build_digest_tree and every formatter. Throughput
+# (files/s, MB/s of included content) and peak traced memory per stage are compared against
+# tests/benchmark_baseline.json:
+#   DIRDIGEST_BENCHMARK=1 pytest tests/test_performance.py -k shape -s
+# DIRDIGEST_BENCHMARK_UPDATE=1 rewrites the baseline from this machine instead of comparing;
+# DIRDIGEST_BENCHMARK_SCALE (default 1.0) scales file counts; DIRDIGEST_BENCHMARK_TOLERANCE
+# (default 0.5) is the fraction by which throughput may drop, or memory grow, before it counts
+# as a regression. Baselines are machine-specific: update them on the machine you compare on.
+
+BENCHMARK_BASELINE_PATH = pathlib.Path(__file__).parent / "benchmark_baseline.json"
+BENCHMARK_STAGES = ("traverse", "build_tree", "format_markdown", "format_json", "format_jsonl")
+
+
+def _scaled(count: int, scale: float) -> int:
+    return max(1, int(count * scale))
+
+
+def make_deep_tree(root: pathlib.Path, scale: float) -> dict:
+    """A single chain of 150 nested directories with 20 source files at every level."""
+    dir_path = root
+    for level in range(_scaled(150, scale)):
+        dir_path = dir_path / f"level_{level}"
+        dir_path.mkdir()
+        for f in range(20):
+            (dir_path / f"mod_{f}.py").write_text(f"def f_{level}_{f}():\n    return {level * f}\n" * 5)
+    return {}
+
+
+def make_wide_tree(root: pathlib.Path, scale: float) -> dict:
+    """4000 sibling directories with 3 small files each."""
+    for d in range(_scaled(4000, scale)):
+        dir_path = root / f"pkg_{d}"
+        dir_path.mkdir()
+        for f in range(3):
+            (dir_path / f"file_{f}.js").write_text(f"export const v{d}_{f} = {d};\n" * 8)
+    return {}
+
+
+def make_many_small_file_tree(root: pathlib.Path, scale: float) -> dict:
+    """20 directories with 1000 files of about 100 bytes each."""
+    for d in range(20):
+        dir_path = root / f"dir_{d}"
+        dir_path.mkdir()
+        for f in range(_scaled(1000, scale)):
+            (dir_path / f"note_{f}.txt").write_text(f"note {d}/{f}: " + "lorem ipsum " * 7 + "\n")
+    return {}
+
+
+def make_few_huge_file_tree(root: pathlib.Path, scale: float) -> dict:
+    """6 text files of about 3 MB, above the memory-mapping threshold."""
+    line = "".join(chr(ord("a") + i % 26) for i in range(99)) + "\n"
+    for f in range(6):
+        (root / f"dump_{f}.txt").write_text(line * _scaled(30_000, scale))
+    return {"max_size_kb": 8192}
+
+
+def make_binary_heavy_tree(root: pathlib.Path, scale: float) -> dict:
+    """2000 files with unhelpful extensions: 4 in 5 are binary and must be sniffed, not decoded."""
+    dir_path = root / "assets"
+    dir_path.mkdir()
+    binary_payload = bytes(range(256)) * 16  # 4 KB containing NUL bytes
+    for f in range(_scaled(2000, scale)):
+        if f % 5:
+            (dir_path / f"blob_{f}.dat").write_bytes(binary_payload)
+        else:
+            (dir_path / f"meta_{f}.dat").write_text("key = value\n" * 40)
+    return {}
+
+
+def make_pattern_heavy_tree(root: pathlib.Path, scale: float) -> dict:
+    """250 modules filtered through 200 exclude patterns and 3 include patterns."""
+    for m in range(_scaled(250, scale)):
+        module_path = root / f"module_{m}"
+        (module_path / "src").mkdir(parents=True)
+        (module_path / "generated").mkdir()
+        (module_path / "README.md").write_text(f"# Module {m}\n")
+        for f in range(10):
+            (module_path / "src" / f"part_{f}.py").write_text(f"PART = {f}\n" * 10)
+            (module_path / "src" / f"part_{f}.gen{f}").write_text("generated\n")
+        for f in range(5):
+            (module_path / "generated" / f"out_{f}.py").write_text("# generated\n")
+    exclude_patterns = [f"module_{m}/generated" for m in range(0, 250, 2)]
+    exclude_patterns += [f"*.gen{g}" for g in range(10)]
+    exclude_patterns += [f"**/tmp_{p}/**" for p in range(200 - len(exclude_patterns))]
+    return {"include_patterns": ["*.py", "*.md", "**/README*"], "exclude_patterns": exclude_patterns}
+
+
+BENCHMARK_SHAPES = {
+    "deep": make_deep_tree,
+    "wide": make_wide_tree,
+    "many_small": make_many_small_file_tree,
+    "few_huge": make_few_huge_file_tree,
+    "binary_heavy": make_binary_heavy_tree,
+    "pattern_heavy": make_pattern_heavy_tree,
+}
+
+
+def run_pipeline_stages(base_dir_path: pathlib.Path, traversal_options: dict, trace_memory: bool = False) -> dict:
+    """
+    Runs traversal, tree building and each formatter once, in order. Returns
+    {stage: {"seconds", "peak_memory_mb"?}} plus the included file count and content bytes.
+    With trace_memory, tracemalloc's peak is reset before and read after every stage.
+    """
+    import io
+    import tracemalloc
+
+    from dirdigest import formatter
+
+    options = dict(
+        include_patterns=[], exclude_patterns=[], no_default_ignore=False, max_depth=None,
+        follow_symlinks=False, max_size_kb=300, ignore_read_errors=False,
+    )
+    options.update(traversal_options)
+    stages: dict = {}
+    results: dict = {}
+
+    def timed_stage(name, function):
+        if trace_memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        results[name] = function()
+        stages[name] = {"seconds": time.perf_counter() - start}
+        if trace_memory:
+            stages[name]["peak_memory_mb"] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        def traverse():
+            items_generator, stats = core.process_directory_recursive(base_dir_path=base_dir_path, **options)
+            return list(items_generator), stats
+
+        timed_stage("traverse", traverse)
+        items, stats = results["traverse"]
+        timed_stage("build_tree", lambda: core.build_digest_tree(base_dir_path, iter(items), stats))
+        root_node, metadata = results["build_tree"]
+        timed_stage("format_markdown", lambda: formatter.MarkdownFormatter(base_dir_path, metadata).format(root_node))
+        timed_stage("format_json", lambda: formatter.JsonFormatter(base_dir_path, metadata).format(root_node))
+        timed_stage(
+            "format_jsonl",
+            lambda: formatter.JsonLinesFormatter(base_dir_path, metadata).format_items_stream(
+                iter(items), stats, io.StringIO()
+            ),
+        )
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    return {
+        "stages": stages,
+        "files": len(items),
+        "content_bytes": sum(len(attributes.get("content") or "") for _, _, attributes in items),
+    }
+
+
+def measure_shape(base_dir_path: pathlib.Path, traversal_options: dict) -> dict:
+    """Throughput per stage from a timing run, and peak memory per stage from a separate traced run."""
+    run_pipeline_stages(base_dir_path, traversal_options)  # Warm the dentry/inode and page caches
+    timing_run = run_pipeline_stages(base_dir_path, traversal_options)
+    memory_run = run_pipeline_stages(base_dir_path, traversal_options, trace_memory=True)
+    measurements = {}
+    for stage in BENCHMARK_STAGES:
+        seconds = max(timing_run["stages"][stage]["seconds"], 1e-9)
+        measurements[stage] = {
+            "files_per_second": round(timing_run["files"] / seconds, 1),
+            "mb_per_second": round(timing_run["content_bytes"] / (1024 * 1024) / seconds, 2),
+            "peak_memory_mb": round(memory_run["stages"][stage]["peak_memory_mb"], 2),
+        }
+    return {"files": timing_run["files"], "content_mb": round(timing_run["content_bytes"] / (1024 * 1024), 2),
+            "stages": measurements}
+
+
+def compare_to_baseline(shape: str, measured: dict, baseline: dict, tolerance: float) -> list:
+    """Returns a description of every stage that is slower or uses more memory than the baseline allows."""
+    regressions = []
+    for stage, stage_baseline in baseline.get("stages", {}).items():
+        stage_measured = measured["stages"].get(stage)
+        if stage_measured is None:
+            continue
+        if stage_measured["files_per_second"] < stage_baseline["files_per_second"] * (1 - tolerance):
+            regressions.append(
+                f"{shape}/{stage}: {stage_measured['files_per_second']:,.0f} files/s, "
+                f"baseline {stage_baseline['files_per_second']:,.0f}"
+            )
+        # Small peaks are dominated by interpreter noise, so memory is compared above 1 MB only
+        if stage_measured["peak_memory_mb"] > max(stage_baseline["peak_memory_mb"], 1.0) * (1 + tolerance):
+            regressions.append(
+                f"{shape}/{stage}: peak {stage_measured['peak_memory_mb']:.1f} MB, "
+                f"baseline {stage_baseline['peak_memory_mb']:.1f} MB"
+            )
+    return regressions
+
+
+@pytest.mark.parametrize("shape", sorted(BENCHMARK_SHAPES))
+def test_benchmark_shapes_produce_expected_trees(tmp_path: pathlib.Path, shape: str):
+    """
+    Test ID: (Benchmark suite)
+    Description: Runs every benchmark shape at a tiny scale through the whole pipeline, so the
+    generators and the harness keep working between benchmark runs.
+    """
+    traversal_options = BENCHMARK_SHAPES[shape](tmp_path, 0.01)
+    measured = measure_shape(tmp_path, traversal_options)
+    assert set(measured["stages"]) == set(BENCHMARK_STAGES)
+    assert measured["files"] > 0
+    if shape == "binary_heavy":  # Binary files are excluded, so only the text ones remain
+        assert measured["files"] == len([p for p in tmp_path.rglob("meta_*")])
+    if shape == "pattern_heavy":  # Two modules: README.md and src/*.py each, generated/ only in module_1
+        assert measured["files"] == 2 * (1 + 10) + 5
+
+    slow = {stage: dict(values, files_per_second=values["files_per_second"] / 10, peak_memory_mb=0.0)
+            for stage, values in measured["stages"].items()}
+    assert compare_to_baseline(shape, measured, {"stages": measured["stages"]}, 0.5) == []
+    assert len(compare_to_baseline(shape, {"stages": slow}, {"stages": measured["stages"]}, 0.5)) == len(BENCHMARK_STAGES)
+
+
+@run_benchmarks
+@pytest.mark.parametrize("shape", sorted(BENCHMARK_SHAPES))
+def test_benchmark_shape_against_baseline(tmp_path: pathlib.Path, shape: str):
+    """
+    Test ID: (Benchmark suite)
+    Description: Measures throughput and peak memory of every pipeline stage on one repository
+    shape and fails if any stage regressed beyond DIRDIGEST_BENCHMARK_TOLERANCE relative to
+    tests/benchmark_baseline.json (or records the baseline with DIRDIGEST_BENCHMARK_UPDATE=1).
+    """
+    import json
+
+    scale = float(os.environ.get("DIRDIGEST_BENCHMARK_SCALE", "1.0"))
+    tolerance = float(os.environ.get("DIRDIGEST_BENCHMARK_TOLERANCE", "0.5"))
+    traversal_options = BENCHMARK_SHAPES[shape](tmp_path, scale)
+    measured = measure_shape(tmp_path, traversal_options)
+
+    print(f"\n{shape}: {measured['files']} files, {measured['content_mb']} MB of content (scale {scale})")
+    for stage, values in measured["stages"].items():
+        print(f"  {stage:<16} {values['files_per_second']:>12,.0f} files/s {values['mb_per_second']:>9,.2f} MB/s "
+              f"{values['peak_memory_mb']:>9,.2f} MB peak")
+
+    baselines = json.loads(BENCHMARK_BASELINE_PATH.read_text()) if BENCHMARK_BASELINE_PATH.exists() else {}
+    if os.environ.get("DIRDIGEST_BENCHMARK_UPDATE"):
+        baselines[shape] = dict(measured, scale=scale)
+        BENCHMARK_BASELINE_PATH.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+        return
+    if shape not in baselines:
+        pytest.skip(f"No baseline for '{shape}'; record one with DIRDIGEST_BENCHMARK_UPDATE=1.")
+    if baselines[shape].get("scale") != scale:
+        pytest.skip(f"Baseline for '{shape}' was recorded at scale {baselines[shape].get('scale')}, not {scale}.")
+    regressions = compare_to_baseline(shape, measured, baselines[shape], tolerance)
+    assert not regressions, "Regressions against the baseline:\n" + "\n".join(regressions)
+
+
+# Imported on demand only: yaml when a config file exists, pyperclip with --clipboard,
+# rich once logging is set up, the traversal and formatters for an actual digest
+DEFERRED_STARTUP_MODULES = ("yaml", "pyperclip", "rich", "ctypes", "dirdigest.core", "dirdigest.formatter")
+
+
+def modules_imported_by(args: list) -> set:
+    """Runs `python -X importtime <args>` from the project root; returns the names of the modules it imported."""
+    project_root = pathlib.Path(__file__).parent.parent
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(project_root), env.get("PYTHONPATH")]))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args], cwd=project_root, env=env, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    return {
+        line.rsplit("|", 1)[1].strip() for line in result.stderr.splitlines() if line.startswith("import time:")
+    }
+
+
+@pytest.mark.parametrize(
+    "args",
+    [["-c", "import dirdigest.cli"], ["-m", "dirdigest.cli", "--version"], ["-m", "dirdigest.cli", "--help"]],
+    ids=["import", "version", "help"],
+)
+def test_cli_startup_defers_heavy_imports(args: list):
+    """
+    Test ID: (startup)
+    Description: Importing the CLI, --version and --help do not import the dependencies that
+    are only needed to produce a digest, keeping startup fast.
+    """
+    imported = modules_imported_by(args)
+    assert "click" in imported  # Sanity check that the import trace was parsed
+    assert not {name for name in DEFERRED_STARTUP_MODULES if name in imported}
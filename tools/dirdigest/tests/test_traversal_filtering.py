@@ -4,7 +4,9 @@ import pytest
 import json
 from click.testing import CliRunner
 from pathlib import Path
-from unittest import mock 
+from unittest import mock
+import shutil
+import subprocess
 from dirdigest import cli as dirdigest_cli
 
 # Helper function to extract relative paths from JSON output
@@ -480,4 +482,388 @@ def test_broken_symlinks_handling(runner: CliRunner, temp_test_dir: Path):
     assert "read_error" in processed_broken_link_node, \
         "broken_link_file node should have a 'read_error' attribute"
     assert processed_broken_link_node.get("content") is None, \
-        "broken_link_file node should have no content due to read_error"
\ No newline at end of file
+        "broken_link_file node should have no content due to read_error"
+
+
+# --- Tests for parallel reading ---
+
+@pytest.mark.parametrize("temp_test_dir", ["complex_project"], indirect=True)
+def test_parallel_workers_output_matches_serial(runner: CliRunner, temp_test_dir: Path):
+    """
+    Test ID: (Parallel reads)
+    Description: Verifies that '--workers N' produces the same digest as a serial run.
+    Compares Markdown output with the generation timestamp line removed.
+    """
+    outputs = []
+    for extra_args in ([], ["--workers", "4"]):
+        with mock.patch("dirdigest.utils.logger.stdout_console.print") as mock_rich_print:
+            result = runner.invoke(dirdigest_cli.main_cli, ["--no-clipboard", "--no-default-ignore"] + extra_args)
+            md_output = "".join(str(call.args[0]) for call in mock_rich_print.call_args_list if call.args)
+        assert result.exit_code == 0, f"CLI failed. Stderr: {result.stderr}"
+        outputs.append("\n".join(line for line in md_output.splitlines() if "Generated by dirdigest" not in line))
+
+    assert outputs[0] == outputs[1]
+    assert "src/feature/module.py" in outputs[1]
+
+
+# --- Tests for compiled pattern matching ---
+
+@pytest.mark.parametrize("path_str", [
+    "README.md", "src/main.py", "src/__pycache__/mod.cpython-39.pyc", "node_modules",
+    "a/b/node_modules/pkg/index.js", "pkg.egg-info/PKG-INFO", "logs/app.log", ".env",
+    "config/.env.local", "docs/api.md", "docs/api/reference.md", "image.png", "assets/image.png",
+    "archive.tar.gz", "build", "rebuild/file.txt", "tests/test_main.py", "Makefile~", ".",
+])
+def test_pattern_set_matches_like_matches_patterns(path_str: str):
+    """
+    Test ID: (Compiled patterns)
+    Description: Verifies that PatternSet gives the same answers as matches_patterns for
+    the default ignore patterns plus typical user patterns (directory, basename and full-path
+    forms), and that match() reports a pattern that really matches.
+    """
+    from dirdigest.constants import DEFAULT_IGNORE_PATTERNS
+    from dirdigest.utils.patterns import PatternSet, matches_pattern, matches_patterns
+
+    patterns = DEFAULT_IGNORE_PATTERNS + ["*.md", "tests/", "docs/api/*", "src/*.py", "**/ref*.md"]
+    pattern_set = PatternSet(patterns)
+
+    assert pattern_set.matches(path_str) == matches_patterns(path_str, patterns)
+    matched = pattern_set.match(path_str)
+    if matched is not None:
+        assert matches_pattern(path_str, matched)
+
+
+# --- Tests for git index enumeration ---
+
+@pytest.mark.parametrize("pattern,path_str,is_dir,expected", [
+    ("*.log", "a/b/debug.log", False, True),
+    ("/build", "build", True, True),
+    ("/build", "src/build", True, False),
+    ("docs/*.md", "docs/api.md", False, True),
+    ("docs/*.md", "docs/api/ref.md", False, False),
+    ("docs/**/*.md", "docs/api/ref.md", False, True),
+    ("**/cache", "x/y/cache", True, True),
+    ("out/", "out", False, False),
+    ("out/", "src/out", True, True),
+    ("vendor/**", "vendor/pkg/a.go", False, True),
+    ("vendor/**", "vendor", True, False),
+    ("data[0-9].csv", "data7.csv", False, True),
+    ("\\#notes", "#notes", False, True),
+])
+def test_gitignore_rule_semantics(pattern: str, path_str: str, is_dir: bool, expected: bool):
+    """Test ID: (Gitignore rules). Anchoring, '**', dir-only, brackets and escapes follow git's rules."""
+    from dirdigest.utils.gitignore import IgnoreRules
+
+    assert (IgnoreRules([pattern]).match(path_str, is_dir) is not None) == expected
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+@pytest.mark.parametrize("temp_test_dir", ["complex_project"], indirect=True)
+def test_git_mode_enumerates_from_index(runner: CliRunner, temp_test_dir: Path):
+    """
+    Test ID: (Git index source)
+    Description: Verifies that '--git' lists tracked files only, '--git-untracked' adds untracked files
+    that .gitignore (with negation) does not ignore, nested .gitignore files apply, and the usual
+    filters still run on the enumerated files.
+    """
+    def git(*args):
+        subprocess.run(["git", *args], cwd=temp_test_dir, check=True, capture_output=True)
+
+    (temp_test_dir / ".gitignore").write_text("generated/\n*.csv\n!keep.csv\n")
+    (temp_test_dir / "docs" / ".gitignore").write_text("draft_*.md\n")
+    git("init", "-q")
+    git("add", "README.md", "src", "docs", "config.yaml", ".gitignore")
+    (temp_test_dir / "generated").mkdir()
+    (temp_test_dir / "generated" / "huge.py").write_text("x = 1\n")
+    (temp_test_dir / "untracked.py").write_text("print('new')\n")
+    (temp_test_dir / "keep.csv").write_text("a,b\n")
+    (temp_test_dir / "docs" / "draft_1.md").write_text("# draft\n")
+
+    def included_files(*extra_args):
+        with mock.patch("dirdigest.utils.logger.stdout_console.print") as mock_rich_print:
+            result = runner.invoke(dirdigest_cli.main_cli, ["--format", "json", "--no-clipboard", *extra_args])
+            json_output = "".join(str(call.args[0]) for call in mock_rich_print.call_args_list if call.args)
+        assert result.exit_code == 0, f"CLI failed. Stderr: {result.stderr}"
+        return get_included_files_from_json(json_output)
+
+    tracked = {
+        "README.md", "config.yaml", "src/main.py", "src/utils.py", "src/feature/module.py",
+        "docs/index.md", "docs/api.md",
+    }
+    assert included_files("--git") == tracked
+    assert included_files("--git-untracked") == tracked | {
+        "untracked.py", "keep.csv", "tests/test_main.py", "tests/test_utils.py",
+    }
+    assert included_files("--git", "-x", "docs/") == tracked - {"docs/index.md", "docs/api.md"}
+    assert included_files("--git", "--max-depth", "1") == {path for path in tracked if path.count("/") <= 1}
+    # A subdirectory of the work tree lists only its own files, relative to itself
+    assert included_files(str(temp_test_dir / "src"), "--git") == {"main.py", "utils.py", "feature/module.py"}
+
+
+def test_ignore_files_are_hierarchical_and_prune_directories(tmp_path: Path):
+    """
+    Test ID: (Ignore files)
+    Description: Verifies .gitignore/.dirdigestignore precedence (deeper files and .dirdigestignore win,
+    '!' re-includes), that ignored directories are never walked, that ignore files above the digested
+    directory apply inside a git work tree, and that none of it applies without --ignore-files.
+    """
+    from dirdigest import core
+
+    def write(relative_path: str, text: str = "x\n"):
+        path = tmp_path / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+
+    (tmp_path / ".git").mkdir()
+    write(".gitignore", "*.gen.py\nbig/\n")
+    write("project/.gitignore", "*.txt\n!keep.txt\n")
+    write("project/.dirdigestignore", "secrets/\nkeep.txt\n")
+    write("project/app.py")
+    write("project/app.gen.py")
+    write("project/notes.txt")
+    write("project/keep.txt")
+    write("project/big/blob.py")
+    write("project/secrets/token.py")
+    write("project/pkg/.gitignore", "!*.gen.py\n")
+    write("project/pkg/schema.gen.py")
+    write("project/pkg/readme.txt")
+
+    def traverse(**options):
+        walked_dirs = []
+        items, _stats = core.process_directory_recursive(
+            base_dir_path=tmp_path / "project",
+            include_patterns=[], exclude_patterns=[], no_default_ignore=False, max_depth=None,
+            follow_symlinks=False, max_size_kb=100, ignore_read_errors=False,
+            on_directory=walked_dirs.append, **options,
+        )
+        included = {str(relative_path).replace("\\", "/") for relative_path, _, _ in items}
+        return included, {Path(d).name for d in walked_dirs}
+
+    included, walked = traverse(ignore_files=True)
+    assert included == {"app.py", "pkg/schema.gen.py"}
+    assert walked == {"project", "pkg"}  # big/ and secrets/ were pruned, not walked
+
+    included, walked = traverse(ignore_files=False)
+    assert included == {
+        "app.py", "app.gen.py", "notes.txt", "keep.txt", "big/blob.py", "secrets/token.py",
+        "pkg/schema.gen.py", "pkg/readme.txt",
+    }
+
+
+# --- Tests for multi-root digests ---
+
+def test_multiple_roots_share_one_digest_and_read_shared_files_once(runner: CliRunner, tmp_path: Path):
+    """
+    Test ID: (Multi-root)
+    Description: Verifies that several DIRECTORY arguments produce one digest relative to their common
+    parent, that a file reachable from two roots (same device and inode) is read once and referenced
+    from the other path, and that nested or repeated roots are folded into their parent.
+    """
+    import os
+    from dirdigest import core
+
+    (tmp_path / "shared").mkdir()
+    (tmp_path / "shared" / "vendored.py").write_text("VENDORED = True\n")
+    for service in ("svc_a", "svc_b"):
+        (tmp_path / service).mkdir()
+        (tmp_path / service / "main.py").write_text(f"print('{service}')\n")
+        os.symlink(tmp_path / "shared", tmp_path / service / "third_party")
+    os.link(tmp_path / "svc_a" / "main.py", tmp_path / "svc_b" / "copy_of_a.py")
+    (tmp_path / "svc_a" / "pkg").mkdir()
+
+    roots = [tmp_path / "svc_a", tmp_path / "svc_b", tmp_path / "svc_a", tmp_path / "svc_a" / "pkg"]
+    with mock.patch.object(core, "_read_text", wraps=core._read_text) as read_text:
+        with mock.patch("dirdigest.utils.logger.stdout_console.print") as mock_rich_print:
+            result = runner.invoke(
+                dirdigest_cli.main_cli,
+                [*map(str, roots), "--format", "json", "--no-clipboard", "--no-cache", "--follow-symlinks"],
+            )
+            json_output = "".join(str(call.args[0]) for call in mock_rich_print.call_args_list if call.args)
+    assert result.exit_code == 0, f"CLI failed. Stderr: {result.stderr}"
+    assert read_text.call_count == 3  # One read each for the svc_a/main.py inode, svc_b/main.py and vendored.py
+
+    data = json.loads(json_output)
+    assert data["metadata"]["base_directory"] == str(tmp_path.resolve())
+    assert data["metadata"]["roots"] == ["svc_a", "svc_b"]
+    assert data["metadata"]["duplicate_files_count"] == 2
+    nodes = {}
+    def collect(node):
+        if node["type"] == "file":
+            nodes[node["relative_path"]] = node
+        for child in node.get("children", []):
+            collect(child)
+    collect(data["root"])
+    assert set(nodes) == {
+        "svc_a/main.py", "svc_a/third_party/vendored.py", "svc_b/main.py", "svc_b/copy_of_a.py", "svc_b/third_party/vendored.py",
+    }
+    assert nodes["svc_a/third_party/vendored.py"]["content"] == "VENDORED = True\n"
+    assert nodes["svc_b/third_party/vendored.py"]["duplicate_of"] == "svc_a/third_party/vendored.py"
+    assert nodes["svc_b/third_party/vendored.py"]["content"] is None
+    assert nodes["svc_b/copy_of_a.py"]["duplicate_of"] == "svc_a/main.py"
+
+
+def test_follow_symlinks_prunes_directory_loops(runner: CliRunner, tmp_path: Path):
+    """
+    Test ID: (Symlink loops)
+    Description: Verifies that with --follow-symlinks, links back to an ancestor directory are pruned
+    and counted as loops, while links to other directories, inside or outside the tree, are followed.
+    """
+    import os
+
+    (tmp_path / "src" / "pkg").mkdir(parents=True)
+    (tmp_path / "src" / "pkg" / "mod.py").write_text("X = 1\n")
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "docs" / "guide.md").write_text("# Guide\n")
+    os.symlink(tmp_path, tmp_path / "src" / "pkg" / "to_root")  # Loop through the top directory
+    os.symlink(tmp_path / "src", tmp_path / "src" / "pkg" / "to_src")  # Loop through an ancestor
+    os.symlink(tmp_path / "docs", tmp_path / "src" / "pkg" / "to_docs")  # Second route, not a loop
+    os.symlink(tmp_path / "src", tmp_path / "docs" / "to_src")  # A loop only when reached through to_docs
+    outside = tmp_path.parent / f"{tmp_path.name}_outside"
+    outside.mkdir()
+    (outside / "shared.py").write_text("SHARED = 1\n")
+    os.symlink(outside, tmp_path / "docs" / "outside")
+
+    with mock.patch("dirdigest.utils.logger.stdout_console.print") as mock_rich_print:
+        result = runner.invoke(
+            dirdigest_cli.main_cli,
+            [str(tmp_path), "--format", "json", "--no-clipboard", "--no-cache", "--follow-symlinks"],
+        )
+        json_output = "".join(str(call.args[0]) for call in mock_rich_print.call_args_list if call.args)
+    assert result.exit_code == 0, f"CLI failed. Stderr: {result.stderr}"
+
+    assert get_included_files_from_json(json_output) == {
+        "src/pkg/mod.py",
+        "src/pkg/to_docs/guide.md",
+        "src/pkg/to_docs/outside/shared.py",
+        "docs/guide.md",
+        "docs/outside/shared.py",
+        "docs/to_src/pkg/mod.py",
+    }
+    metadata = json.loads(json_output)["metadata"]
+    # to_root and to_src below both src/ and docs/to_src/, plus to_docs/to_src and to_src/pkg/to_docs
+    assert metadata["symlink_loops_count"] == 6
+
+
+# --- Tests for whole-digest limits ---
+
+@pytest.mark.parametrize("workers", [None, 4])
+def test_max_files_and_total_size_stop_the_traversal(runner: CliRunner, tmp_path: Path, workers):
+    """
+    Test ID: (Traversal limits)
+    Description: Verifies that --max-files and --max-total-size stop the traversal at the first file
+    that does not fit, that later files are neither read nor walked, and that the metadata and the
+    Markdown header say the digest is incomplete.
+    """
+    from dirdigest import core
+
+    for directory_index in range(5):
+        directory = tmp_path / f"dir{directory_index}"
+        directory.mkdir()
+        for file_index in range(4):
+            (directory / f"file{file_index}.txt").write_text("x" * 399 + "\n")  # 400 bytes each
+    worker_args = ["--workers", str(workers)] if workers else []
+
+    def run_digest(*limit_args: str, output_format: str = "json") -> str:
+        with mock.patch("dirdigest.utils.logger.stdout_console.print") as mock_rich_print:
+            result = runner.invoke(
+                dirdigest_cli.main_cli,
+                [str(tmp_path), "--format", output_format, "--no-clipboard", "--no-cache", *worker_args, *limit_args],
+            )
+        assert result.exit_code == 0, f"CLI failed. Stderr: {result.stderr}"
+        return "".join(str(call.args[0]) for call in mock_rich_print.call_args_list if call.args)
+
+    with mock.patch.object(core, "_read_text", wraps=core._read_text) as read_text:
+        json_output = run_digest("--max-files", "6")
+    assert len(get_included_files_from_json(json_output)) == 6
+    assert json.loads(json_output)["metadata"]["limit_reached"] == "Reached max files (6)"
+    # Reads stop at the limit (give or take the read-ahead window of the worker pool)
+    assert read_text.call_count <= (7 if not workers else 7 + workers * core.READ_AHEAD_PER_WORKER)
+
+    json_output = run_digest("--max-total-size", "1")  # 1024 bytes: two 400-byte files fit
+    assert len(get_included_files_from_json(json_output)) == 2
+    assert json.loads(json_output)["metadata"]["limit_reached"] == "Reached max total size (1KB)"
+
+    json_output = run_digest("--max-files", "20", "--max-total-size", "100")
+    assert len(get_included_files_from_json(json_output)) == 20
+    assert "limit_reached" not in json.loads(json_output)["metadata"]
+
+    markdown_output = run_digest("--max-files", "1", output_format="markdown")
+    assert "*Incomplete: Reached max files (1); the traversal stopped there.*" in markdown_output
+
+
+@pytest.mark.parametrize("output_format", ["json", "jsonl"])
+def test_report_records_excluded_items_with_reason_and_pattern(runner: CliRunner, tmp_path: Path, output_format):
+    """
+    Test ID: (Exclusion report)
+    Description: Verifies that --report writes one JSON Lines record per excluded file and directory,
+    with a reason code, the pattern or ignore rule that matched (and its ignore file), and the reason
+    as logged; that it agrees with the excluded count in the digest; and that multi-root runs report
+    paths relative to the common base, including copies dropped because the root that read them
+    excluded the file.
+    """
+    import os
+
+    project = tmp_path / "project"
+    (project / "node_modules").mkdir(parents=True)
+    (project / "node_modules" / "pkg.js").write_text("module.exports = {};\n")
+    (project / "build").mkdir()
+    (project / "build" / "out.txt").write_text("built\n")
+    (project / "keep.txt").write_text("kept\n")
+    (project / "notes.tmp").write_text("scratch\n")
+    (project / "big.txt").write_text("x" * 2048)
+    (project / "secret.txt").write_text("hunter2\n")
+    (project / ".gitignore").write_text("secret.txt\n")
+    report_path = tmp_path / "excluded.jsonl"
+
+    def run_report(*args: str) -> tuple[dict, list[dict]]:
+        with mock.patch("dirdigest.utils.logger.stdout_console.print") as mock_rich_print:
+            result = runner.invoke(
+                dirdigest_cli.main_cli,
+                [*args, "--format", output_format, "--no-clipboard", "--no-cache", "--max-size", "1",
+                 "--exclude", "*.tmp", "--exclude", "build", "--ignore-files", "--report", str(report_path)],
+            )
+        assert result.exit_code == 0, f"CLI failed. Stderr: {result.stderr}"
+        output = "".join(str(call.args[0]) for call in mock_rich_print.call_args_list if call.args)
+        # JSON Lines puts the counts in the closing summary record
+        metadata = json.loads(output.splitlines()[-1]) if output_format == "jsonl" else json.loads(output)["metadata"]
+        with open(report_path, encoding="utf-8") as report_file:
+            return metadata, [json.loads(line) for line in report_file]
+
+    metadata, records = run_report(str(project))
+    assert {record["path"]: record for record in records} == {
+        "node_modules": {
+            "path": "node_modules", "type": "directory", "reason": "default_ignore",
+            "pattern": "**/node_modules/", "detail": "Matches default ignore pattern '**/node_modules/'",
+        },
+        "build": {
+            "path": "build", "type": "directory", "reason": "exclude_pattern",
+            "pattern": "build", "detail": "Matches user-specified exclude pattern 'build'",
+        },
+        ".gitignore": {"path": ".gitignore", "type": "file", "reason": "hidden", "detail": "Is a hidden file"},
+        "notes.tmp": {
+            "path": "notes.tmp", "type": "file", "reason": "exclude_pattern",
+            "pattern": "*.tmp", "detail": "Matches user-specified exclude pattern '*.tmp'",
+        },
+        "secret.txt": {
+            "path": "secret.txt", "type": "file", "reason": "ignore_file", "pattern": "secret.txt",
+            "source": ".gitignore", "detail": "Matches ignore rule 'secret.txt' in .gitignore",
+        },
+        "big.txt": {
+            "path": "big.txt", "type": "file", "reason": "max_size", "detail": "Exceeds max size (2.0KB > 1KB)",
+        },
+    }
+    assert len(records) == metadata["excluded_files_count"]
+
+    other = tmp_path / "other"
+    other.mkdir()
+    (other / "draft.tmp").write_text("draft\n")
+    # Copies of a file the reading root excluded are dropped from the merge, and reported too
+    (project / "latin1.txt").write_bytes(b"caf\xe9\n")
+    os.link(project / "latin1.txt", other / "latin1.txt")
+    metadata, records = run_report(str(project), str(other))
+    records_by_path = {record["path"]: record for record in records}
+    assert {"project/notes.tmp", "other/draft.tmp", "project/node_modules"} <= set(records_by_path)
+    latin1_records = [records_by_path.get("project/latin1.txt"), records_by_path.get("other/latin1.txt")]
+    assert None not in latin1_records
+    assert sorted(record["reason"] for record in latin1_records) == ["decode_error", "decode_error"]
+    assert len(records) == metadata["excluded_files_count"]